@@ -0,0 +1,95 @@
+"""
+A small thread-safe least-recently-used cache, for in-memory caches of derived data.
+"""
+
+from collections import OrderedDict
+from collections.abc import Hashable
+from dataclasses import dataclass
+from threading import Lock
+from typing import Generic, TypeVar
+
+K = TypeVar("K", bound=Hashable)
+V = TypeVar("V")
+
+
+@dataclass
+class LruStats:
+    """
+    Counters describing how a cache has been used since the process started.
+
+    - hits: Lookups that were served from the cache.
+    - misses: Lookups that did not find their key.
+    - evictions: Values that were dropped to make space for newer values.
+    - size: Values currently in the cache.
+    """
+
+    hits: int = 0
+    misses: int = 0
+    evictions: int = 0
+    size: int = 0
+
+
+class LruCache(Generic[K, V]):
+    """
+    A bounded mapping that drops the least recently used values once it holds more
+    than `max_size` values.
+
+    Values are computed by the callers, outside of the cache lock, so two threads may
+    compute the same value at once.
+    In that case the last value to be stored wins.
+    """
+
+    def __init__(self, max_size: int) -> None:
+        self.max_size = max_size
+        self._values: OrderedDict[K, V] = OrderedDict()
+        self._lock = Lock()
+        self._stats = LruStats()
+
+    def get(self, key: K) -> V | None:
+        """
+        Get the value for `key`, marking it as recently used, or `None` if it is not
+        cached.
+        """
+
+        with self._lock:
+            value = self._values.get(key)
+            if value is None:
+                self._stats.misses += 1
+                return None
+            self._values.move_to_end(key)
+            self._stats.hits += 1
+            return value
+
+    def put(self, key: K, value: V):
+        """
+        Store the value for `key`, evicting the least recently used values if the
+        cache is full.
+        """
+
+        with self._lock:
+            self._values[key] = value
+            self._values.move_to_end(key)
+            while len(self._values) > self.max_size:
+                self._values.popitem(last=False)
+                self._stats.evictions += 1
+
+    def clear(self):
+        with self._lock:
+            self._values.clear()
+
+    def keys(self) -> list[K]:
+        """
+        Get the cached keys, from least to most recently used.
+        """
+
+        with self._lock:
+            return list(self._values)
+
+    def stats(self) -> LruStats:
+        with self._lock:
+            return LruStats(
+                hits=self._stats.hits,
+                misses=self._stats.misses,
+                evictions=self._stats.evictions,
+                size=len(self._values),
+            )
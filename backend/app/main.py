@@ -1,10 +1,10 @@
 import asyncio
 import logging
-import random
+from collections.abc import Awaitable, Callable
 from typing import Literal
 
 import sentry_sdk
-from fastapi import FastAPI, HTTPException
+from fastapi import FastAPI, HTTPException, Request, Response
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.middleware.gzip import GZipMiddleware
 from fastapi.routing import APIRoute
@@ -16,9 +16,11 @@ from app.database import prisma
 from app.logger import setup_logger
 from app.redis import get_redis
 from app.settings import settings
-from app.sync.database import load_packed_data_from_db
+from app.sync.database import course_search_index, load_packed_data_from_db
 from app.sync.siding.client import client as siding_soap_client
 from app.sync.siding.client import get_titles
+from app.tracing import server_timing, trace, write_trace
+from app.workers import start_workers, stop_workers
 
 
 # Set up operation IDs for OpenAPI
@@ -85,6 +87,26 @@ app.add_middleware(
 app.add_middleware(GZipMiddleware, minimum_size=1000)
 
 
+@app.middleware("http")
+async def trace_requests(
+    request: Request,
+    call_next: Callable[[Request], Awaitable[Response]],
+) -> Response:
+    """
+    Time each request (see `app.tracing`), and report where its time went.
+    """
+    if not settings.server_timing and settings.trace_path == "":
+        return await call_next(request)
+    with trace(f"{request.method} {request.url.path}") as root:
+        response = await call_next(request)
+    if settings.server_timing:
+        response.headers["Server-Timing"] = server_timing(root)
+    if settings.trace_path != "":
+        # Keep file I/O off the event loop
+        await asyncio.to_thread(write_trace, root, settings.trace_path)
+    return response
+
+
 @app.on_event("startup")  # type: ignore
 async def startup():
     # Initialize logging
@@ -94,14 +116,18 @@ async def startup():
     await prisma.connect()
     # Setup SIDING webservice
     siding_soap_client.on_startup()
-    # HACK: Random sleep to avoid DDoSing the DB
-    await asyncio.sleep(random.SystemRandom().random() * 15)
     # Load static data from DB to RAM
+    # Only the first worker actually reads the data, the rest share its image
     await load_packed_data_from_db()
+    # Build the course search index now, instead of on the first search
+    await course_search_index()
+    # Start solver workers, which load their own copy of the static data
+    start_workers()
 
 
 @app.on_event("shutdown")  # type: ignore
 async def shutdown():
+    stop_workers()
     await prisma.disconnect()
     siding_soap_client.on_shutdown()
 
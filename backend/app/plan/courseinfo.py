@@ -2,7 +2,11 @@
 Cache course info from the database in memory, for easy access.
 """
 
-from dataclasses import dataclass
+import sys
+from array import array
+from collections.abc import Callable, Iterator, Mapping, Sequence
+from dataclasses import dataclass, field
+from typing import NamedTuple
 
 import pydantic
 from prisma.models import (
@@ -14,7 +18,8 @@ from pydantic import BaseModel
 from unidecode import unidecode
 
 from app.plan.course import EquivalenceId, PseudoCourse
-from app.plan.validation.courses.logic import Expr
+from app.plan.validation.courses.compiled import DepsEvaluator, compile_deps
+from app.plan.validation.courses.logic import Expr, intern_expr
 
 
 class ExprRedefine(BaseModel):
@@ -64,7 +69,7 @@ class CourseDetails(BaseModel):
             code=db.code,
             name=db.name,
             credits=db.credits,
-            deps=deps.__root__,
+            deps=intern_expr(deps.__root__),
             banner_equivs=db.banner_equivs,
             canonical_equiv=db.canonical_equiv,
             program=db.program,
@@ -123,14 +128,228 @@ class EquivDetails(BaseModel):
         )
 
 
+class CourseText(NamedTuple):
+    """
+    The long, rarely used text fields of a course.
+    """
+
+    name: str
+    program: str
+    school: str
+    area: str | None
+    category: str | None
+
+
+# Bit flags stored in `CourseStore` for each course
+COURSE_AVAILABLE = 1
+COURSE_FIRST_SEMESTER = 2
+COURSE_SECOND_SEMESTER = 4
+
+
+def course_flags(is_available: bool, semestrality: Sequence[bool]) -> int:
+    return (
+        (COURSE_AVAILABLE if is_available else 0)
+        | (COURSE_FIRST_SEMESTER if semestrality[0] else 0)
+        | (COURSE_SECOND_SEMESTER if semestrality[1] else 0)
+    )
+
+
+class CourseStore(Mapping[str, CourseDetails]):
+    """
+    A compact, column-oriented store of course details.
+
+    Each course has an integer id, and the fields that are used while validating plans
+    are kept in parallel columns indexed by this id.
+    Code strings are interned, so codes that show up in many courses are stored once.
+    Requirements and the long text fields are only decoded when they are first used
+    (requirements are also compiled into evaluators, see `compiled_deps`),
+    through the `load_deps` and `load_text` callbacks.
+    The fields needed by course search are loaded separately through
+    `load_search_keys`, so that searching does not need the text of every course.
+
+    Indexing the store builds a full `CourseDetails` on demand, so hot code should use
+    the column accessors instead.
+    """
+
+    def __init__(
+        self,
+        codes: list[str],
+        credits: Sequence[int],
+        flags: Sequence[int],
+        canonical_equivs: list[str],
+        banner_equivs: list[tuple[str, ...]],
+        load_deps: Callable[[int], Expr],
+        load_text: Callable[[int], CourseText],
+        load_search_keys: Callable[[], list[tuple[str, str]]],
+    ) -> None:
+        self.codes = [sys.intern(code) for code in codes]
+        self._ids = {code: i for i, code in enumerate(self.codes)}
+        self._credits = credits
+        self._flags = flags
+        self._canonical_equivs = [sys.intern(code) for code in canonical_equivs]
+        self._banner_equivs = [
+            tuple(sys.intern(code) for code in equivs) for equivs in banner_equivs
+        ]
+        # Precomputed equivalence index: the codes that each course counts as
+        # (its banner equivalents and itself), and whether the course or its canonical
+        # equivalent is available
+        self._equivalents = [
+            (*equivs, code)
+            for code, equivs in zip(self.codes, self._banner_equivs, strict=True)
+        ]
+        self._equiv_available = bytes(
+            self.is_available(id) or self._is_code_available(canonical)
+            for id, canonical in enumerate(self._canonical_equivs)
+        )
+        self._deps: list[Expr | None] = [None] * len(codes)
+        self._compiled_deps: list[DepsEvaluator | None] = [None] * len(codes)
+        self._load_deps = load_deps
+        self._load_text = load_text
+        self._load_search_keys = load_search_keys
+
+    @staticmethod
+    def from_details(courses: Mapping[str, CourseDetails]) -> "CourseStore":
+        """
+        Build a store out of fully parsed course details.
+        """
+
+        details = list(courses.values())
+        return CourseStore(
+            codes=list(courses.keys()),
+            credits=array("H", (course.credits for course in details)),
+            flags=bytes(
+                course_flags(course.is_available, course.semestrality)
+                for course in details
+            ),
+            canonical_equivs=[course.canonical_equiv for course in details],
+            banner_equivs=[tuple(course.banner_equivs) for course in details],
+            load_deps=lambda id: details[id].deps,
+            load_text=lambda id: CourseText(
+                name=details[id].name,
+                program=details[id].program,
+                school=details[id].school,
+                area=details[id].area,
+                category=details[id].category,
+            ),
+            load_search_keys=lambda: [
+                (make_searchable_name(course.name), course.school) for course in details
+            ],
+        )
+
+    def course_id(self, code: str) -> int | None:
+        return self._ids.get(code)
+
+    def credits(self, id: int) -> int:
+        return self._credits[id]
+
+    def is_available(self, id: int) -> bool:
+        return bool(self._flags[id] & COURSE_AVAILABLE)
+
+    def _is_code_available(self, code: str) -> bool:
+        id = self._ids.get(code)
+        return id is not None and self.is_available(id)
+
+    def is_equiv_available(self, id: int) -> bool:
+        """
+        Check if the course or its canonical equivalent is available.
+        """
+        return bool(self._equiv_available[id])
+
+    def semestrality(self, id: int) -> tuple[bool, bool]:
+        flags = self._flags[id]
+        return (
+            bool(flags & COURSE_FIRST_SEMESTER),
+            bool(flags & COURSE_SECOND_SEMESTER),
+        )
+
+    def canonical_equiv(self, id: int) -> str:
+        return self._canonical_equivs[id]
+
+    def banner_equivs(self, id: int) -> tuple[str, ...]:
+        return self._banner_equivs[id]
+
+    def equivalents(self, id: int) -> tuple[str, ...]:
+        """
+        The banner equivalents of a course, followed by the course itself.
+        """
+        return self._equivalents[id]
+
+    def deps(self, id: int) -> Expr:
+        deps = self._deps[id]
+        if deps is None:
+            deps = self._load_deps(id)
+            self._deps[id] = deps
+        return deps
+
+    def compiled_deps(self, id: int) -> DepsEvaluator:
+        compiled = self._compiled_deps[id]
+        if compiled is None:
+            compiled = compile_deps(self.deps(id))
+            self._compiled_deps[id] = compiled
+        return compiled
+
+    def text(self, id: int) -> CourseText:
+        return self._load_text(id)
+
+    def search_keys(self) -> list[tuple[str, str]]:
+        """
+        The searchable name (see `make_searchable_name`) and the school of every
+        course, by id.
+        """
+        return self._load_search_keys()
+
+    def details(self, id: int) -> CourseDetails:
+        text = self._load_text(id)
+        return CourseDetails.construct(
+            code=self.codes[id],
+            name=text.name,
+            credits=self.credits(id),
+            deps=self.deps(id),
+            banner_equivs=list(self.banner_equivs(id)),
+            canonical_equiv=self.canonical_equiv(id),
+            program=text.program,
+            school=text.school,
+            area=text.area,
+            category=text.category,
+            is_available=self.is_available(id),
+            semestrality=self.semestrality(id),
+        )
+
+    def __getitem__(self, code: str) -> CourseDetails:
+        return self.details(self._ids[code])
+
+    def __contains__(self, code: object) -> bool:
+        return code in self._ids
+
+    def __iter__(self) -> Iterator[str]:
+        return iter(self.codes)
+
+    def __len__(self) -> int:
+        return len(self.codes)
+
+
 @dataclass
 class CourseInfo:
-    courses: dict[str, CourseDetails]
+    """
+    All of the static course and equivalence information.
+    Plain dictionaries of course details are converted into a `CourseStore`.
+    """
+
+    courses: Mapping[str, CourseDetails]
     equivs: dict[str, EquivDetails]
     must_have_courses: set[str]
+    store: CourseStore = field(init=False)
+
+    def __post_init__(self) -> None:
+        if isinstance(self.courses, CourseStore):
+            self.store = self.courses
+        else:
+            self.store = CourseStore.from_details(self.courses)
+            self.courses = self.store
 
     def try_course(self, code: str) -> CourseDetails | None:
-        return self.courses.get(code)
+        id = self.store.course_id(code)
+        return None if id is None else self.store.details(id)
 
     def try_equiv(self, code: str) -> EquivDetails | None:
         return self.equivs.get(code)
@@ -142,13 +361,49 @@ class CourseInfo:
             else self.try_course(course.code)
         )
 
+    def has_course(self, code: str) -> bool:
+        return code in self.store
+
+    def has_any(self, course: PseudoCourse) -> bool:
+        """
+        Like `try_any(course) is not None`, but without building the course details.
+        """
+        if isinstance(course, EquivalenceId):
+            return course.code in self.equivs
+        return course.code in self.store
+
+    def try_course_credits(self, code: str) -> int | None:
+        id = self.store.course_id(code)
+        return None if id is None else self.store.credits(id)
+
+    def try_deps(self, code: str) -> Expr | None:
+        id = self.store.course_id(code)
+        return None if id is None else self.store.deps(id)
+
+    def try_compiled_deps(self, code: str) -> DepsEvaluator | None:
+        id = self.store.course_id(code)
+        return None if id is None else self.store.compiled_deps(id)
+
+    def try_semestrality(self, code: str) -> tuple[bool, bool] | None:
+        id = self.store.course_id(code)
+        return None if id is None else self.store.semestrality(id)
+
+    def try_canonical_equiv(self, code: str) -> str | None:
+        id = self.store.course_id(code)
+        return None if id is None else self.store.canonical_equiv(id)
+
+    def try_banner_equivs(self, code: str) -> tuple[str, ...] | None:
+        id = self.store.course_id(code)
+        return None if id is None else self.store.banner_equivs(id)
+
+    def try_equivalents(self, code: str) -> tuple[str, ...] | None:
+        id = self.store.course_id(code)
+        return None if id is None else self.store.equivalents(id)
+
     def get_credits(self, course: PseudoCourse) -> int | None:
         if isinstance(course, EquivalenceId):
             return course.credits
-        info = self.try_course(course.code)
-        if info is None:
-            return None
-        return info.credits
+        return self.try_course_credits(course.code)
 
     def get_ghost_credits(self, course: PseudoCourse) -> int | None:
         """
@@ -160,9 +415,23 @@ class CourseInfo:
     def is_available(self, code: str) -> bool:
         if code in self.must_have_courses:
             return True
-        if code not in self.courses:
+        id = self.store.course_id(code)
+        if id is None:
             return False
-        return self.courses[code].is_available
+        return self.store.is_available(id)
+
+    def is_indirectly_available(self, code: str) -> bool:
+        """
+        Check if a course is available OR its canonical equivalent is available.
+        """
+        id = self.store.course_id(code)
+        if id is None:
+            return code in self.must_have_courses
+        return (
+            self.store.is_equiv_available(id)
+            or code in self.must_have_courses
+            or self.store.canonical_equiv(id) in self.must_have_courses
+        )
 
 
 _course_info_cache: CourseInfo | None = None
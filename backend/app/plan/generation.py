@@ -1,8 +1,7 @@
+import heapq
 import logging
-import time
 from collections import OrderedDict, defaultdict
 from collections.abc import Iterable
-from types import TracebackType
 
 from app import sync
 from app.plan.course import (
@@ -10,7 +9,7 @@ from app.plan.course import (
     EquivalenceId,
     pseudocourse_with_credits,
 )
-from app.plan.courseinfo import CourseDetails, CourseInfo
+from app.plan.courseinfo import CourseInfo
 from app.plan.plan import (
     CURRENT_PLAN_VERSION,
     PseudoCourse,
@@ -33,7 +32,13 @@ from app.plan.validation.courses.logic import (
     hash_expr,
     map_atoms,
 )
-from app.plan.validation.courses.simplify import as_dnf, simplify
+from app.plan.validation.courses.memo import ExprMemo
+from app.plan.validation.courses.simplify import (
+    DnfBudgetExceededError,
+    greedy_clause,
+    iter_dnf,
+    simplify,
+)
 from app.plan.validation.courses.validate import CourseInstance, ValidationContext
 from app.plan.validation.curriculum.solve import (
     SolvedCurriculum,
@@ -46,9 +51,11 @@ from app.plan.validation.curriculum.tree import (
     FillerCourse,
     cyear_from_str,
 )
-from app.sync import get_curriculum
-from app.sync.database import course_info
+from app.sync import build_curriculum
+from app.sync.database import loaded_course_info, loaded_curriculum_storage
+from app.tracing import span, traced
 from app.user.auth import UserKey
+from app.workers import run_job
 
 log = logging.getLogger("plan-gen")
 
@@ -223,6 +230,10 @@ class Collapser:
             return [atom]
 
 
+_collapse_memo: ExprMemo[Collapser] = ExprMemo("collapse")
+
+
+@traced("hidden requirements")
 def _find_hidden_requirements(
     courseinfo: CourseInfo,
     passed: ValidatablePlan,
@@ -231,33 +242,32 @@ def _find_hidden_requirements(
     """
     Take the list of courses to pass and compute which necessary requirements are
     missing.
-    Computes all possible ways to complete the hidden requirements, and returns one of
-    the shortest (arbitrarily).
+    Searches the possible ways to complete the hidden requirements from shortest to
+    longest, and returns the first one found (one of the shortest, arbitrarily).
+    If there are too many ways to search through, a greedy choice is returned instead.
     """
 
-    b = Benchmark("hidden requirements")
-
     # Compute a big list of taken and to-be-passed courses
-    with b.section("collect courses"):
-        all_courses: list[CourseDetails] = []
+    with span("collect courses"):
+        all_courses: dict[str, Expr] = {}
         for sem in passed.classes:
             for course in sem:
-                info = courseinfo.try_course(course.code)
-                if info is not None:
-                    all_courses.append(info)
+                deps = courseinfo.try_deps(course.code)
+                if deps is not None:
+                    all_courses[course.code] = deps
         for course in courses_to_pass.values():
-            info = courseinfo.try_course(course.code)
-            if info is not None:
-                all_courses.append(info)
+            deps = courseinfo.try_deps(course.code)
+            if deps is not None:
+                all_courses[course.code] = deps
 
         # Compute which courses are considered taken
-        ready: set[str] = {course.code for course in all_courses}
+        ready: set[str] = set(all_courses)
 
     # Find courses with missing requirements, and add them here
-    with b.section("collect requirements"):
+    with span("collect requirements"):
         missing: list[Expr] = []
-        for course in all_courses:
-            if _is_satisfiable(passed, ready, course.deps):
+        for deps in all_courses.values():
+            if _is_satisfiable(passed, ready, deps):
                 continue
 
             # Something missing!
@@ -273,7 +283,7 @@ def _find_hidden_requirements(
                 # Consider this impossible
                 return Const(value=False)
 
-            missing.append(map_atoms(course.deps, map))
+            missing.append(map_atoms(deps, map))
 
         # Good case: there is nothing missing
         # Exit early to avoid some computations
@@ -283,35 +293,47 @@ def _find_hidden_requirements(
     # Apply some domain-specific heuristics
     # In particular, recognize courses that are equivalent, and consider them as 1
     # pseudo-course
-    with b.section("simplify"):
+    with span("simplify"):
         missing_expr = And(children=tuple(missing))
         missing_expr = simplify(missing_expr)
 
-    with b.section("collapse"):
-        collapser = Collapser(missing_expr)
+    with span("collapse"):
+        collapser = _collapse_memo.get_or_compute(missing_expr, Collapser)
         missing_expr = collapser.collapsed
 
-    # Normalize the resulting expression to DNF:
+    # Find the shortest clause of the resulting expression in DNF form:
     # (IIC1000 y IIC1001) o (IIC1000 y IIC1002) o (IIC2000 y IIC1002)
     # (ie. an OR of ANDs)
-    with b.section("dnfize"):
-        missing_dnf = as_dnf(missing_expr)
-
-    with b.section("expand"):
-        to_fill = min(
-            (
-                [
-                    expanded_atom.code
-                    for pseudoatom in clause.children
-                    for expanded_atom in collapser.expand(pseudoatom)
-                    if isinstance(expanded_atom, ReqCourse)
-                ]
-                for clause in missing_dnf.children
-            ),
-            key=lambda opt: len(opt),
-        )
+    # The DNF can grow exponentially, so clauses are enumerated lazily from lightest
+    # to heaviest and only the first one is computed
+    with span("dnfize"):
+
+        def weight(pseudoatom: Atom) -> int:
+            return sum(
+                isinstance(expanded_atom, ReqCourse)
+                for expanded_atom in collapser.expand(pseudoatom)
+            )
 
-    with b.section("debug printing"):
+        try:
+            shortest = next(iter_dnf(missing_expr, weight, max_clauses=1), None)
+        except DnfBudgetExceededError:
+            # Too many combinations to find the shortest clause, settle for a short
+            # enough one
+            log.warning("hidden requirements are too complex, using a greedy clause")
+            shortest = greedy_clause(missing_expr, weight)
+        if shortest is None:
+            log.warning("could not find a way to satisfy hidden requirements")
+            return []
+
+    with span("expand"):
+        to_fill = [
+            expanded_atom.code
+            for pseudoatom in shortest.children
+            for expanded_atom in collapser.expand(pseudoatom)
+            if isinstance(expanded_atom, ReqCourse)
+        ]
+
+    with span("debug printing"):
         print(f"consider-as-passed: {to_fill}")
 
     return to_fill
@@ -321,9 +343,10 @@ def _reselect_equivs(
     courseinfo: CourseInfo,
     curriculum: Curriculum,
     reference: ValidatablePlan,
-):
+) -> Curriculum:
     """
-    Update the filler equivalences in `curriculum` to match choices in `reference`.
+    Get a copy of `curriculum` with its filler equivalences updated to match choices in
+    `reference`.
 
     Context: When the user changes their curriculum spec (eg. changes major), we'd like
     to keep as many choices that the user took as possible.
@@ -374,10 +397,11 @@ def _reselect_equivs(
                     break
 
     # Add extra fillers at the start of the lists
+    # The curriculum is shared, so the new lists go into a copy
     for code, extra in extra_fillers.items():
         if code in curriculum.fillers:
             extra.extend(curriculum.fillers[code])
-        curriculum.fillers[code] = extra
+    return curriculum.with_fillers(extra_fillers)
 
 
 def _compute_courses_to_pass(
@@ -430,9 +454,9 @@ def _get_course_corequirements(
     out: set[str] = set()
     if isinstance(course, EquivalenceId):
         return out
-    info = courseinfo.try_course(course.code)
-    if info is not None:
-        _extract_corequirements(out, info.deps)
+    deps = courseinfo.try_deps(course.code)
+    if deps is not None:
+        _extract_corequirements(out, deps)
     return out
 
 
@@ -482,17 +506,15 @@ def _find_mutual_coreqs(
     return mutual_coreqs
 
 
-def _try_add_course_group(
+def _course_group_fits(
     courseinfo: CourseInfo,
     plan_ctx: ValidationContext,
     courses_to_pass: OrderedDict[int, PseudoCourse],
     course_group: list[int],
 ) -> bool:
     """
-    Attempt to add a group of courses to the last semester of the given plan.
-    Fails if they cannot be added.
-    Assumes all courses in the group are not present in the given plan.
-    Returns `True` if the courses could be added.
+    Check whether a group of courses fits in the last semester of the given plan,
+    considering semestrality and credits but not requirements.
     """
 
     # Bail if the semestrality is wrong for any course (but it could be right in
@@ -502,10 +524,10 @@ def _try_add_course_group(
         if idx not in courses_to_pass:
             continue
         course = courses_to_pass[idx]
-        info = courseinfo.try_course(course.code)
-        if info is None:
+        semestrality = courseinfo.try_semestrality(course.code)
+        if semestrality is None:
             continue
-        if not info.semestrality[sem_i % 2] and info.semestrality[(sem_i + 1) % 2]:
+        if not semestrality[sem_i % 2] and semestrality[(sem_i + 1) % 2]:
             return False
 
     # Determine total credits of this group
@@ -515,13 +537,29 @@ def _try_add_course_group(
     )
 
     # Bail if there is not enough space in this semester
-    current_credits = plan_ctx.approved_credits[-1]
-    if len(plan_ctx.approved_credits) >= 2:
-        current_credits -= plan_ctx.approved_credits[-2]
-    if current_credits + group_credits > RECOMMENDED_CREDITS_PER_SEMESTER:
+    current_credits = plan_ctx.semester_credits(len(plan_ctx.plan.classes) - 1)
+    return current_credits + group_credits <= RECOMMENDED_CREDITS_PER_SEMESTER
+
+
+def _try_add_course_group(
+    courseinfo: CourseInfo,
+    plan_ctx: ValidationContext,
+    courses_to_pass: OrderedDict[int, PseudoCourse],
+    course_group: list[int],
+) -> bool:
+    """
+    Attempt to add a group of courses to the last semester of the given plan.
+    Fails if they cannot be added.
+    Assumes all courses in the group are not present in the given plan.
+    Returns `True` if the courses could be added.
+    """
+
+    if not _course_group_fits(courseinfo, plan_ctx, courses_to_pass, course_group):
         return False
+    sem_i = len(plan_ctx.plan.classes) - 1
 
     # Temporarily add to plan
+    checkpoint = plan_ctx.checkpoint()
     added_n = 0
     for idx in course_group:
         if idx not in courses_to_pass:
@@ -534,15 +572,13 @@ def _try_add_course_group(
     for idx in course_group:
         if idx not in courses_to_pass:
             continue
-        course = courses_to_pass[idx]
         if not plan_ctx.check_dependencies_for(
             sem_i,
             len(plan_ctx.plan.classes[-1]) - added_n + i,
         ):
             # Requirements are not met
             # Undo changes and cancel
-            for _ in range(added_n):
-                plan_ctx.pop_course()
+            plan_ctx.rollback(checkpoint)
             return False
         i += 1
 
@@ -555,6 +591,177 @@ def _try_add_course_group(
     return True
 
 
+def _extract_requirement_triggers(codes: set[str], expr: Expr) -> bool:
+    """
+    Collect the codes of all course requirements in `expr` into `codes`.
+    Returns whether `expr` has any credit requirement.
+    """
+    if isinstance(expr, ReqCourse):
+        codes.add(expr.code)
+    elif isinstance(expr, MinCredits):
+        return True
+    elif isinstance(expr, And | Or):
+        has_credits = False
+        for child in expr.children:
+            has_credits = _extract_requirement_triggers(codes, child) or has_credits
+        return has_credits
+    return False
+
+
+class PlacementScheduler:
+    """
+    Place pending courses at the end of a plan, semester by semester.
+
+    At each step, the first course in `courses_to_pass` order that can be added to the
+    last semester (along with its mutual corequirements) is added.
+    If no course can be added, a new semester is started.
+
+    Instead of retrying every pending course after each addition, courses that could
+    not be added wait until something that could change the outcome happens:
+    - Courses that do not fit in the semester (because of semestrality or credits) are
+        retried on the next semester, or when their group shrinks.
+    - Courses with unmet requirements are blocked until a course that they require is
+        placed, until credits are approved if they have credit requirements, or until
+        their group shrinks.
+    Courses are retried in priority order, so the resulting plan is the same as if all
+    pending courses were retried after each addition.
+    """
+
+    def __init__(
+        self,
+        courseinfo: CourseInfo,
+        plan_ctx: ValidationContext,
+        courses_to_pass: OrderedDict[int, PseudoCourse],
+        coreq_components: list[list[int]],
+    ) -> None:
+        self.courseinfo = courseinfo
+        self.plan_ctx = plan_ctx
+        self.courses_to_pass = courses_to_pass
+        self.coreq_components = coreq_components
+        # Position of each course in the priority order
+        self.order = {idx: pos for pos, idx in enumerate(courses_to_pass)}
+        # For each course, the courses whose group contains it
+        self.group_watchers: defaultdict[int, list[int]] = defaultdict(list)
+        # For each code, the courses whose group requires it
+        self.req_watchers: defaultdict[str, list[int]] = defaultdict(list)
+        # Courses whose group has credit requirements
+        self.credit_watchers: list[int] = []
+        for idx in courses_to_pass:
+            codes: set[str] = set()
+            has_credits = False
+            for member in coreq_components[idx]:
+                self.group_watchers[member].append(idx)
+                deps = courseinfo.try_deps(courses_to_pass[member].code)
+                if deps is not None:
+                    has_credits = (
+                        _extract_requirement_triggers(codes, deps) or has_credits
+                    )
+            for code in codes:
+                self.req_watchers[code].append(idx)
+            if has_credits:
+                self.credit_watchers.append(idx)
+        # Courses that are waiting to be retried in this semester, in priority order
+        self.queue: list[tuple[int, int]] = []
+        self.queued: set[int] = set()
+        # Courses that are blocked by their requirements
+        self.blocked: set[int] = set()
+        # Codes that were placed in the current semester
+        self.placed_codes: list[str] = []
+
+    def _wake(self, idx: int):
+        if idx in self.courses_to_pass and idx not in self.queued:
+            self.blocked.discard(idx)
+            self.queued.add(idx)
+            heapq.heappush(self.queue, (self.order[idx], idx))
+
+    def _start_semester(self):
+        # Courses placed in the previous semester count as passed from now on
+        for code in self.placed_codes:
+            for watcher in self.req_watchers[code]:
+                self._wake(watcher)
+        self.placed_codes = []
+        credits = self.plan_ctx.approved_credits
+        if len(credits) >= 3 and credits[-2] != credits[-3]:
+            for watcher in self.credit_watchers:
+                self._wake(watcher)
+        for idx in self.courses_to_pass:
+            if idx not in self.blocked:
+                self._wake(idx)
+
+    def _placed(self, group: list[int], group_courses: list[PseudoCourse]):
+        # Wake up the courses that may be affected by this addition
+        for member in group:
+            for watcher in self.group_watchers[member]:
+                self._wake(watcher)
+        for course in group_courses:
+            banner_equivs = self.courseinfo.try_banner_equivs(course.code) or ()
+            for code in (course.code, *banner_equivs):
+                self.placed_codes.append(code)
+                for watcher in self.req_watchers[code]:
+                    self._wake(watcher)
+
+    def fill_semester(self):
+        """
+        Add as many pending courses as possible to the last semester.
+        """
+
+        self._start_semester()
+        courses_to_pass = self.courses_to_pass
+        while self.queue:
+            _pos, idx = heapq.heappop(self.queue)
+            self.queued.discard(idx)
+            if idx not in courses_to_pass:
+                continue
+            group = [m for m in self.coreq_components[idx] if m in courses_to_pass]
+            group_courses = [courses_to_pass[member] for member in group]
+            if not _course_group_fits(
+                self.courseinfo,
+                self.plan_ctx,
+                courses_to_pass,
+                group,
+            ):
+                # Retry on the next semester
+                continue
+            if not _try_add_course_group(
+                self.courseinfo,
+                self.plan_ctx,
+                courses_to_pass,
+                group,
+            ):
+                self.blocked.add(idx)
+                continue
+            self._placed(group, group_courses)
+
+    def run(self):
+        """
+        Place all pending courses, adding semesters as needed.
+        Courses that are placed are removed from `courses_to_pass`.
+        """
+
+        plan_ctx = self.plan_ctx
+        while self.courses_to_pass:
+            self.fill_semester()
+            if not self.courses_to_pass:
+                break
+
+            # We could not add any course, try adding another semester
+            # However, we do not want to enter an infinite loop if nothing can be
+            # added, so only do this if we cannot add courses for 2 empty semesters
+            if (
+                len(plan_ctx.plan.classes) >= 2
+                and not plan_ctx.plan.classes[-1]
+                and not plan_ctx.plan.classes[-2]
+            ):
+                # Stuck :(
+                break
+
+            # Maybe some requirements are not met, maybe the semestrality is wrong,
+            # maybe we reached the credit limit for this semester
+            # Anyway, if we are stuck let's try adding a new semester and see if it
+            # helps
+            plan_ctx.append_semester()
+
+
 async def generate_empty_plan(user: UserKey | None = None) -> ValidatablePlan:
     """
     Generate an empty plan with optional user context.
@@ -598,57 +805,40 @@ async def generate_empty_plan(user: UserKey | None = None) -> ValidatablePlan:
     )
 
 
-class Benchmark:
-    start: float
-    name: str
-
-    def __init__(self, bigname: str) -> None:
-        log.debug("%s:", bigname)
-        self.name = "?"
-        self.start = 0
-
-    def section(self, name: str) -> "Benchmark":
-        self.name = name
-        return self
-
-    def __enter__(self) -> None:
-        self.start = time.monotonic()
-
-    def __exit__(
-        self,
-        exc_type: type[BaseException] | None,
-        exc_value: BaseException | None,
-        exc_trace: TracebackType | None,
-    ) -> None:
-        end = time.monotonic()
-        t = end - self.start
-        log.debug("  %s: %sms", self.name, round(1000 * t, 2))
-
-
 async def generate_recommended_plan(
     passed: ValidatablePlan,
     reference: ValidatablePlan | None = None,
-):
+) -> ValidatablePlan:
     """
     Take a base plan that the user has already passed, and recommend a plan that should
     lead to the user getting the title in whatever major-minor-career they chose.
 
-    NOTE: This function modifies `passed`.
+    The plan is generated in a solver worker, see `build_recommended_plan`.
+    """
+    return await run_job(build_recommended_plan, passed, reference)
+
+
+def build_recommended_plan(
+    passed: ValidatablePlan,
+    reference: ValidatablePlan | None = None,
+) -> ValidatablePlan:
     """
-    b = Benchmark("plan generation")
+    Blocking version of `generate_recommended_plan`, meant to run in a solver worker.
 
-    with b.section("resource lookup"):
-        courseinfo = await course_info()
-        curriculum = await get_curriculum(passed.curriculum)
+    NOTE: This function modifies `passed`.
+    """
+    with span("resource lookup"):
+        courseinfo = loaded_course_info()
+        curriculum = build_curriculum(loaded_curriculum_storage(), passed.curriculum)
 
     # Re-select courses from equivalences using reference plan
-    with b.section("ref reselect"):
+    with span("ref reselect"):
         if reference is not None:
-            _reselect_equivs(courseinfo, curriculum, reference)
+            curriculum = _reselect_equivs(courseinfo, curriculum, reference)
 
     # Solve the curriculum to determine which courses have not been passed yet (and need
     # to be passed)
-    with b.section("solve"):
+    with span("solve"):
         g = solve_curriculum(
             courseinfo,
             passed.curriculum,
@@ -658,7 +848,7 @@ async def generate_recommended_plan(
         )
 
     # Flat list of all curriculum courses left to pass
-    with b.section("courses to pass"):
+    with span("courses to pass"):
         courses_to_pass, ignore_reqs = _compute_courses_to_pass(
             courseinfo,
             g,
@@ -671,50 +861,16 @@ async def generate_recommended_plan(
     plan_ctx.append_semester()
 
     # Precompute corequirements for courses
-    with b.section("coreq"):
+    with span("coreq"):
         coreq_components = _find_mutual_coreqs(courseinfo, courses_to_pass)
 
-    with b.section("placement"):
-        while courses_to_pass:
-            # Attempt to add a single course at the end of the last semester
-
-            # Go in order, attempting to add each course to the semester
-            added_course = False
-            for idx in courses_to_pass:
-                course_group = coreq_components[idx]
-
-                could_add = _try_add_course_group(
-                    courseinfo,
-                    plan_ctx,
-                    courses_to_pass,
-                    course_group,
-                )
-                if could_add:
-                    # Successfully added a course, finish
-                    added_course = True
-                    break
-
-            if added_course:
-                # Made some progress!
-                # Continue adding courses
-                continue
-
-            # We could not add any course, try adding another semester
-            # However, we do not want to enter an infinite loop if nothing can be added,
-            # so only do this if we cannot add courses for 2 empty semesters
-            if (
-                len(plan_ctx.plan.classes) >= 2
-                and not plan_ctx.plan.classes[-1]
-                and not plan_ctx.plan.classes[-2]
-            ):
-                # Stuck :(
-                break
-
-            # Maybe some requirements are not met, maybe the semestrality is wrong,
-            # maybe we reached the credit limit for this semester
-            # Anyway, if we are stuck let's try adding a new semester and see if it
-            # helps
-            plan_ctx.append_semester()
+    with span("placement"):
+        PlacementScheduler(
+            courseinfo,
+            plan_ctx,
+            courses_to_pass,
+            coreq_components,
+        ).run()
 
         # Unwrap plan
         plan = plan_ctx.plan
@@ -730,11 +886,11 @@ async def generate_recommended_plan(
             plan.classes.append(list(courses_to_pass.values()))
 
     # Assign blocks to courses based on the current solution
-    with b.section("recolor"):
+    with span("recolor"):
         g.execute_recolors(plan.classes)
 
     # Order courses by their color (ie. superblock assignment)
-    with b.section("reorder"):
+    with span("reorder"):
         repetition_counter: defaultdict[str, int] = defaultdict(lambda: 0)
         plan.classes = [
             [
@@ -750,4 +906,7 @@ async def generate_recommended_plan(
             for sem in plan.classes
         ]
 
+    # Give the solver back to the pool
+    g.release()
+
     return plan
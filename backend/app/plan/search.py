@@ -0,0 +1,256 @@
+"""
+Search courses in memory, by name, code and other filters.
+
+Course search runs on every keystroke of the course selector, so instead of scanning the
+course table in the database, queries are answered from an index over the loaded
+`CourseInfo`:
+- Text is matched as a substring of the course code, or as substrings of the searchable
+    course name (see `make_searchable_name`).
+    Candidates are found through trigram postings, and then checked against the full
+    strings.
+- The rest of the filters (credits, school, availability, semestrality and equivalence
+    membership) are precomputed bitsets over the course ids of the `CourseStore`, so
+    combining them is just a few bitwise ANDs.
+"""
+
+import itertools
+from array import array
+from collections.abc import Iterable, Iterator, Sequence
+
+from pydantic import BaseModel
+from unidecode import unidecode
+
+from app.plan.courseinfo import (
+    COURSE_AVAILABLE,
+    COURSE_FIRST_SEMESTER,
+    COURSE_SECOND_SEMESTER,
+    CourseInfo,
+    make_searchable_name,
+)
+
+
+def bitset(ids: Iterable[int], size: int) -> int:
+    """
+    Build a bitset over `size` course ids, with the bits of `ids` set.
+    """
+    buf = bytearray((size + 7) // 8)
+    for id in ids:
+        buf[id >> 3] |= 1 << (id & 7)
+    return int.from_bytes(buf, "little")
+
+
+# The positions of the set bits of every byte value
+_BYTE_BITS = [tuple(i for i in range(8) if byte >> i & 1) for byte in range(256)]
+
+
+def iter_bitset(bits: int) -> Iterator[int]:
+    """
+    Iterate over the ids set in a bitset, in increasing order.
+    """
+    data = bits.to_bytes((bits.bit_length() + 7) // 8, "little")
+    for pos, byte in enumerate(data):
+        if byte:
+            base = pos * 8
+            for i in _BYTE_BITS[byte]:
+                yield base + i
+
+
+class _SubstringIndex:
+    """
+    Find the strings that contain a set of substrings, through trigram postings.
+    """
+
+    def __init__(self, strings: list[str]) -> None:
+        self.strings = strings
+        postings: dict[str, array[int]] = {}
+        for id, string in enumerate(strings):
+            for gram in {string[i : i + 3] for i in range(len(string) - 2)}:
+                posting = postings.get(gram)
+                if posting is None:
+                    posting = postings[gram] = array("I")
+                posting.append(id)
+        self._postings = postings
+
+    def containing(self, parts: list[str], allowed: bytes) -> list[int]:
+        """
+        The ids of the strings that contain all of `parts`, in increasing order.
+        Only ids set in the `allowed` bitset are considered.
+        """
+        # Only the strings in the shortest posting can contain all parts
+        candidates: Sequence[int] = range(len(self.strings))
+        for part in parts:
+            for i in range(len(part) - 2):
+                posting = self._postings.get(part[i : i + 3])
+                if posting is None:
+                    return []
+                if len(posting) < len(candidates):
+                    candidates = posting
+        strings = self.strings
+        candidates = [id for id in candidates if allowed[id >> 3] >> (id & 7) & 1]
+        for part in parts:
+            candidates = [id for id in candidates if part in strings[id]]
+        return candidates
+
+
+class CourseSearchIndex:
+    """
+    An index to search the courses of a `CourseInfo`.
+    Filters are expressed as bitsets over course ids, which are combined with `&` and
+    then passed to `search`.
+    """
+
+    def __init__(self, courseinfo: CourseInfo) -> None:
+        self.courseinfo = courseinfo
+        store = courseinfo.store
+        size = len(store)
+        self.size = size
+        # A bitset with every course
+        self.all = (1 << size) - 1
+
+        names: list[str] = []
+        by_credits: dict[int, list[int]] = {}
+        by_school: dict[str, list[int]] = {}
+        # The search keys are stored on their own, so the text of every course is not
+        # decoded just to build the index
+        for id, (name, school) in enumerate(store.search_keys()):
+            # Pad names with spaces, to recognize whole words and word prefixes
+            names.append(f" {name} ")
+            by_credits.setdefault(store.credits(id), []).append(id)
+            by_school.setdefault(school, []).append(id)
+        self._codes = _SubstringIndex(store.codes)
+        self._names = _SubstringIndex(names)
+        self._by_credits = {
+            credits: bitset(ids, size) for credits, ids in by_credits.items()
+        }
+        self._by_school = {
+            school: bitset(ids, size) for school, ids in by_school.items()
+        }
+        self._by_flag = {
+            COURSE_AVAILABLE: bitset(
+                (id for id in range(size) if store.is_available(id)),
+                size,
+            ),
+            COURSE_FIRST_SEMESTER: bitset(
+                (id for id in range(size) if store.semestrality(id)[0]),
+                size,
+            ),
+            COURSE_SECOND_SEMESTER: bitset(
+                (id for id in range(size) if store.semestrality(id)[1]),
+                size,
+            ),
+        }
+        # Equivalences can be huge (eg. OFG has 2000+ courses), so their members are
+        # compiled into bitsets up front
+        self._by_equiv = {
+            code: bitset(
+                (id for id in map(store.course_id, equiv.courses) if id is not None),
+                size,
+            )
+            for code, equiv in courseinfo.equivs.items()
+        }
+
+    def with_credits(self, credits: int) -> int:
+        return self._by_credits.get(credits, 0)
+
+    def with_school(self, school: str) -> int:
+        """
+        The courses whose school contains the given text, ignoring case.
+        """
+        query = unidecode(school).lower()
+        bits = 0
+        for name, courses in self._by_school.items():
+            if query in name.lower():
+                bits |= courses
+        return bits
+
+    def with_flag(self, flag: int, value: bool) -> int:
+        """
+        The courses that have (or don't have) one of the `COURSE_*` flags.
+        """
+        bits = self._by_flag[flag]
+        return bits if value else self.all & ~bits
+
+    def in_equiv(self, code: str) -> int:
+        """
+        The courses that are members of the given equivalence.
+        """
+        return self._by_equiv.get(code, 0)
+
+    def search(self, text: str | None, mask: int, limit: int) -> list[int]:
+        """
+        Find up to `limit` course ids out of the courses in `mask` that match `text`
+        in their code or name.
+        Courses that match by code come first, then courses that match whole words,
+        then word prefixes, and then anywhere in their name.
+        Ties are broken by course id.
+        """
+        search_text = "" if text is None else make_searchable_name(text)
+        if search_text == "":
+            return list(itertools.islice(iter_bitset(mask), limit))
+
+        code_query = search_text.upper()
+        parts = search_text.split()
+        allowed = mask.to_bytes((self.size + 7) // 8, "little")
+        codes = self._codes.strings
+        names = self._names.strings
+        code_matches = self._codes.containing([code_query], allowed)
+        by_code = set(code_matches)
+        ranked = [id for id in code_matches if codes[id].startswith(code_query)]
+        ranked.extend(id for id in code_matches if not codes[id].startswith(code_query))
+        if len(ranked) >= limit:
+            return ranked[:limit]
+        rest = [
+            id for id in self._names.containing(parts, allowed) if id not in by_code
+        ]
+        # Names are padded with spaces, so whole words and word prefixes can be found
+        # as plain substrings
+        whole_words = [f" {part} " for part in parts]
+        word_prefixes = [f" {part}" for part in parts]
+        for patterns in (whole_words, word_prefixes):
+            matching = rest
+            for pattern in patterns:
+                matching = [id for id in matching if pattern in names[id]]
+            ranked.extend(matching)
+            if len(ranked) >= limit:
+                return ranked[:limit]
+            if matching:
+                matched = set(matching)
+                rest = [id for id in rest if id not in matched]
+        ranked.extend(rest)
+        return ranked[:limit]
+
+
+class CourseFilter(BaseModel):
+    # Only allow courses that match the given search string, in name or course code.
+    text: str | None = None
+    # Only allow courses that have the given amount of credits.
+    credits: int | None = None
+    # Only allow courses matching the given school.
+    school: str | None = None
+    # Only allow courses that match the given availability.
+    available: bool | None = None
+    # Only allow courses that are available/unavailable on first semesters.
+    first_semester: bool | None = None
+    # Only allow courses that are available/unavailable on second semesters.
+    second_semester: bool | None = None
+    # Only allow courses that are members of the given equivalence.
+    equiv: str | None = None
+
+    def search(self, index: CourseSearchIndex, limit: int) -> list[int]:
+        """
+        Find the ids of up to `limit` matching courses, best matches first.
+        """
+        mask = index.all
+        if self.credits is not None:
+            mask &= index.with_credits(self.credits)
+        if self.school is not None:
+            mask &= index.with_school(self.school)
+        if self.available is not None:
+            mask &= index.with_flag(COURSE_AVAILABLE, self.available)
+        if self.first_semester is not None:
+            mask &= index.with_flag(COURSE_FIRST_SEMESTER, self.first_semester)
+        if self.second_semester is not None:
+            mask &= index.with_flag(COURSE_SECOND_SEMESTER, self.second_semester)
+        if self.equiv is not None:
+            mask &= index.in_equiv(self.equiv)
+        return index.search(self.text, mask, limit)
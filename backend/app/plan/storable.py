@@ -95,6 +95,7 @@ async def _migrate_v0_0_1(plan: PlanV1) -> ValidatablePlan:
         newplan.classes,
     )
     g.execute_recolors(newplan.classes)
+    g.release()
 
     return newplan
 
@@ -0,0 +1,213 @@
+"""
+Cache plan validation results in Redis.
+
+The frontend revalidates the plan on every edit, and many of these revalidations are
+for a plan that did not actually change (or that changed back to a previous state).
+Validation results only depend on the plan, on some of the student information and on
+the static course and curriculum data, so they are cached under a hash of exactly these
+inputs.
+Because the static data version is part of the key, loading new static data implicitly
+invalidates all previous results, which then simply expire.
+
+The same key (the validation token) is also used to store the curriculum solution of
+each validated plan.
+When the client validates a modified plan, it sends the token of the previous
+validation, and the previous solution is used as a starting point for the solver.
+"""
+
+import hashlib
+import json
+import logging
+import re
+from dataclasses import asdict, dataclass
+from datetime import timedelta
+
+from pydantic import ValidationError
+
+from app.plan.plan import ValidatablePlan
+from app.plan.validation.curriculum.solve import SolutionHint
+from app.plan.validation.diagnostic import ValidationResult
+from app.redis import get_redis
+from app.settings import settings
+from app.user.info import StudentInfo
+from redis.exceptions import RedisError
+
+log = logging.getLogger("validation-cache")
+
+
+@dataclass
+class ValidationCacheStats:
+    """
+    Counters describing how the validation cache has been used since the process
+    started.
+
+    - hits: Validations that were served from the cache.
+    - misses: Validations that were not in the cache.
+    - stores: Validation results that were stored in the cache.
+    - oversized: Validation results that were too large to be cached.
+    - hint_hits: Validations that received a solution hint from a previous validation.
+    - hint_misses: Validations that sent a token, but whose solution hint had expired.
+    - errors: Cache operations that failed because of Redis errors.
+    """
+
+    hits: int = 0
+    misses: int = 0
+    stores: int = 0
+    oversized: int = 0
+    hint_hits: int = 0
+    hint_misses: int = 0
+    errors: int = 0
+
+
+_stats = ValidationCacheStats()
+
+
+def validation_cache_stats() -> ValidationCacheStats:
+    """
+    Get a snapshot of the validation cache counters.
+    """
+    return ValidationCacheStats(**asdict(_stats))
+
+
+def hash_plan(plan: ValidatablePlan) -> str:
+    """
+    Hash the canonical representation of a plan.
+    Plans that are equal produce the same hash.
+    """
+    canonical = plan.json(sort_keys=True, separators=(",", ":"))
+    return hashlib.blake2b(canonical.encode(), digest_size=16).hexdigest()
+
+
+_TOKEN_PATTERN = re.compile(r"[0-9a-f]{32}")
+
+
+def validation_token(
+    plan: ValidatablePlan,
+    user_ctx: StudentInfo | None,
+    data_version: str,
+) -> str:
+    """
+    Compute the token that identifies the validation of `plan` in the context of
+    `user_ctx`.
+    Only the student information that is actually used by the validation is hashed, so
+    that unrelated changes (eg. to the student name) do not invalidate the cache.
+    """
+
+    h = hashlib.blake2b(digest_size=16)
+    h.update(data_version.encode())
+    h.update(hash_plan(plan).encode())
+    if user_ctx is not None:
+        relevant = user_ctx.json(
+            include={
+                "cyear",
+                "reported_major",
+                "reported_minor",
+                "reported_title",
+                "passed_courses",
+                "current_semester",
+                "next_semester",
+            },
+            sort_keys=True,
+            separators=(",", ":"),
+        )
+        h.update(relevant.encode())
+    return h.hexdigest()
+
+
+async def get_cached_validation(token: str) -> ValidationResult | None:
+    """
+    Fetch a cached validation result, if it exists.
+    Redis errors are not fatal, they are treated as cache misses.
+    """
+
+    if settings.validation_cache_expire <= 0:
+        return None
+    try:
+        async with get_redis() as redis:
+            data = await redis.get(f"validation:{token}")
+    except RedisError as err:
+        _stats.errors += 1
+        log.warning("failed to read validation cache: %s", err)
+        return None
+    if data is None:
+        _stats.misses += 1
+        return None
+    try:
+        result = ValidationResult.parse_raw(data)
+    except ValidationError:
+        # Probably stored by an older version of the backend
+        _stats.misses += 1
+        return None
+    _stats.hits += 1
+    return result
+
+
+async def store_cached_validation(token: str, result: ValidationResult):
+    """
+    Store a validation result in the cache, unless it is too large.
+    Redis errors are not fatal, the result is simply not cached.
+    """
+
+    if settings.validation_cache_expire <= 0:
+        return
+    data = result.json()
+    if len(data.encode()) > settings.validation_cache_max_size:
+        _stats.oversized += 1
+        return
+    try:
+        async with get_redis() as redis:
+            await redis.set(
+                f"validation:{token}",
+                data,
+                ex=timedelta(seconds=settings.validation_cache_expire),
+            )
+    except RedisError as err:
+        _stats.errors += 1
+        log.warning("failed to store validation result in cache: %s", err)
+        return
+    _stats.stores += 1
+
+
+async def get_solution_hint(token: str) -> SolutionHint | None:
+    """
+    Fetch the curriculum solution stored under a client-supplied validation token.
+    Invalid or expired tokens are ignored.
+    """
+
+    if settings.validation_cache_expire <= 0 or not _TOKEN_PATTERN.fullmatch(token):
+        return None
+    try:
+        async with get_redis() as redis:
+            data = await redis.get(f"solution:{token}")
+    except RedisError as err:
+        _stats.errors += 1
+        log.warning("failed to read solution hint: %s", err)
+        return None
+    if data is None:
+        _stats.hint_misses += 1
+        return None
+    _stats.hint_hits += 1
+    return json.loads(data)
+
+
+async def store_solution_hint(token: str, hint: SolutionHint):
+    """
+    Store the curriculum solution of a validation, unless it is too large.
+    """
+
+    if settings.validation_cache_expire <= 0:
+        return
+    data = json.dumps(hint, separators=(",", ":"))
+    if len(data.encode()) > settings.validation_cache_max_size:
+        _stats.oversized += 1
+        return
+    try:
+        async with get_redis() as redis:
+            await redis.set(
+                f"solution:{token}",
+                data,
+                ex=timedelta(seconds=settings.validation_cache_expire),
+            )
+    except RedisError as err:
+        _stats.errors += 1
+        log.warning("failed to store solution hint: %s", err)
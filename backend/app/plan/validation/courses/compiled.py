@@ -0,0 +1,143 @@
+"""
+Compile requirement expressions into fast evaluator functions.
+
+`validate.is_satisfied` walks the expression tree and dispatches on the type of every
+node for every check, which adds up when the same requirements are checked over and
+over (eg. while generating a plan).
+Instead, each course's requirements are compiled once into a tree of closures:
+constants are folded away, and course requirements that share a parent are flattened
+into a single loop over `(code, offset)` pairs.
+Compiled evaluators give exactly the same answers as `validate.is_satisfied`.
+"""
+
+from collections.abc import Callable
+from typing import TYPE_CHECKING
+
+from app.plan.validation.courses.logic import (
+    Expr,
+    MinCredits,
+    Operator,
+    ReqCareer,
+    ReqCourse,
+    ReqLevel,
+    ReqProgram,
+    ReqSchool,
+)
+
+if TYPE_CHECKING:
+    from app.plan.validation.courses.validate import ValidationContext
+
+# Check whether some requirements are satisfied by a course placed on the given
+# semester of the plan in the validation context.
+DepsEvaluator = Callable[["ValidationContext", int], bool]
+
+
+def _always(value: bool) -> DepsEvaluator:
+    def evaluate(ctx: "ValidationContext", sem: int) -> bool:
+        return value
+
+    return evaluate
+
+
+def _compile_courses(
+    reqs: tuple[tuple[str, int], ...],
+    neutral: bool,
+) -> DepsEvaluator:
+    # A course requirement is satisfied if the required course is placed before
+    # `sem + offset`, where the offset is 1 for corequirements and 0 otherwise
+    def evaluate(ctx: "ValidationContext", sem: int) -> bool:
+        by_code = ctx.by_code
+        for code, offset in reqs:
+            inst = by_code.get(code)
+            if (inst is not None and inst.sem < sem + offset) != neutral:
+                return not neutral
+        return neutral
+
+    return evaluate
+
+
+def _compile_operator(
+    children: list[DepsEvaluator],
+    neutral: bool,
+) -> DepsEvaluator:
+    def evaluate(ctx: "ValidationContext", sem: int) -> bool:
+        for child in children:
+            if child(ctx, sem) != neutral:
+                return not neutral
+        return neutral
+
+    return evaluate
+
+
+def _compile(expr: Expr) -> DepsEvaluator | bool:
+    """
+    Compile an expression, or reduce it to a constant if its value does not depend on
+    the plan.
+    """
+
+    if isinstance(expr, Operator):
+        neutral = expr.neutral
+        reqs: list[tuple[str, int]] = []
+        children: list[DepsEvaluator] = []
+        for child in expr.children:
+            if isinstance(child, ReqCourse):
+                reqs.append((child.code, 1 if child.coreq else 0))
+                continue
+            compiled = _compile(child)
+            if compiled is neutral:
+                # Has no effect
+                continue
+            if compiled is (not neutral):
+                # Short-circuits the whole operator
+                return not neutral
+            assert not isinstance(compiled, bool)
+            children.append(compiled)
+        if reqs:
+            children.insert(0, _compile_courses(tuple(reqs), neutral))
+        if not children:
+            return neutral
+        if len(children) == 1:
+            return children[0]
+        return _compile_operator(children, neutral)
+    if isinstance(expr, ReqCourse):
+        return _compile_courses(((expr.code, 1 if expr.coreq else 0),), True)
+    if isinstance(expr, MinCredits):
+        min_credits = expr.min_credits
+
+        def min_credits_evaluator(ctx: "ValidationContext", sem: int) -> bool:
+            return ctx.approved_credits[sem] >= min_credits
+
+        return min_credits_evaluator
+    if isinstance(expr, ReqLevel | ReqSchool | ReqProgram | ReqCareer):
+        return _compile_plan_attribute(expr)
+    return expr.value
+
+
+def _compile_plan_attribute(
+    expr: ReqLevel | ReqSchool | ReqProgram | ReqCareer,
+) -> DepsEvaluator:
+    if isinstance(expr, ReqLevel):
+        attr, value = "level", expr.level
+    elif isinstance(expr, ReqSchool):
+        attr, value = "school", expr.school
+    elif isinstance(expr, ReqProgram):
+        attr, value = "program", expr.program
+    else:
+        attr, value = "career", expr.career
+    equal = expr.equal
+
+    def evaluate(ctx: "ValidationContext", sem: int) -> bool:
+        return (getattr(ctx.plan, attr) == value) == equal
+
+    return evaluate
+
+
+def compile_deps(expr: Expr) -> DepsEvaluator:
+    """
+    Compile a requirement expression into an evaluator function.
+    """
+
+    compiled = _compile(expr)
+    if isinstance(compiled, bool):
+        return _always(compiled)
+    return compiled
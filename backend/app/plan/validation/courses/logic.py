@@ -240,12 +240,12 @@ def hash_expr(expr: Expr) -> bytes:
         if isinstance(expr, And):
             h = good_hash(b"y")
             for child in expr.children:
-                h.update(child.hash)
+                h.update(hash_expr(child))
             hash = h.digest()
         elif isinstance(expr, Or):
             h = good_hash(b"o")
             for child in expr.children:
-                h.update(child.hash)
+                h.update(hash_expr(child))
             hash = h.digest()
         elif isinstance(expr, Const):
             h = good_hash(b"one" if expr.value else b"zero")
@@ -284,3 +284,41 @@ def hash_expr(expr: Expr) -> bytes:
     expr.__dict__["hash"] = hash
     assert expr.hash == hash
     return hash
+
+
+# Interned expressions, by hash.
+# Course requirements share many identical subexpressions (eg. `MAT1610`), so interning
+# them keeps a single copy of each distinct subexpression in memory.
+# Only the requirements of the loaded static data are interned, and the table is cleared
+# when new static data is loaded (see `clear_interned`).
+_interned: dict[bytes, "Expr"] = {}
+
+
+def intern_expr(expr: Expr) -> Expr:
+    """
+    Get the canonical instance of this expression, so that structurally equal
+    expressions are the same object.
+    Subexpressions are interned too.
+    Since expressions are immutable, the canonical instance can be shared freely.
+    """
+    h = hash_expr(expr)
+    interned = _interned.get(h)
+    if interned is not None:
+        return interned
+    if isinstance(expr, Operator):
+        children = tuple(intern_expr(child) for child in expr.children)
+        if any(
+            new is not old for new, old in zip(children, expr.children, strict=True)
+        ):
+            expr = type(expr).construct(hash=h, children=children)
+    return _interned.setdefault(h, expr)
+
+
+def clear_interned():
+    """
+    Forget all interned expressions, so that the requirements of old static data can be
+    freed.
+    Expressions that were already interned stay valid, but they are no longer
+    canonical.
+    """
+    _interned.clear()
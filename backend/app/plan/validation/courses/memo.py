@@ -0,0 +1,56 @@
+"""
+Bounded memoization of expensive expression transformations.
+
+Requirement expressions are shared by many courses and recur across many students, so
+the results of transformations like `simplify` and `as_dnf` are memoized, keyed by the
+content hash of their input (see `logic.hash_expr`).
+Expressions are immutable, so memoized results can be shared freely.
+"""
+
+from collections.abc import Callable
+from typing import Any, Generic, TypeVar
+
+from app.lru import LruCache, LruStats
+from app.plan.validation.courses.logic import Expr, hash_expr
+
+T = TypeVar("T")
+
+# Maximum amount of results kept by each memo.
+EXPR_MEMO_SIZE = 4096
+
+
+class ExprMemo(Generic[T]):
+    """
+    A least-recently-used memo of the results of a function over expressions.
+    """
+
+    def __init__(self, name: str, max_size: int = EXPR_MEMO_SIZE) -> None:
+        self.name = name
+        self._results: LruCache[bytes, T] = LruCache(max_size)
+        _memos[name] = self
+
+    def get_or_compute(self, expr: Expr, compute: Callable[[Expr], T]) -> T:
+        """
+        Get the memoized result for `expr`, or compute it with `compute`.
+        """
+
+        key = hash_expr(expr)
+        result = self._results.get(key)
+        if result is None:
+            # `compute` may use this memo recursively
+            result = compute(expr)
+            self._results.put(key, result)
+        return result
+
+    def stats(self) -> LruStats:
+        return self._results.stats()
+
+
+_memos: dict[str, ExprMemo[Any]] = {}
+
+
+def expr_memo_stats() -> dict[str, LruStats]:
+    """
+    Get a snapshot of the counters of every expression memo.
+    """
+    return {name: memo.stats() for name, memo in _memos.items()}
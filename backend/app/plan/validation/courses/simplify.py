@@ -13,7 +13,10 @@ Requirements: MAT1600 o MAT1207 o (Carrera=Ingenieria) o (Carrera=Lic en Fisica)
 In the context of an engineering student: None
 """
 
-from collections.abc import Callable
+import heapq
+import itertools
+from collections import ChainMap
+from collections.abc import Callable, Iterator
 from typing import TypeVar
 
 from app.plan.validation.courses.logic import (
@@ -28,14 +31,44 @@ from app.plan.validation.courses.logic import (
     create_op,
     hash_expr,
 )
+from app.plan.validation.courses.memo import ExprMemo
 
 T = TypeVar("T")
 
 
+# Maximum amount of atoms held across all partial clauses while lazily enumerating a
+# DNF. Bounds the memory used by `iter_dnf` on pathological expressions.
+DNF_ATOM_BUDGET = 200_000
+
+
+class DnfBudgetExceededError(Exception):
+    """
+    Raised by `iter_dnf` when the atom budget runs out before enumeration ends.
+    Unlike running out of clauses, this says nothing about whether the expression is
+    satisfiable.
+    """
+
+
+_simplify_memo: ExprMemo[Expr] = ExprMemo("simplify")
+_dnf_memo: ExprMemo[DnfExpr] = ExprMemo("as_dnf")
+
+
 def simplify(expr: Expr) -> Expr:
     """
     Attempt to simplify this logical expression through logical properties.
+    Results are memoized by expression hash.
     """
+    if not isinstance(expr, Operator):
+        return expr
+    result = _simplify_memo.get_or_compute(expr, _simplify)
+    # Callers detect progress by identity, so an expression that is already simplified
+    # must come back as the same object, even if the memo holds an equal copy
+    if result is not expr and hash_expr(result) == hash_expr(expr):
+        return expr
+    return result
+
+
+def _simplify(expr: Expr) -> Expr:
     while True:
         # Try to simplify using all available methods
         previous = expr
@@ -118,8 +151,15 @@ def as_dnf(expr: Expr) -> DnfExpr:
         (A & B) | (A & C) | (D)
     Useful because then we have several possible "scenarios", each of them being a set
     of assumptions.
+    Results are memoized by expression hash.
     """
+    if not isinstance(expr, Operator):
+        # Just an atom, fit into something like or{and{atom}}
+        return DnfExpr(children=(AndClause(children=(expr,)),))
+    return _dnf_memo.get_or_compute(expr, _as_dnf)
+
 
+def _as_dnf(expr: Expr) -> DnfExpr:
     # We will naively apply distribution:
     # (A | B) & (C | D) <-> A & B | A & C | B & C | B & D
     # Afterwards, we will deduplicate the resulting logical expression
@@ -142,6 +182,124 @@ def as_dnf(expr: Expr) -> DnfExpr:
     return DnfExpr(children=tuple(conjunctions))
 
 
+def _unit_weight(atom: Atom) -> int:
+    return 1
+
+
+def iter_dnf(
+    expr: Expr,
+    weight: Callable[[Atom], int] = _unit_weight,
+    max_clauses: int | None = None,
+    max_atoms: int = DNF_ATOM_BUDGET,
+) -> Iterator[AndClause]:
+    """
+    Lazily enumerate the clauses of the Disjunctive-Normal-Form of an expression, in
+    increasing order of weight (by default, the amount of atoms in the clause).
+    Unlike `as_dnf`, the DNF is never materialized, so callers that only need the
+    lightest clauses can stop early.
+    Constants are resolved instead of being treated as atoms, and clauses that are a
+    superset of a previous clause are skipped.
+
+    Weights must be non-negative.
+    Enumeration stops after yielding `max_clauses` clauses.
+    If the partial clauses explored so far hold `max_atoms` atoms in total before that,
+    `DnfBudgetExceededError` is raised instead (see `greedy_clause` for a fallback).
+    """
+
+    # This is a uniform-cost search over partial clauses.
+    # Each state is a partial clause (a set of atoms) and a stack of expressions that
+    # are still pending to be satisfied. Expanding an `Or` branches into one state per
+    # child, and the weight of a state never decreases as it is expanded, so complete
+    # states are popped in increasing order of weight.
+    # Ties are broken by the amount of atoms, which never decreases either, so that a
+    # clause is always popped before its supersets of equal weight (eg. when some atoms
+    # weigh 0), and the supersets can be skipped.
+    seq = itertools.count()
+    frontier: list[
+        tuple[int, int, int, tuple[Atom, ...], frozenset[bytes], tuple[Expr, ...]]
+    ] = [(0, 0, next(seq), (), frozenset(), (expr,))]
+    yielded: list[frozenset[bytes]] = []
+    while frontier:
+        cost, _, _, atoms, hashes, pending = heapq.heappop(frontier)
+        if not pending:
+            # This clause is complete and no other clause can be lighter
+            if any(hashes.issuperset(prev) for prev in yielded):
+                continue
+            yielded.append(hashes)
+            yield AndClause(children=atoms)
+            if max_clauses is not None and len(yielded) >= max_clauses:
+                return
+            continue
+
+        head, pending = pending[0], pending[1:]
+        if isinstance(head, Or):
+            branches = [(child, *pending) for child in head.children]
+        elif isinstance(head, And):
+            branches = [(*head.children, *pending)]
+        elif isinstance(head, Const):
+            branches = [pending] if head.value else []
+        else:
+            h = hash_expr(head)
+            if h not in hashes:
+                cost += weight(head)
+                atoms = (*atoms, head)
+                hashes = hashes | {h}
+            branches = [pending]
+
+        for branch in branches:
+            max_atoms -= len(atoms) + 1
+            if max_atoms < 0:
+                raise DnfBudgetExceededError
+            heapq.heappush(
+                frontier,
+                (cost, len(atoms), next(seq), atoms, hashes, branch),
+            )
+
+
+def greedy_clause(
+    expr: Expr,
+    weight: Callable[[Atom], int] = _unit_weight,
+) -> AndClause | None:
+    """
+    Find some clause of the Disjunctive-Normal-Form of an expression in linear time, by
+    taking the child of each `Or` that adds the least weight to the atoms chosen so
+    far.
+    The clause is not necessarily the lightest one, but it is only `None` if the
+    expression is unsatisfiable.
+    Used as a fallback when `iter_dnf` runs out of budget.
+    """
+
+    def visit(expr: Expr, chosen: ChainMap[bytes, Atom]) -> dict[bytes, Atom] | None:
+        # Returns the atoms that must be added to `chosen` to satisfy `expr`
+        if isinstance(expr, And):
+            added: dict[bytes, Atom] = {}
+            scope = chosen.new_child(added)
+            for child in expr.children:
+                child_added = visit(child, scope)
+                if child_added is None:
+                    return None
+                added.update(child_added)
+            return added
+        if isinstance(expr, Or):
+            best: dict[bytes, Atom] | None = None
+            best_cost = 0
+            for child in expr.children:
+                child_added = visit(child, chosen)
+                if child_added is None:
+                    continue
+                cost = sum(weight(atom) for atom in child_added.values())
+                if best is None or cost < best_cost:
+                    best, best_cost = child_added, cost
+            return best
+        if isinstance(expr, Const):
+            return {} if expr.value else None
+        h = hash_expr(expr)
+        return {} if h in chosen else {h: expr}
+
+    atoms = visit(expr, ChainMap())
+    return None if atoms is None else AndClause(children=tuple(atoms.values()))
+
+
 def apply_simplification(
     expr: Operator,
     ctx: T,
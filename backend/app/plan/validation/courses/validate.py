@@ -1,3 +1,4 @@
+from array import array
 from collections.abc import Callable
 from dataclasses import dataclass
 
@@ -29,6 +30,7 @@ from app.plan.validation.diagnostic import (
     UnknownCourseErr,
     ValidationResult,
 )
+from app.tracing import traced
 from app.user.info import StudentInfo
 
 # Students can only take this amount of credits if they meet certain criteria.
@@ -56,16 +58,14 @@ class CourseInstance:
     index: int
 
 
-def _get_equivalents(courseinfo: CourseInfo, course: PseudoCourse) -> list[str]:
+def _get_equivalents(
+    courseinfo: CourseInfo,
+    course: PseudoCourse,
+) -> tuple[str, ...]:
     """
     Get all of the course codes that are equivalent to `course`, including itself.
     """
-    info = courseinfo.try_course(course.code)
-    if info is None:
-        return []
-    equiv_codes = info.banner_equivs.copy()
-    equiv_codes.append(course.code)
-    return equiv_codes
+    return courseinfo.try_equivalents(course.code) or ()
 
 
 class ValidationContext:
@@ -75,8 +75,8 @@ class ValidationContext:
     """
 
     # NOTE: When changing the fields of `ValidationContext`, you have to make sure that
-    # `append_semester`, `append_course` and `pop_course` keep the fields properly in
-    # sync.
+    # `append_semester`, `append_course`, `pop_course` and `rollback` keep the fields
+    # properly in sync.
 
     courseinfo: CourseInfo
     # A dictionary from course code to the first time the course appears in the plan.
@@ -85,6 +85,10 @@ class ValidationContext:
     by_code: dict[str, CourseInstance]
     # Map from (semester, index) positions to class ids.
     class_ids: list[list[ClassId]]
+    # Map from (semester, index) positions to the credits of each class.
+    class_credits: list["array[int]"]
+    # How many times each course code appears in the plan.
+    rep_counts: dict[str, int]
     # A list of accumulated total approved credits per semester
     # approved_credits[i] contains the amount of approved credits in the range [0, i)
     approved_credits: list[int]
@@ -97,6 +101,11 @@ class ValidationContext:
     # Should be the first semester that has not yet been taken (ie. the semester after
     # the current one).
     start_validation_from: int
+    # A log of the changes made through `append_semester` and `append_course`, used to
+    # undo them.
+    # Each entry is either `None` for an added semester, or the codes that were added
+    # to `by_code` when adding a course.
+    undo_log: list[tuple[str, ...] | None]
 
     def __init__(
         self,
@@ -114,23 +123,24 @@ class ValidationContext:
                     if code not in self.by_code:
                         self.by_code[code] = course_inst
 
-        # Map from class positions to class ids
-        rep_counts: dict[str, int] = {}
+        # Map from class positions to class ids and credits, and accumulate approved
+        # credits by semester
+        self.rep_counts = {}
         self.class_ids = []
+        self.class_credits = []
+        self.approved_credits = [0]
+        credit_acc = 0
         for sem in plan.classes:
             mapping: list[ClassId] = []
+            sem_credits = array("i")
             for course in sem:
-                rep_idx = rep_counts.get(course.code, 0)
+                rep_idx = self.rep_counts.get(course.code, 0)
                 mapping.append(ClassId(code=course.code, instance=rep_idx))
-                rep_counts[course.code] = rep_idx + 1
+                self.rep_counts[course.code] = rep_idx + 1
+                sem_credits.append(courseinfo.get_credits(course) or 0)
             self.class_ids.append(mapping)
-
-        # Accumulate approved credits by semester
-        self.approved_credits = [0]
-        credit_acc = 0
-        for sem in plan.classes:
-            for course in sem:
-                credit_acc += courseinfo.get_credits(course) or 0
+            self.class_credits.append(sem_credits)
+            credit_acc += sum(sem_credits)
             self.approved_credits.append(credit_acc)
 
         # The first semester where courses have not yet been taken
@@ -140,14 +150,23 @@ class ValidationContext:
         self.courseinfo = courseinfo
         self.plan = plan
         self.user_ctx = user_ctx
+        self.undo_log = []
 
     def append_semester(self):
         """
         Add an empty semester to the plan, updating the validation context.
         """
         self.class_ids.append([])
+        self.class_credits.append(array("i"))
         self.approved_credits.append(self.approved_credits[-1])
         self.plan.classes.append([])
+        self.undo_log.append(None)
+
+    def semester_credits(self, sem: int) -> int:
+        """
+        Get the total amount of credits in the given semester.
+        """
+        return self.approved_credits[sem + 1] - self.approved_credits[sem]
 
     def append_course(self, course: PseudoCourse):
         """
@@ -156,24 +175,26 @@ class ValidationContext:
         assert len(self.plan.classes) > 0
 
         # Get positioning indices
-        rep_idx = 0
-        for sem in self.plan.classes:
-            for c in sem:
-                if c.code == course.code:
-                    rep_idx += 1
+        rep_idx = self.rep_counts.get(course.code, 0)
         sem_idx = len(self.plan.classes) - 1
         order_idx = len(self.plan.classes[-1])
 
         # Actually add course
+        credits = self.courseinfo.get_credits(course) or 0
         self.plan.classes[-1].append(course)
         self.class_ids[-1].append(ClassId(code=course.code, instance=rep_idx))
-        self.approved_credits[-1] += self.courseinfo.get_credits(course) or 0
+        self.class_credits[-1].append(credits)
+        self.rep_counts[course.code] = rep_idx + 1
+        self.approved_credits[-1] += credits
 
         # Update passed codes
         inst = CourseInstance(code=course.code, sem=sem_idx, index=order_idx)
+        added: list[str] = []
         for code in _get_equivalents(self.courseinfo, course):
             if code not in self.by_code:
                 self.by_code[code] = inst
+                added.append(code)
+        self.undo_log.append(tuple(added))
 
     def pop_course(self):
         """
@@ -190,9 +211,16 @@ class ValidationContext:
         # Remove course
         course = self.plan.classes[-1].pop()
         self.class_ids[-1].pop()
-        self.approved_credits[-1] -= self.courseinfo.get_credits(course) or 0
+        self.approved_credits[-1] -= self.class_credits[-1].pop()
+        self.rep_counts[course.code] -= 1
 
         # Update passed codes
+        if self.undo_log and self.undo_log[-1] is not None:
+            # This course was added through `append_course`, so we know exactly which
+            # codes it added
+            for code in self.undo_log.pop():
+                del self.by_code[code]
+            return
         for code in _get_equivalents(self.courseinfo, course):
             inst = self.by_code[code]
             if inst.sem == sem_idx and inst.index == order_idx:
@@ -201,6 +229,28 @@ class ValidationContext:
                 # be no other compatible course
                 del self.by_code[code]
 
+    def checkpoint(self) -> int:
+        """
+        Mark the current state of the plan, so that it can be restored later with
+        `rollback`.
+        """
+        return len(self.undo_log)
+
+    def rollback(self, checkpoint: int):
+        """
+        Undo all semesters and courses added since the given checkpoint was taken.
+        """
+        while len(self.undo_log) > checkpoint:
+            if self.undo_log[-1] is None:
+                assert not self.plan.classes[-1]
+                self.undo_log.pop()
+                self.plan.classes.pop()
+                self.class_ids.pop()
+                self.class_credits.pop()
+                self.approved_credits.pop()
+            else:
+                self.pop_course()
+
     def validate_all_unknown(self, out: ValidationResult):
         """
         Generate a diagnostic if there are unknown courses.
@@ -215,7 +265,7 @@ class ValidationContext:
                     if course.failed is not None:
                         # Ignore failed courses
                         continue
-                    if self.courseinfo.try_course(course.code) is None:
+                    if not self.courseinfo.has_course(course.code):
                         unknown.append(self.class_ids[sem_i][i])
         if unknown:
             out.add(UnknownCourseErr(associated_to=unknown))
@@ -244,14 +294,14 @@ class ValidationContext:
         for sem_i in range(self.start_validation_from, len(self.plan.classes)):
             for i, course in enumerate(self.plan.classes[sem_i]):
                 if isinstance(course, ConcreteId):
-                    info = self.courseinfo.try_course(course.code)
-                    if info is not None:
+                    semestrality = self.courseinfo.try_semestrality(course.code)
+                    if semestrality is not None:
                         if not self.courseinfo.is_available(course.code):
                             # This course is plain unavailable
                             unavailable.append(self.class_ids[sem_i][i])
                         elif (
-                            not info.semestrality[sem_i % 2]
-                            and info.semestrality[(sem_i + 1) % 2]
+                            not semestrality[sem_i % 2]
+                            and semestrality[(sem_i + 1) % 2]
                         ):
                             # This course is only available on the other semester
                             only_on_sem[(sem_i + 1) % 2].append(
@@ -271,9 +321,7 @@ class ValidationContext:
         """
 
         for sem_i in range(self.start_validation_from, len(self.plan.classes)):
-            sem_credits = 0
-            for course in self.plan.classes[sem_i]:
-                sem_credits += self.courseinfo.get_credits(course) or 0
+            sem_credits = self.semester_credits(sem_i)
             if sem_credits > CREDIT_HARD_MAX:
                 out.add(
                     SemesterCreditsDiag(
@@ -314,14 +362,19 @@ class ValidationContext:
                     code = course.code
 
                 # Validate the dependencies for this course
-                info = self.courseinfo.try_course(code)
-                if info is not None:
-                    self.validate_dependencies_for(
-                        out,
-                        CourseInstance(code, sem_i, i),
-                        info.deps,
-                    )
+                # Most requirements are satisfied, so use the fast compiled evaluator
+                # first and only look at the requirements in detail if it fails
+                deps = self.courseinfo.try_deps(code)
+                evaluator = self.courseinfo.try_compiled_deps(code)
+                if deps is None or evaluator is None or evaluator(self, sem_i):
+                    continue
+                self.validate_dependencies_for(
+                    out,
+                    CourseInstance(code, sem_i, i),
+                    deps,
+                )
 
+    @traced()
     def validate_all(self, out: ValidationResult):
         """
         Execute all validations, shoving any diagnostics into `out`.
@@ -411,11 +464,10 @@ class ValidationContext:
         Return "yes" if the course is not a concrete course or is not known.
         """
         course = self.plan.classes[sem][idx]
-        info = self.courseinfo.try_course(course.code)
-        if info is None:
+        evaluator = self.courseinfo.try_compiled_deps(course.code)
+        if evaluator is None:
             return True
-        cl = CourseInstance(course.code, sem, idx)
-        return is_satisfied(self, cl, info.deps)
+        return evaluator(self, sem)
 
     def find_pull_forwards(
         self,
@@ -448,9 +500,9 @@ class ValidationContext:
 
     def map_to_equivalent(self, atom: Atom) -> Atom:
         if isinstance(atom, ReqCourse):
-            info = self.courseinfo.try_course(atom.code)
-            if info is not None and info.canonical_equiv != atom.code:
-                return ReqCourse(code=info.canonical_equiv, coreq=atom.coreq)
+            canonical = self.courseinfo.try_canonical_equiv(atom.code)
+            if canonical is not None and canonical != atom.code:
+                return ReqCourse(code=canonical, coreq=atom.coreq)
         return atom
 
 
@@ -548,9 +600,4 @@ def is_course_indirectly_available(courseinfo: CourseInfo, code: str):
     """
     Check if a course is available OR there is an available equivalent.
     """
-    if courseinfo.is_available(code):
-        return True
-    info = courseinfo.try_course(code)
-    if info is None:
-        return False
-    return courseinfo.is_available(info.canonical_equiv)
+    return courseinfo.is_indirectly_available(code)
@@ -6,8 +6,11 @@ from app.plan.course import EquivalenceId, PseudoCourse
 from app.plan.courseinfo import CourseInfo
 from app.plan.plan import ClassId, ValidatablePlan
 from app.plan.validation.curriculum.solve import (
+    MAX_SWAPOUT_SOLVES,
+    SolutionHint,
     SolvedCurriculum,
     solve_curriculum,
+    swapout_budgets,
 )
 from app.plan.validation.curriculum.tree import Curriculum, CurriculumSpec
 from app.plan.validation.diagnostic import (
@@ -19,6 +22,7 @@ from app.plan.validation.diagnostic import (
     ValidationResult,
 )
 from app.sync.curriculums.storage import CurriculumStorage
+from app.tracing import traced
 from app.user.info import StudentInfo
 
 
@@ -39,38 +43,40 @@ def _check_missing_fillers(
     Returns whether the curriculum is satisfied (ie. if there are no fillers missing).
     """
 
-    satisfied = True
-
-    for usable in g.usable.values():
-        for inst in usable.instances:
-            if not inst.filler or not inst.flow:
-                continue
-
-            options: list[list[PseudoCourse]] = g.find_swapouts(inst)
-
-            # This filler is active, therefore something is missing
-            satisfied = False
-            out.add(
-                CurriculumErr(
-                    blocks=[
-                        [
-                            block.name
-                            for block in layer.active_edge.block_path
-                            if block.name is not None
-                        ]
-                        for layer in inst.layers.values()
-                        if layer.active_edge is not None
-                    ],
-                    credits=inst.flow,
-                    fill_options=[filler for option in options for filler in option],
-                    panacea_recolor_courses=[id for id, _ in panacea_recolors]
-                    if panacea_recolors
-                    else None,
-                    panacea_recolor_blocks=[equiv for _, equiv in panacea_recolors]
-                    if panacea_recolors
-                    else None,
-                ),
-            )
+    active = [
+        inst
+        for usable in g.usable.values()
+        for inst in usable.instances
+        if inst.filler and inst.flow
+    ]
+    # If any filler is active, something is missing
+    satisfied = not active
+
+    # All fillers share the same re-solve budget
+    for inst, max_solves in zip(active, swapout_budgets(len(active)), strict=True):
+        options: list[list[PseudoCourse]] = g.find_swapouts(inst, max_solves)
+
+        out.add(
+            CurriculumErr(
+                blocks=[
+                    [
+                        block.name
+                        for block in layer.active_edge.block_path
+                        if block.name is not None
+                    ]
+                    for layer in inst.layers.values()
+                    if layer.active_edge is not None
+                ],
+                credits=inst.flow,
+                fill_options=[filler for option in options for filler in option],
+                panacea_recolor_courses=[id for id, _ in panacea_recolors]
+                if panacea_recolors
+                else None,
+                panacea_recolor_blocks=[equiv for _, equiv in panacea_recolors]
+                if panacea_recolors
+                else None,
+            ),
+        )
 
     return satisfied
 
@@ -161,6 +167,7 @@ def _diagnose_unknown_spec(
         out.add(UnknownSpecErr(major=major, minor=minor, title=title))
 
 
+@traced()
 def diagnose_curriculum(
     courseinfo: CourseInfo,
     cstore: CurriculumStorage,
@@ -168,7 +175,14 @@ def diagnose_curriculum(
     plan: ValidatablePlan,
     user_ctx: StudentInfo | None,
     out: ValidationResult,
-):
+    hint: SolutionHint | None = None,
+) -> SolutionHint:
+    """
+    Check that the plan fulfills the curriculum, adding diagnostics to `out`.
+    Optionally accepts the solution of a similar plan as a starting point, and returns
+    the solution of this plan.
+    """
+
     # Produce a warning if no major/minor is selected
     _diagnose_major_minor_presence(cstore, plan.curriculum, out)
 
@@ -182,6 +196,7 @@ def diagnose_curriculum(
         curriculum,
         plan.classes,
         user_ctx.current_semester if user_ctx else 0,
+        hint,
     )
 
     # Generate diagnostics
@@ -221,6 +236,14 @@ def diagnose_curriculum(
             superblocks[code].append(superblock)
     out.course_superblocks = superblocks
 
+    # Keep the solution around, so that similar plans can be solved faster
+    solution = g.extract_hint()
+
+    # Give the solver back to the pool
+    g.release()
+
+    return solution
+
 
 def find_swapouts(
     courseinfo: CourseInfo,
@@ -247,4 +270,9 @@ def find_swapouts(
     g = solve_curriculum(courseinfo, plan.curriculum, curriculum, plan.classes)
 
     # Now, get the equivalents for the given class
-    return g.find_swapouts(g.usable[code].instances[instance_idx])
+    swapouts = g.find_swapouts(
+        g.usable[code].instances[instance_idx],
+        MAX_SWAPOUT_SOLVES,
+    )
+    g.release()
+    return swapouts
@@ -0,0 +1,151 @@
+"""
+Keep a pool of reusable solver objects.
+
+Creating a SCIP solver from scratch has a noticeable fixed cost, and every curriculum
+validation needs at least one solver.
+Instead of paying this cost on every request, solvers are checked out from a
+per-process pool, cleared once the solved curriculum is no longer needed, and returned
+to the pool to be reused by the next request.
+"""
+
+import logging
+import threading
+import time
+from dataclasses import asdict, dataclass
+
+from ortools.linear_solver import pywraplp as lmip
+
+from app.settings import settings
+
+log = logging.getLogger("solver-pool")
+
+
+@dataclass
+class SolverPoolStats:
+    """
+    Counters describing how the solver pool has been used since the process started.
+
+    - hits: Checkouts that were served by an idle solver from the pool.
+    - misses: Checkouts that had to construct a new pooled solver.
+    - waits: Checkouts that found the pool exhausted and had to wait for a solver to be
+        returned.
+    - overflows: Checkouts that waited for too long and had to construct a temporary
+        solver outside of the pool.
+    - construction_time: Total time spent constructing solvers, in seconds.
+    - wait_time: Total time spent waiting for solvers to be returned, in seconds.
+    - checked_out: Amount of pooled solvers that are currently in use.
+    - idle: Amount of pooled solvers that are currently waiting to be reused.
+    """
+
+    hits: int = 0
+    misses: int = 0
+    waits: int = 0
+    overflows: int = 0
+    construction_time: float = 0
+    wait_time: float = 0
+    checked_out: int = 0
+    idle: int = 0
+
+
+class SolverPool:
+    """
+    A bounded pool of solver objects.
+
+    At most `max_size` pooled solvers exist at any given time.
+    If all of them are checked out, `checkout` waits up to `wait_timeout` seconds for
+    one to be returned, and if none is returned it constructs a temporary solver that
+    is discarded on `checkin`.
+    This way a leaked solver can never deadlock a request.
+    """
+
+    solver_id: str
+    max_size: int
+    wait_timeout: float
+
+    _idle: list[lmip.Solver]
+    _pooled: set[int]
+    _stats: SolverPoolStats
+    _cond: threading.Condition
+
+    def __init__(self, solver_id: str, max_size: int, wait_timeout: float) -> None:
+        self.solver_id = solver_id
+        self.max_size = max_size
+        self.wait_timeout = wait_timeout
+        self._idle = []
+        self._pooled = set()
+        self._stats = SolverPoolStats()
+        self._cond = threading.Condition()
+
+    def _construct(self) -> lmip.Solver:
+        start = time.monotonic()
+        solver = lmip.Solver.CreateSolver(self.solver_id)
+        self._stats.construction_time += time.monotonic() - start
+        return solver
+
+    def checkout(self) -> lmip.Solver:
+        """
+        Get an empty solver, either from the pool or freshly constructed.
+        The solver must be given back through `checkin` once it is no longer used.
+        """
+
+        with self._cond:
+            if self._idle:
+                self._stats.hits += 1
+                return self._idle.pop()
+            if len(self._pooled) < self.max_size:
+                self._stats.misses += 1
+                solver = self._construct()
+                self._pooled.add(id(solver))
+                return solver
+
+            # The pool is exhausted, wait for some solver to be returned
+            self._stats.waits += 1
+            start = time.monotonic()
+            self._cond.wait_for(lambda: bool(self._idle), timeout=self.wait_timeout)
+            self._stats.wait_time += time.monotonic() - start
+            if self._idle:
+                return self._idle.pop()
+
+            # Waited for too long, use a temporary solver instead
+            self._stats.overflows += 1
+            log.warning(
+                "solver pool exhausted (%s solvers), using a temporary solver",
+                self.max_size,
+            )
+            return self._construct()
+
+    def checkin(self, solver: lmip.Solver):
+        """
+        Return a solver obtained through `checkout`.
+        The solver is reset, so any variables or constraints it contains become invalid.
+        """
+
+        # Reset the solver outside of the lock, since it might take a while
+        solver.Clear()
+        with self._cond:
+            if id(solver) not in self._pooled:
+                # Temporary solver, just drop it
+                return
+            self._idle.append(solver)
+            self._cond.notify()
+
+    def stats(self) -> SolverPoolStats:
+        """
+        Get a snapshot of the pool counters.
+        """
+
+        with self._cond:
+            stats = SolverPoolStats(**asdict(self._stats))
+            stats.idle = len(self._idle)
+            stats.checked_out = len(self._pooled) - len(self._idle)
+            return stats
+
+
+# The solver pool of this process.
+# Each worker process gets its own pool, since solvers cannot be shared across
+# processes.
+solver_pool = SolverPool(
+    "SCIP",
+    max_size=settings.solver_pool_size,
+    wait_timeout=settings.solver_pool_timeout,
+)
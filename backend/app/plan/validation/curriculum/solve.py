@@ -22,6 +22,9 @@ Overview of the flow when solving a curriculum:
     Taken courses, on the other hand, have a low cost.
     Therefore, running min-cost-max-flow tries to fill the network with flow with
     the least cost. That is, the least amount of virtual courses.
+    In general the problem is solved as a mixed integer program, but most networks
+    (those without layers or shared multiplicity groups) are plain network flow
+    problems, and are solved directly with a much faster min-cost flow algorithm.
 6. Once `solve_curriculum` returns, other modules like
     `plan.validation.curriculum.diagnose` analyze which edges have flow in them.
     The courses that supply flow are "active".
@@ -65,6 +68,7 @@ import logging
 from collections import defaultdict
 from dataclasses import dataclass, field
 
+from ortools.graph.python.min_cost_flow import SimpleMinCostFlow
 from ortools.linear_solver import pywraplp as lmip
 
 from app.plan.course import (
@@ -76,6 +80,11 @@ from app.plan.course import (
 )
 from app.plan.courseinfo import CourseInfo
 from app.plan.plan import ClassId
+from app.plan.validation.curriculum.pool import solver_pool
+from app.plan.validation.curriculum.template import (
+    NetworkTemplate,
+    get_network_template,
+)
 from app.plan.validation.curriculum.tree import (
     Block,
     Curriculum,
@@ -84,6 +93,7 @@ from app.plan.validation.curriculum.tree import (
     Leaf,
     Multiplicity,
 )
+from app.tracing import span, traced
 
 # Infinite placeholder.
 # A huge value that still fits in a 64-bit integer.
@@ -118,6 +128,15 @@ COST_PER_RECOLORED_CREDIT = 10**1
 
 IntExpr = int | lmip.LinearExpr
 
+# A previous solution of a curriculum, used as a starting point when solving a similar
+# plan.
+# For each course code, lists the instances of the course in order.
+# For each instance, maps each layer with flow to the flows through each of the block
+# edges in the layer.
+# Because the block edges of a course only depend on the curriculum, the edges of a
+# similar plan come in the same order.
+SolutionHint = dict[str, list[dict[str, list[int]]]]
+
 
 @dataclass
 class BlockEdgeInfo:
@@ -236,25 +255,83 @@ class SolvedCurriculum:
     usable_keys: set[str]
     # Indicates the main superblock that each course counts towards.
     superblocks: dict[str, list[str]]
+    # The amount of flow that must reach the root, if the problem can be solved as a
+    # plain network flow problem.
+    # `None` if the problem must always be solved with the MIP solver.
+    network_demand: int | None
+    # If the last solve was done by the network flow fast path, the flow through each
+    # variable, indexed by `id(var)`.
+    # `None` if the last solve was done by the MIP solver.
+    network_solution: dict[int, int] | None
+    # The capacity-limited flow out of each block, along with the block capacity and
+    # the flows into the block, children-first.
+    block_flows: list[tuple[lmip.Variable, int, list[lmip.LinearExpr]]]
+
+    # Whether the solver was already given back to the solver pool.
+    released: bool
 
     def __init__(self) -> None:
-        # OPTIMIZE: Use a pool for solver objects
-        self.model = lmip.Solver.CreateSolver("SCIP")
+        self.released = True
+        self.model = solver_pool.checkout()
+        self.released = False
         self.model.SetTimeLimit(round(SOLVE_TIMELIMIT * 1000))
         self.usable = {}
         self.usable_keys = set()
         self.superblocks = {}
+        self.network_demand = None
+        self.network_solution = None
+        self.block_flows = []
         self.mapping = {}
 
-    def find_swapouts(self, inst: UsableInstance) -> list[list[PseudoCourse]]:
+    def release(self):
+        """
+        Give the solver back to the solver pool.
+        Must be called once the solved curriculum is no longer needed.
+        Afterwards, only the extracted results (flows, active edges and superblocks) may
+        be used. Re-solving or dumping the graph is no longer possible.
+        """
+        if self.released:
+            return
+        self.released = True
+        solver_pool.checkin(self.model)
+
+    def __del__(self) -> None:
+        # Safety net in case some code path forgets to release the solver (eg. because
+        # of an exception)
+        self.release()
+
+    def extract_hint(self) -> SolutionHint:
+        """
+        Extract the current solution, so that it can be used as a hint to solve similar
+        plans later.
+        """
+        return {
+            code: [
+                {
+                    layer_id: [edge.flow for edge in layer.block_edges]
+                    for layer_id, layer in inst.layers.items()
+                    if layer.active_edge is not None
+                }
+                for inst in usable.instances
+            ]
+            for code, usable in self.usable.items()
+        }
+
+    def find_swapouts(
+        self,
+        inst: UsableInstance,
+        max_solves: int,
+    ) -> list[list[PseudoCourse]]:
         """
         Given an active course (ie. a course that has flow through it in the current
         optimal solution), compute all of the equivalent fillers that could take its
         place (possibly including itself).
+        Alternatives that require rerouting other courses are limited to `max_solves`
+        re-solves (see `MAX_SWAPOUT_SOLVES` and `swapout_budgets`).
         """
 
         assert inst.flow > 0
-        return _explore_options_for(self, inst)
+        return _explore_options_for(self, inst, max_solves)
 
     def forbid_recolor(self) -> bool:
         """
@@ -330,83 +407,88 @@ def _connect_course_instance(
     return flow_var
 
 
-@dataclass
-class VisitState:
-    stack: list[Block] = field(default_factory=list)
-    flat_order: int = 0
+def _needs_recolor(leaf: Leaf, inst: UsableInstance) -> bool:
+    """
+    Courses with an assigned equivalence can just connect to the corresponding block at
+    no extra cost.
+    However, connecting a course with no equivalence, or connecting a course to a block
+    that does not correspond to their equivalence, has some small extra cost and
+    requires permission from the user.
+    """
+    return (
+        leaf.layer == ""
+        and isinstance(inst.original_pseudocourse, ConcreteId)
+        and (
+            inst.original_pseudocourse.equivalence is None
+            or inst.original_pseudocourse.equivalence.code != leaf.list_code
+        )
+    )
 
 
-def _build_visit(
+def _instantiate_template(
     courseinfo: CourseInfo,
     g: SolvedCurriculum,
-    visit_state: VisitState,
-    block: Block,
+    curriculum: Curriculum,
+    template: NetworkTemplate,
 ) -> list[lmip.LinearExpr]:
     """
-    Recursively visit a block of the curriculum tree, building it as we go.
-    Connect all of the children, and then connect this node to `connect_to`.
+    Build the curriculum graph from the compiled network template, connecting the
+    usable courses to the leaves that accept them.
+    Returns the flows that reach the root.
     """
-    visit_state.stack.append(block)
-
-    in_flows: list[lmip.LinearExpr] = []
-    max_in_flow = 0
-    if isinstance(block, Leaf):
-        # A list of courses
-        visit_state.flat_order += 1
-        block_path = tuple(visit_state.stack)
 
-        # Determine which codes can count towards this block
-        usable_codes = block.codes.intersection(g.usable_keys)
-        if block.list_code in g.usable_keys:
-            usable_codes.add(block.list_code)
-
-        # Visit the usable codes
-        for code in usable_codes:
-            for inst in g.usable[code].instances:
-                # Courses with an assigned equivalence can just connect to the
-                # corresponding block at no extra cost
-                # However, connecting a course with no equivalence, or connecting a
-                # course to a block that does not correspond to their equivalence, has
-                # some small extra cost and requires permission from the user
-                needs_recolor = (
-                    block.layer == ""
-                    and isinstance(inst.original_pseudocourse, ConcreteId)
-                    and (
-                        inst.original_pseudocourse.equivalence is None
-                        or inst.original_pseudocourse.equivalence.code
-                        != block.list_code
+    # Determine which codes can count towards each leaf
+    codes_by_leaf: defaultdict[int, list[str]] = defaultdict(list)
+    for code in g.usable:
+        for leaf_idx in template.leaves_by_code.get(code, ()):
+            codes_by_leaf[leaf_idx].append(code)
+
+    # Visit the nodes in post-order, so that children are built before their parents
+    # Nodes with no flow going into them are skipped entirely
+    out_flows: list[list[lmip.LinearExpr]] = []
+    flat_order = 0
+    for node_idx, node in enumerate(template.nodes):
+        block = node.block
+        in_flows: list[lmip.LinearExpr] = []
+        max_in_flow = 0
+        if isinstance(block, Leaf):
+            # A list of courses
+            flat_order += 1
+            block_path = (curriculum.root, *node.path)
+            for code in codes_by_leaf.get(node_idx, ()):
+                for inst in g.usable[code].instances:
+                    child_flow = _connect_course_instance(
+                        courseinfo,
+                        g,
+                        block.layer,
+                        flat_order,
+                        block_path,
+                        inst,
+                        _needs_recolor(block, inst),
                     )
-                )
-                child_flow = _connect_course_instance(
-                    courseinfo,
-                    g,
-                    block.layer,
-                    visit_state.flat_order,
-                    block_path,
-                    inst,
-                    needs_recolor,
-                )
-                in_flows.append(child_flow)
-                max_in_flow += inst.credits
-    else:
-        # A combination of blocks
-        for c in block.children:
-            child_flow = _build_visit(courseinfo, g, visit_state, c)
-            in_flows.extend(child_flow)
-            max_in_flow += c.cap
-
-    visit_state.stack.pop()
-
-    out_flows: list[lmip.LinearExpr] = in_flows
-    if max_in_flow > block.cap:
-        out_flow = g.model.NumVar(0, block.cap, "")
-        # out_flow <= in_flow
-        g.model.Add(
-            out_flow <= g.model.Sum(in_flows),
-        )
-        out_flows = [out_flow]
+                    in_flows.append(child_flow)
+                    max_in_flow += inst.credits
+        else:
+            # A combination of blocks
+            for child_idx in node.children:
+                in_flows.extend(out_flows[child_idx])
+            max_in_flow = node.children_cap
+
+        if in_flows and max_in_flow > block.cap:
+            out_flow = g.model.NumVar(0, block.cap, "")
+            # out_flow <= in_flow
+            g.model.Add(
+                out_flow <= g.model.Sum(in_flows),
+            )
+            g.block_flows.append((out_flow, block.cap, in_flows))
+            in_flows = [out_flow]
+        out_flows.append(in_flows)
 
-    return out_flows
+    # Connect the top-level blocks to the root
+    root_flows: list[lmip.LinearExpr] = []
+    for idx in template.roots:
+        root_flows.extend(out_flows[idx])
+    return root_flows
 
 
 def _add_usable_course(
@@ -454,9 +536,9 @@ def _add_usable_course(
     # Kind of a hack, but works pretty well
     # The curriculum definition must correspondingly also consider
     # 0-credit courses to have 1 ghost credit
-    info = courseinfo.try_course(code)
-    if info is not None:
-        credits = info.credits or 1
+    course_credits = courseinfo.try_course_credits(code)
+    if course_credits is not None:
+        credits = course_credits or 1
     elif isinstance(og_course, EquivalenceId):
         credits = og_course.credits
     else:
@@ -497,7 +579,7 @@ def _fill_usable(
     }
     for sem_i, sem in enumerate(plan):
         for idx, c in enumerate(sem):
-            if courseinfo.try_any(c) is None:
+            if not courseinfo.has_any(c):
                 continue
             _add_usable_course(
                 courseinfo,
@@ -519,6 +601,7 @@ def _fill_usable(
             )
 
 
+@traced()
 def _build_problem(
     courseinfo: CourseInfo,
     curriculum: Curriculum,
@@ -536,9 +619,12 @@ def _build_problem(
 
     # Fill in credit pool from approved courses and filler credits
     _fill_usable(courseinfo, plan_semesters, curriculum, g)
+    if tolerance == 0:
+        g.network_demand = curriculum.root.cap
 
-    # Build curriculum graph from the curriculum tree
-    root_flow = _build_visit(courseinfo, g, VisitState(), curriculum.root)
+    # Build curriculum graph from the precompiled curriculum network
+    template = get_network_template(curriculum)
+    root_flow = _instantiate_template(courseinfo, g, curriculum, template)
 
     # Ensure the maximum amount of flow reaches the root
     g.model.Add(
@@ -658,11 +744,11 @@ def _tag_edge_flow(g: SolvedCurriculum):
     """
     for usable in g.usable.values():
         for inst in usable.instances:
-            inst.flow = round(inst.flow_var.SolutionValue())
+            inst.flow = _solution_value(g, inst.flow_var)
             for layer in inst.layers.values():
                 layer.active_edge = None
                 for edge in layer.block_edges:
-                    edge.flow = round(edge.flow_var.SolutionValue())
+                    edge.flow = _solution_value(g, edge.flow_var)
                     if edge.flow > 0:
                         layer.active_edge = edge
 
@@ -713,6 +799,219 @@ SOLVE_PARAMETERS = lmip.MPSolverParameters()
 # Limit the solving time, since some plans take a loooooong time for some reason
 SOLVE_TIMELIMIT = 1.5
 
+# Maximum amount of re-solves used to look for alternative fillers, across all fillers
+# of a solved curriculum (see `swapout_budgets`).
+# Alternatives that can be read directly off the graph do not count towards this limit.
+MAX_SWAPOUT_SOLVES = 16
+
+
+def swapout_budgets(count: int) -> list[int]:
+    """
+    Split `MAX_SWAPOUT_SOLVES` evenly across `count` fillers that are explored together,
+    so that the fillers explored first cannot use up the budget of the rest.
+    Every filler gets at least one re-solve.
+    """
+    share, extra = divmod(MAX_SWAPOUT_SOLVES, count) if count else (0, 0)
+    return [max(1, share + (i < extra)) for i in range(count)]
+
+
+def _network_course_cap(g: SolvedCurriculum, code: str) -> tuple[bool, int | None]:
+    """
+    Determine how the multiplicity of the course `code` limits its flow.
+    Returns whether the limit can be modeled as a plain network flow, along with the
+    maximum amount of credits that may flow through all instances of the course (or
+    `None` if there is no limit).
+    See `_enforce_multiplicity` for the corresponding MIP constraint.
+    """
+
+    usable = g.usable[code]
+    max_creds = usable.multiplicity.credits
+    if max_creds is None:
+        return True, None
+    group = [ecode for ecode in usable.multiplicity.group if ecode in g.usable]
+    if sum(g.usable[ecode].total for ecode in group) <= max_creds:
+        return True, None
+    if any(ecode != code for ecode in group):
+        # The flow budget is shared across several courses
+        return False, None
+    return True, max_creds if group else None
+
+
+def _solve_as_network_flow(g: SolvedCurriculum) -> int | None:
+    """
+    Solve the problem in `g` as a plain min-cost flow problem, which is much faster
+    than solving it with the MIP solver.
+
+    This only works if there are no layers other than the main one and no shared
+    multiplicity groups, and if the optimal flow does not split any course instance
+    across several blocks.
+    The network flow is a relaxation of the MIP, so if these conditions hold the
+    solution is also optimal for the MIP.
+    Returns `None` if the problem cannot be solved this way, and the MIP solver should
+    be used instead.
+    """
+
+    if g.network_demand is None:
+        return None
+
+    source, sink = 0, 1
+    flow = SimpleMinCostFlow()
+    node_count = 2
+    # Node associated to each block, indexed by `id(block)`
+    block_nodes: dict[int, int] = {}
+    inst_arcs: list[tuple[UsableInstance, int, list[tuple[BlockEdgeInfo, int]]]] = []
+    for code, usable in g.usable.items():
+        is_network, course_cap = _network_course_cap(g, code)
+        if not is_network:
+            return None
+        # Limit the flow through all instances of this course
+        course_node = source
+        if course_cap is not None:
+            course_node = node_count
+            node_count += 1
+            flow.add_arc_with_capacity_and_unit_cost(source, course_node, course_cap, 0)
+        for inst in usable.instances:
+            if any(layer_id != "" for layer_id in inst.layers):
+                return None
+            inst_node = node_count
+            node_count += 1
+            inst_arc = flow.add_arc_with_capacity_and_unit_cost(
+                course_node,
+                inst_node,
+                round(inst.flow_var.Ub()),
+                inst.cost_per_credit,
+            )
+            edge_arcs: list[tuple[BlockEdgeInfo, int]] = []
+            for edge in inst.layers[""].block_edges if "" in inst.layers else []:
+                # Create the nodes for the blocks in the path, connecting them all the
+                # way to the sink
+                parent_node = sink
+                for block in edge.block_path:
+                    if id(block) not in block_nodes:
+                        block_nodes[id(block)] = node_count
+                        node_count += 1
+                        flow.add_arc_with_capacity_and_unit_cost(
+                            block_nodes[id(block)],
+                            parent_node,
+                            block.cap,
+                            0,
+                        )
+                    parent_node = block_nodes[id(block)]
+                edge_arc = flow.add_arc_with_capacity_and_unit_cost(
+                    inst_node,
+                    parent_node,
+                    round(edge.flow_var.Ub()),
+                    COST_PER_RECOLORED_CREDIT if edge.needs_recolor else 0,
+                )
+                edge_arcs.append((edge, edge_arc))
+            inst_arcs.append((inst, inst_arc, edge_arcs))
+
+    # All of the flow must reach the root
+    flow.set_node_supply(source, g.network_demand)
+    flow.set_node_supply(sink, -g.network_demand)
+    status = flow.solve()
+    if status == SimpleMinCostFlow.INFEASIBLE:
+        # If the relaxation is infeasible, so is the MIP
+        return lmip.Solver.INFEASIBLE
+    if status != SimpleMinCostFlow.OPTIMAL:
+        return None
+
+    solution = _extract_network_solution(flow, inst_arcs)
+    if solution is None:
+        return None
+    g.network_solution = solution
+    return lmip.Solver.OPTIMAL
+
+
+def _extract_network_solution(
+    flow: SimpleMinCostFlow,
+    inst_arcs: list[tuple[UsableInstance, int, list[tuple[BlockEdgeInfo, int]]]],
+) -> dict[int, int] | None:
+    """
+    Read the flow through each instance and edge variable from a solved network.
+    Returns `None` if some instance was split across several blocks, which is not
+    allowed.
+    """
+
+    solution: dict[int, int] = {}
+    for inst, inst_arc, edge_arcs in inst_arcs:
+        solution[id(inst.flow_var)] = flow.flow(inst_arc)
+        active_edges = 0
+        for edge, edge_arc in edge_arcs:
+            solution[id(edge.flow_var)] = flow.flow(edge_arc)
+            if solution[id(edge.flow_var)] > 0:
+                active_edges += 1
+        if active_edges > 1:
+            return None
+    return solution
+
+
+def _solve(g: SolvedCurriculum) -> int:
+    """
+    Solve the problem in `g`, using the network flow fast path if possible and falling
+    back to the MIP solver otherwise.
+    """
+
+    g.network_solution = None
+    with span("network flow"):
+        status = _solve_as_network_flow(g)
+    if status is None:
+        with span("Solve"):
+            status = g.model.Solve(SOLVE_PARAMETERS)
+    return status
+
+
+def _solution_value(g: SolvedCurriculum, var: lmip.Variable) -> int:
+    """
+    Get the value of a flow variable in the last solution of `g`.
+    """
+
+    if g.network_solution is not None:
+        return g.network_solution[id(var)]
+    return round(var.SolutionValue())
+
+
+def _apply_hint(g: SolvedCurriculum, hint: SolutionHint):
+    """
+    Give the solver a starting solution, taken from the solution of a similar plan.
+    Courses that are not present in the hint are hinted as unused.
+    """
+
+    variables: list[lmip.Variable] = []
+    values: list[float] = []
+    for code, usable in g.usable.items():
+        inst_hints = hint.get(code, [])
+        for inst in usable.instances:
+            layer_hints = (
+                inst_hints[inst.instance_idx]
+                if inst.instance_idx < len(inst_hints)
+                else {}
+            )
+            inst_flow = 0
+            for layer_id, layer in inst.layers.items():
+                flows = layer_hints.get(layer_id, [])
+                if len(flows) != len(layer.block_edges):
+                    # The hint comes from a different curriculum, ignore this layer
+                    flows = [0] * len(layer.block_edges)
+                for edge, flow in zip(layer.block_edges, flows, strict=True):
+                    flow = max(0, min(flow, inst.credits))
+                    variables.extend((edge.flow_var, edge.active_var))
+                    values.extend((flow, 1 if flow > 0 else 0))
+                    inst_flow = max(inst_flow, flow)
+            variables.append(inst.flow_var)
+            values.append(inst_flow)
+
+    # Also hint the flow out of each block, so that the hint is a complete solution
+    # The blocks are visited children-first, so the inflows are always known
+    hinted = {id(var): value for var, value in zip(variables, values, strict=True)}
+    for out_var, cap, in_flows in g.block_flows:
+        value = min(cap, sum(hinted.get(id(in_flow), 0) for in_flow in in_flows))
+        hinted[id(out_var)] = value
+        variables.append(out_var)
+        values.append(value)
+
+    g.model.SetHint(variables, values)
+
 
 def solve_curriculum(
     courseinfo: CourseInfo,
@@ -720,6 +1019,7 @@ def solve_curriculum(
     curriculum: Curriculum,
     plan: list[list[PseudoCourse]],
     plan_boundary: int = 0,
+    hint: SolutionHint | None = None,
 ) -> SolvedCurriculum:
     """
     Solve the given plan against the given curriculum.
@@ -727,13 +1027,19 @@ def solve_curriculum(
     Optionally accepts a plan boundary, that specifies the number of semesters that
     should be considered as passed and immutable.
 
+    Optionally accepts the solution of a similar plan (see
+    `SolvedCurriculum.extract_hint`), which is used as a starting point for the solver.
+    Small changes to a plan can be solved much faster this way.
+
     This function does **not** modify `plan`.
     """
 
     # Take the curriculum blueprint, and produce a graph for this student
     g = _build_problem(courseinfo, curriculum, plan, plan_boundary)
+    if hint is not None:
+        _apply_hint(g, hint)
     # Solve the integer optimization problem
-    solve_status = g.model.Solve(SOLVE_PARAMETERS)
+    solve_status = _solve(g)
     if not (
         solve_status == lmip.Solver.OPTIMAL or solve_status == lmip.Solver.FEASIBLE
     ):
@@ -745,6 +1051,7 @@ def solve_curriculum(
             logging.debug("searching for minimum relaxation to make it feasible...")
             tol = "infinite"
             for i in range(1, curriculum.root.cap + 1):
+                g.release()
                 g = _build_problem(
                     courseinfo,
                     curriculum,
@@ -752,7 +1059,7 @@ def solve_curriculum(
                     plan_boundary,
                     tolerance=i,
                 )
-                solve_status_2 = g.model.Solve(SOLVE_PARAMETERS)
+                solve_status_2 = _solve(g)
                 if (
                     solve_status_2 == lmip.Solver.OPTIMAL
                     or solve_status_2 == lmip.Solver.FEASIBLE
@@ -763,6 +1070,7 @@ def solve_curriculum(
             logging.debug(
                 f"solvable with tolerance {tol}:\n{g.dump_graphviz_debug(curriculum)}",
             )
+        g.release()
         raise Exception(
             f"failed to solve {spec}: {_solver_status_to_name[solve_status]}",
         )
@@ -854,7 +1162,7 @@ def _resolve_with_fixed_colors(g: SolvedCurriculum) -> bool:
                         edge.active_var.SetUb(0)
                         edge.flow_var.SetUb(0)
     # Re-solve model
-    solve_status = g.model.Solve(SOLVE_PARAMETERS)
+    solve_status = _solve(g)
     if not (
         solve_status == lmip.Solver.OPTIMAL or solve_status == lmip.Solver.FEASIBLE
     ):
@@ -880,42 +1188,105 @@ def _resolve_with_fixed_colors(g: SolvedCurriculum) -> bool:
     return new_taken > old_taken or new_fillers > old_fillers
 
 
+def _direct_swapouts(
+    g: SolvedCurriculum,
+    og_inst: UsableInstance,
+) -> list[UsableInstance]:
+    """
+    Find the unused fillers that can take the place of `og_inst` as-is, ie. by feeding
+    the exact same blocks.
+    These alternatives can be read directly off the graph, without re-solving.
+    Returns at most one instance per course code, cheapest first.
+    """
+
+    active_leaves = {
+        layer_id: layer.active_edge.block_path[-1]
+        for layer_id, layer in og_inst.layers.items()
+        if layer.active_edge is not None
+    }
+    if not active_leaves:
+        return []
+
+    found: list[UsableInstance] = []
+    for code, usable in g.usable.items():
+        if code == og_inst.code:
+            continue
+        # Only consider courses that are completely unused, otherwise using them might
+        # require moving their current flow around
+        if any(
+            inst.flow > 0
+            for ecode in usable.multiplicity.group
+            if ecode in g.usable
+            for inst in g.usable[ecode].instances
+        ):
+            continue
+        max_creds = usable.multiplicity.credits
+        if max_creds is not None and og_inst.flow > max_creds:
+            continue
+        for inst in usable.instances:
+            if (
+                inst.filler is None
+                or inst.credits < og_inst.flow
+                or inst.flow_var.Ub() < og_inst.flow
+            ):
+                continue
+            # The instance must be able to feed the same leaf in every active layer
+            if all(
+                layer_id in inst.layers
+                and any(
+                    edge.block_path[-1] is leaf and edge.flow_var.Ub() >= og_inst.flow
+                    for edge in inst.layers[layer_id].block_edges
+                )
+                for layer_id, leaf in active_leaves.items()
+            ):
+                found.append(inst)
+                break
+    found.sort(key=lambda inst: inst.cost_per_credit)
+    return found
+
+
+@traced()
 def _explore_options_for(
     g: SolvedCurriculum,
     og_inst: UsableInstance,
+    max_solves: int,
 ) -> list[list[PseudoCourse]]:
+    """
+    Find the fillers that could take the place of `og_inst`.
+
+    Fillers that can directly replace the instance are read off the graph.
+    Afterwards, the alternatives that require rerouting other courses are found by
+    repeatedly forbidding the known options and re-solving, up to `max_solves` times.
+    """
+
     # Place the options in here
     opts: list[list[PseudoCourse]] = []
     # Place the variables that will need their upperbounds restored in here
     restore: list[tuple[lmip.Variable, float]] = []
 
-    insts: list[tuple[UsableInstance, int]] = [(og_inst, og_inst.flow)]
-    while True:
-        # If this option is a filler, include it in the options
-        if any(inst.filler for inst, _flow in insts):
-            opts.append(
-                [
-                    pseudocourse_with_credits(
-                        inst.filler.course,
-                        flow,
-                    )
-                    for inst, flow in insts
-                    if inst.filler
-                ],
-            )
-
-        # Forbid this courses
-        # Note that not only the active instances are forbidden, but also all of the
-        # instances associated to their courses
-        # These prevents duplicate fillers from showing up in the suggestions
-        courses = {inst.code for inst, _flow in insts}
+    # The original instance is an option itself, if it's a filler
+    if og_inst.filler:
+        opts.append([pseudocourse_with_credits(og_inst.filler.course, og_inst.flow)])
+
+    # Fillers that can directly replace the original instance
+    direct = _direct_swapouts(g, og_inst)
+    for inst in direct:
+        assert inst.filler
+        opts.append([pseudocourse_with_credits(inst.filler.course, og_inst.flow)])
+
+    # Forbid the original course and the direct replacements
+    # Note that not only the active instances are forbidden, but also all of the
+    # instances associated to their courses
+    # These prevents duplicate fillers from showing up in the suggestions
+    courses = {og_inst.code, *(inst.code for inst in direct)}
+    for _ in range(max_solves):
         for code in courses:
             for inst in g.usable[code].instances:
                 restore.append((inst.flow_var, inst.flow_var.Ub()))
                 inst.flow_var.SetUb(0)
 
         # Solve with these new restrictions
-        solve_status = g.model.Solve(SOLVE_PARAMETERS)
+        solve_status = _solve(g)
         if not (
             solve_status == lmip.Solver.OPTIMAL or solve_status == lmip.Solver.FEASIBLE
         ):
@@ -923,14 +1294,30 @@ def _explore_options_for(
             break
 
         # Find which course(s) were used to fill in the gap
-        insts.clear()
+        insts: list[tuple[UsableInstance, int]] = []
         for usable in g.usable.values():
             for inst in usable.instances:
-                flow = round(inst.flow_var.SolutionValue())
+                flow = _solution_value(g, inst.flow_var)
                 if flow > inst.flow:
                     insts.append((inst, flow))
         assert insts
 
+        # If this option is a filler, include it in the options
+        if any(inst.filler for inst, _flow in insts):
+            opts.append(
+                [
+                    pseudocourse_with_credits(
+                        inst.filler.course,
+                        flow,
+                    )
+                    for inst, flow in insts
+                    if inst.filler
+                ],
+            )
+
+        # Forbid these courses in the next iteration
+        courses = {inst.code for inst, _flow in insts}
+
     # Re-enable the killed variables
     for var, ub in restore:
         var.SetUb(ub)
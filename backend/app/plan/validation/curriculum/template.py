@@ -0,0 +1,130 @@
+"""
+Compile curriculum trees into flat, immutable flow-network templates.
+
+The block side of the flow network (block nodes, capacities, leaves and the codes they
+accept) only depends on the curriculum, not on the student.
+Walking the curriculum tree and intersecting the code sets of every leaf on each
+validation is wasteful, so the tree is compiled once into a `NetworkTemplate` and cached
+per curriculum.
+When a plan is validated, `solve._build_problem` instantiates the template by adding
+only the course-instance side of the network.
+"""
+
+from dataclasses import dataclass
+
+from app.lru import LruCache
+from app.plan.validation.curriculum.tree import Block, Curriculum, Leaf
+
+# Maximum amount of compiled templates kept in memory.
+# Each curriculum spec has its own template, and only the popular major/minor/title
+# combinations are expected to stay in the cache.
+TEMPLATE_CACHE_SIZE = 256
+
+
+@dataclass(frozen=True)
+class TemplateNode:
+    """
+    A block of the curriculum tree, flattened into a node of the network template.
+
+    - block: The curriculum block that this node represents.
+    - children: Indices of the child nodes within `NetworkTemplate.nodes`.
+        Empty for leaves.
+    - children_cap: For combinations, the sum of the capacities of all children.
+        If this is not larger than the capacity of the block, the block imposes no
+        restriction and no capacity variable is needed.
+    - path: The path of blocks from the child of the root down to this block.
+        The root itself is not included, since it is rebuilt for every curriculum.
+    """
+
+    block: Block
+    children: tuple[int, ...]
+    children_cap: int
+    path: tuple[Block, ...]
+
+
+@dataclass(frozen=True)
+class NetworkTemplate:
+    """
+    The block side of a curriculum flow network.
+
+    - nodes: All blocks of the curriculum tree except for the root, in post-order.
+        That is, children always come before their parent.
+    - roots: Indices of the nodes that connect directly to the root.
+    - leaves_by_code: For each course code (or list code), the indices of the leaf
+        nodes that accept this code, in tree order.
+    """
+
+    nodes: tuple[TemplateNode, ...]
+    roots: tuple[int, ...]
+    leaves_by_code: dict[str, tuple[int, ...]]
+
+
+def _compile_visit(
+    block: Block,
+    stack: list[Block],
+    nodes: list[TemplateNode],
+    leaves_by_code: dict[str, list[int]],
+) -> int:
+    stack.append(block)
+    children: list[int] = []
+    children_cap = 0
+    if isinstance(block, Leaf):
+        idx = len(nodes)
+        for code in block.codes:
+            leaves_by_code.setdefault(code, []).append(idx)
+        if block.list_code not in block.codes:
+            leaves_by_code.setdefault(block.list_code, []).append(idx)
+    else:
+        for child in block.children:
+            children.append(_compile_visit(child, stack, nodes, leaves_by_code))
+            children_cap += child.cap
+    nodes.append(
+        TemplateNode(
+            block=block,
+            children=tuple(children),
+            children_cap=children_cap,
+            path=tuple(stack),
+        ),
+    )
+    stack.pop()
+    return len(nodes) - 1
+
+
+def compile_network(curriculum: Curriculum) -> NetworkTemplate:
+    """
+    Flatten the curriculum tree into a network template.
+    """
+
+    nodes: list[TemplateNode] = []
+    leaves_by_code: dict[str, list[int]] = {}
+    roots = [
+        _compile_visit(child, [], nodes, leaves_by_code)
+        for child in curriculum.root.children
+    ]
+    return NetworkTemplate(
+        nodes=tuple(nodes),
+        roots=tuple(roots),
+        leaves_by_code={code: tuple(leaves) for code, leaves in leaves_by_code.items()},
+    )
+
+
+_cache: LruCache[tuple[object, ...], NetworkTemplate] = LruCache(TEMPLATE_CACHE_SIZE)
+
+
+def get_network_template(curriculum: Curriculum) -> NetworkTemplate:
+    """
+    Get the compiled network template for a curriculum, compiling it if necessary.
+
+    Curriculums are assembled once per spec (and copied by plan generation), but their
+    blocks are always shared with the curriculum storage, so templates are identified
+    by the spec along with the identity of the top-level blocks.
+    Templates keep their blocks alive, so the identities of cached blocks are never
+    reused.
+    """
+
+    key = (str(curriculum.spec), *(id(child) for child in curriculum.root.children))
+    template = _cache.get(key)
+    if template is None:
+        template = compile_network(curriculum)
+        _cache.put(key, template)
+    return template
@@ -309,12 +309,20 @@ class Curriculum(BaseModel):
             self.fillers.setdefault(code, []).extend(fillers)
         self.multiplicity.update(other.multiplicity)
 
+    def with_fillers(self, fillers: dict[str, list[FillerCourse]]) -> "Curriculum":
+        """
+        Make a copy of this curriculum, with the filler lists of some courses replaced.
+        Everything else is shared with this curriculum, so the copy is cheap, but it
+        must not be modified either.
+        """
+        return self.copy(update={"fillers": {**self.fillers, **fillers}})
+
     def multiplicity_of(self, courseinfo: CourseInfo, course_code: str) -> Multiplicity:
         if course_code in self.multiplicity:
             return self.multiplicity[course_code]
-        info = courseinfo.try_course(course_code)
-        if info is not None:
-            return Multiplicity(group={course_code}, credits=info.credits or 1)
+        credits = courseinfo.try_course_credits(course_code)
+        if credits is not None:
+            return Multiplicity(group={course_code}, credits=credits or 1)
         # TODO: Limit equivalence multiplicity to the total amount of credits in the
         # equivalence.
         # Ideally, we would want to store the total amount of credits in a field in the
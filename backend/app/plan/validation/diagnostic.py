@@ -247,6 +247,10 @@ Diagnostic = Annotated[
 class ValidationResult(BaseModel):
     diagnostics: list[Diagnostic]
     course_superblocks: dict[str, list[str]]
+    # Identifies the curriculum solution of this plan.
+    # Can be sent back when validating a modified version of the plan, so that the
+    # solver starts from this solution.
+    solution_token: str | None = None
 
     @staticmethod
     def empty(plan: ValidatablePlan) -> "ValidationResult":
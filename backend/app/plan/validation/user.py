@@ -81,6 +81,7 @@ def _validate_possibly_outdated(
                         inst.original_pseudocourse,
                         attached_equiv,
                     )
+        g.release()
         replace_with = [fixed_plan[sem] for sem in unsynced_sems]
 
         # Create the warning along with the fixed semesters
@@ -1,26 +1,69 @@
 from app.plan.course import PseudoCourse
 from app.plan.plan import ValidatablePlan
+from app.plan.validation.cache import (
+    get_cached_validation,
+    get_solution_hint,
+    store_cached_validation,
+    store_solution_hint,
+    validation_token,
+)
 from app.plan.validation.courses.validate import ValidationContext
 from app.plan.validation.curriculum.diagnose import diagnose_curriculum, find_swapouts
+from app.plan.validation.curriculum.solve import SolutionHint, solve_curriculum
 from app.plan.validation.diagnostic import ValidationResult
 from app.plan.validation.user import validate_against_owner
-from app.sync import get_curriculum
-from app.sync.database import course_info, curriculum_storage
+from app.sync import build_curriculum
+from app.sync.database import (
+    loaded_course_info,
+    loaded_curriculum_storage,
+    packed_data_version,
+)
 from app.user.info import StudentInfo
+from app.workers import run_job
 
 
 async def diagnose_plan(
     plan: ValidatablePlan,
     user_ctx: StudentInfo | None,
+    hint_token: str | None = None,
 ) -> ValidationResult:
     """
     Validate a career plan, checking that all pending courses can actually be taken
     (ie. validate their dependencies), and also check that if the plan is followed the
     user will get their set major/minor/title degree.
+
+    Results are cached, so validating the same plan again is cheap.
+    If `hint_token` is the `solution_token` of a previous validation of a similar plan,
+    the curriculum solver starts from the previous solution.
+    The validation itself runs in a solver worker.
     """
-    courseinfo = await course_info()
-    cstore = await curriculum_storage()
-    curriculum = await get_curriculum(plan.curriculum)
+    token = validation_token(plan, user_ctx, await packed_data_version())
+    cached = await get_cached_validation(token)
+    if cached is not None:
+        return cached
+    hint = await get_solution_hint(hint_token) if hint_token is not None else None
+
+    out, solution = await run_job(run_diagnose_plan, plan, user_ctx, hint)
+
+    out.solution_token = token
+    await store_solution_hint(token, solution)
+    await store_cached_validation(token, out)
+    return out
+
+
+def run_diagnose_plan(
+    plan: ValidatablePlan,
+    user_ctx: StudentInfo | None,
+    hint: SolutionHint | None,
+) -> tuple[ValidationResult, SolutionHint]:
+    """
+    Blocking part of `diagnose_plan`, meant to run in a solver worker.
+    Returns the validation result along with the curriculum solution.
+    """
+
+    courseinfo = loaded_course_info()
+    cstore = loaded_curriculum_storage()
+    curriculum = build_curriculum(cstore, plan.curriculum)
     out = ValidationResult.empty(plan)
 
     # Validate against user context, if there is any context
@@ -32,16 +75,17 @@ async def diagnose_plan(
     course_ctx.validate_all(out)
 
     # Ensure the given curriculum is fulfilled
-    diagnose_curriculum(
+    solution = diagnose_curriculum(
         courseinfo,
         cstore,
         curriculum,
         plan,
         user_ctx,
         out,
+        hint,
     )
 
-    return out
+    return out, solution
 
 
 async def list_swapouts(
@@ -49,6 +93,41 @@ async def list_swapouts(
     sem_idx: int,
     class_idx: int,
 ) -> list[list[PseudoCourse]]:
-    courseinfo = await course_info()
-    curriculum = await get_curriculum(plan.curriculum)
+    return await run_job(run_list_swapouts, plan, sem_idx, class_idx)
+
+
+def run_list_swapouts(
+    plan: ValidatablePlan,
+    sem_idx: int,
+    class_idx: int,
+) -> list[list[PseudoCourse]]:
+    """
+    Blocking part of `list_swapouts`, meant to run in a solver worker.
+    """
+
+    courseinfo = loaded_course_info()
+    curriculum = build_curriculum(loaded_curriculum_storage(), plan.curriculum)
     return find_swapouts(courseinfo, curriculum, plan, sem_idx, class_idx)
+
+
+async def curriculum_graph(plan: ValidatablePlan, mode: str) -> str:
+    """
+    Solve the curriculum of a plan and dump the solution in Graphviz DOT format.
+    """
+    return await run_job(run_curriculum_graph, plan, mode)
+
+
+def run_curriculum_graph(plan: ValidatablePlan, mode: str) -> str:
+    """
+    Blocking part of `curriculum_graph`, meant to run in a solver worker.
+    """
+
+    courseinfo = loaded_course_info()
+    curriculum = build_curriculum(loaded_curriculum_storage(), plan.curriculum)
+    g = solve_curriculum(courseinfo, plan.curriculum, curriculum, plan.classes)
+    if mode == "debug":
+        dump = g.dump_graphviz_debug(curriculum)
+    else:
+        dump = g.dump_graphviz_pretty(curriculum)
+    g.release()
+    return dump
@@ -1,9 +1,14 @@
+from dataclasses import asdict
+
 from fastapi import APIRouter, Depends, HTTPException
 from prisma.models import (
     AccessLevel as DbAccessLevel,
 )
 
-from app.sync.database import sync_from_external_sources
+from app.plan.validation.cache import validation_cache_stats
+from app.plan.validation.courses.memo import expr_memo_stats
+from app.plan.validation.curriculum.pool import solver_pool
+from app.sync.database import curriculum_storage, sync_from_external_sources
 from app.sync.siding import translate as siding_translate
 from app.user.auth import (
     AccessLevelOverview,
@@ -11,6 +16,7 @@ from app.user.auth import (
     require_admin_auth,
 )
 from app.user.key import Rut
+from app.workers import worker_stats
 
 router = APIRouter(prefix="/admin")
 
@@ -36,6 +42,33 @@ async def sync_database(
     }
 
 
+@router.get("/stats")
+async def view_stats(admin: AdminKey = Depends(require_admin_auth)):
+    """
+    Show the performance counters of the worker process that serves this request.
+    Each worker process keeps its own counters.
+    """
+    return {
+        "solver_pool": asdict(solver_pool.stats()),
+        "validation_cache": asdict(validation_cache_stats()),
+        "expr_memo": {name: asdict(stats) for name, stats in expr_memo_stats().items()},
+        "workers": asdict(worker_stats()),
+    }
+
+
+@router.get("/spec-resolution")
+async def view_spec_resolution(admin: AdminKey = Depends(require_admin_auth)):
+    """
+    Show which major, minor and title curriculums each offered curriculum spec resolves
+    to.
+    """
+    storage = await curriculum_storage()
+    return {
+        spec: resolved._asdict()
+        for spec, resolved in storage.resolution_table().items()
+    }
+
+
 @router.get("/mod", response_model=list[AccessLevelOverview])
 async def view_mods(user: AdminKey = Depends(require_admin_auth)):
     """
@@ -1,19 +1,14 @@
 from fastapi import APIRouter
-from prisma.models import (
-    Course as DbCourse,
-)
-from prisma.types import CourseWhereInput, CourseWhereInputRecursive2
 from pydantic import BaseModel
-from unidecode import unidecode
 
 from app.plan.courseinfo import (
     CourseDetails,
     EquivDetails,
-    make_searchable_name,
 )
+from app.plan.search import CourseFilter
 from app.plan.validation.curriculum.tree import CurriculumSpec
 from app.sync import get_curriculum
-from app.sync.database import course_info
+from app.sync.database import course_info, course_search_index
 
 router = APIRouter(prefix="/course")
 
@@ -27,50 +22,6 @@ class CourseOverview(BaseModel):
     is_available: bool
 
 
-class CourseFilter(BaseModel):
-    # Only allow courses that match the given search string, in name or course code.
-    text: str | None = None
-    # Only allow courses that have the given amount of credits.
-    credits: int | None = None
-    # Only allow courses matching the given school.
-    school: str | None = None
-    # Only allow courses that match the given availability.
-    available: bool | None = None
-    # Only allow courses that are available/unavailable on first semesters.
-    first_semester: bool | None = None
-    # Only allow courses that are available/unavailable on second semesters.
-    second_semester: bool | None = None
-    # Only allow courses that are members of the given equivalence.
-    equiv: str | None = None
-
-    def as_db_filter(self) -> CourseWhereInput:
-        filter = CourseWhereInput()
-        if self.text is not None:
-            search_text = make_searchable_name(self.text)
-            name_parts: list[CourseWhereInputRecursive2] = [
-                {"searchable_name": {"contains": text_part}}
-                for text_part in search_text.split()
-            ]
-            filter["OR"] = [
-                {"code": {"contains": search_text.upper()}},
-                {"AND": name_parts},
-            ]
-        if self.credits is not None:
-            filter["credits"] = self.credits
-        if self.school is not None:
-            ascii_school = unidecode(self.school)
-            filter["school"] = {"contains": ascii_school, "mode": "insensitive"}
-        if self.available is not None:
-            filter["is_available"] = self.available
-        if self.first_semester is not None:
-            filter["semestrality_first"] = self.first_semester
-        if self.second_semester is not None:
-            filter["semestrality_second"] = self.second_semester
-        if self.equiv is not None:
-            filter["equivs"] = {"some": {"equiv_code": self.equiv}}
-        return filter
-
-
 # This should be a GET request, but FastAPI does not support JSON in GET requests
 # easily.
 # See https://github.com/tiangolo/fastapi/discussions/7919
@@ -80,7 +31,22 @@ async def search_course_details(filter: CourseFilter):
     Fetches a list of courses that match the given name (or code),
     credits and school.
     """
-    return await DbCourse.prisma().find_many(where=filter.as_db_filter(), take=50)
+    index = await course_search_index()
+    store = index.courseinfo.store
+    courses: list[CourseOverview] = []
+    for id in filter.search(index, limit=50):
+        text = store.text(id)
+        courses.append(
+            CourseOverview(
+                code=store.codes[id],
+                name=text.name,
+                credits=store.credits(id),
+                school=text.school,
+                area=text.area,
+                is_available=store.is_available(id),
+            ),
+        )
+    return courses
 
 
 # This should be a GET request, but FastAPI does not support JSON in GET requests
@@ -93,13 +59,9 @@ async def search_course_codes(filter: CourseFilter):
     credits and school.
     Returns only the course codes, but allows up to 3000 results.
     """
-    return [
-        c.code
-        for c in await DbCourse.prisma().find_many(
-            where=filter.as_db_filter(),
-            take=3000,
-        )
-    ]
+    index = await course_search_index()
+    store = index.courseinfo.store
+    return [store.codes[id] for id in filter.search(index, limit=3000)]
 
 
 # Again, REST-FastAPI is broken. This should be GET, but the parameters are complex so
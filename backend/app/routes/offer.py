@@ -1,6 +1,4 @@
-import asyncio
-
-from fastapi import APIRouter
+from fastapi import APIRouter, Request, Response
 from prisma.models import (
     Major as DbMajor,
 )
@@ -12,50 +10,50 @@ from prisma.models import (
 )
 from pydantic import BaseModel
 
+from app.sync.curriculums.offer import CachedJson, OfferSnapshot
+from app.sync.database import curriculum_storage, packed_data_version
+
 router = APIRouter(prefix="/offer")
 
+# The offer snapshot, along with the version of the static data it was built from
+_snapshot: tuple[str, OfferSnapshot] | None = None
+
+
+async def _offer_snapshot() -> OfferSnapshot:
+    global _snapshot
+    version = await packed_data_version()
+    if _snapshot is None or _snapshot[0] != version:
+        _snapshot = (version, OfferSnapshot(await curriculum_storage()))
+    return _snapshot[1]
+
+
+def _respond(request: Request, cached: CachedJson) -> Response:
+    # Clients must revalidate, because the offer changes when the static data is synced
+    headers = {"ETag": cached.etag, "Cache-Control": "no-cache"}
+    if cached.matches(request.headers.get("If-None-Match")):
+        return Response(status_code=304, headers=headers)
+    return Response(cached.body, media_type="application/json", headers=headers)
+
 
 @router.get("/major", response_model=list[DbMajor])
-async def get_majors(cyear: str):
+async def get_majors(request: Request, cyear: str):
     """
     Get all the available majors for a given curriculum version (cyear).
     """
-    return await DbMajor.prisma().find_many(
-        where={
-            "cyear": cyear,
-        },
-    )
+    snapshot = await _offer_snapshot()
+    return _respond(request, snapshot.majors(cyear))
 
 
 @router.get("/minor", response_model=list[DbMinor])
-async def get_minors(cyear: str, major_code: str | None = None):
-    if major_code is None:
-        return await DbMinor.prisma().find_many(
-            where={
-                "cyear": cyear,
-            },
-        )
-    return await DbMinor.prisma().query_raw(
-        """
-        SELECT *
-        FROM "Minor", "MajorMinor"
-        WHERE "MajorMinor".minor = "Minor".code
-            AND "MajorMinor".major = $2
-            AND "MajorMinor".cyear = $1
-            AND "Minor".cyear = $1
-        """,
-        cyear,
-        major_code,
-    )
+async def get_minors(request: Request, cyear: str, major_code: str | None = None):
+    snapshot = await _offer_snapshot()
+    return _respond(request, snapshot.minors(cyear, major_code))
 
 
 @router.get("/title", response_model=list[DbTitle])
-async def get_titles(cyear: str):
-    return await DbTitle.prisma().find_many(
-        where={
-            "cyear": cyear,
-        },
-    )
+async def get_titles(request: Request, cyear: str):
+    snapshot = await _offer_snapshot()
+    return _respond(request, snapshot.titles(cyear))
 
 
 class FullOffer(BaseModel):
@@ -65,10 +63,6 @@ class FullOffer(BaseModel):
 
 
 @router.get("/", response_model=FullOffer)
-async def get_offer(cyear: str, major_code: str | None = None):
-    majors, minors, titles = await asyncio.gather(
-        get_majors(cyear),
-        get_minors(cyear, major_code),
-        get_titles(cyear),
-    )
-    return FullOffer(majors=majors, minors=minors, titles=titles)
+async def get_offer(request: Request, cyear: str, major_code: str | None = None):
+    snapshot = await _offer_snapshot()
+    return _respond(request, snapshot.full(cyear, major_code))
@@ -15,10 +15,12 @@ from app.plan.storage import (
     remove_plan,
     store_plan,
 )
-from app.plan.validation.curriculum.solve import solve_curriculum
 from app.plan.validation.diagnostic import ValidationResult
-from app.plan.validation.validate import diagnose_plan, list_swapouts
-from app.sync.database import course_info
+from app.plan.validation.validate import (
+    curriculum_graph,
+    diagnose_plan,
+    list_swapouts,
+)
 from app.user.auth import (
     ModKey,
     UserKey,
@@ -68,17 +70,21 @@ async def empty_guest_plan() -> ValidatablePlan:
 @router.post("/validate", response_model=ValidationResult)
 async def validate_guest_plan(
     plan: ValidatablePlan,
+    hint_token: str | None = None,
     _limited: None = Depends(ratelimit_guest("8/5second")),
 ) -> ValidationResult:
     """
     Validate a plan, generating diagnostics.
+    Optionally, `hint_token` can be the `solution_token` of a previous validation of a
+    similar plan, which speeds up validation.
     """
-    return await diagnose_plan(plan, user_ctx=None)
+    return await diagnose_plan(plan, user_ctx=None, hint_token=hint_token)
 
 
 @router.post("/validate_for", response_model=ValidationResult)
 async def validate_plan_for_user(
     plan: ValidatablePlan,
+    hint_token: str | None = None,
     user: UserKey = Depends(ratelimit_user("7/5second")),
 ) -> ValidationResult:
     """
@@ -87,13 +93,14 @@ async def validate_plan_for_user(
     apply to the particular student.
     """
     user_ctx = await sync.get_student_info(user)
-    return await diagnose_plan(plan, user_ctx)
+    return await diagnose_plan(plan, user_ctx, hint_token)
 
 
 @router.post("/validate_for_any", response_model=ValidationResult)
 async def validate_plan_for_any_user(
     plan: ValidatablePlan,
     user_rut: Rut,
+    hint_token: str | None = None,
     mod: ModKey = Depends(require_mod_auth),
 ) -> ValidationResult:
     """
@@ -102,7 +109,7 @@ async def validate_plan_for_any_user(
     Moderator access is required.
     """
     user_ctx = await sync.get_student_info(mod.as_any_user(user_rut))
-    return await diagnose_plan(plan, user_ctx)
+    return await diagnose_plan(plan, user_ctx, hint_token)
 
 
 @router.post("/swapouts", response_model=list[list[PseudoCourse]])
@@ -135,12 +142,7 @@ async def get_curriculum_validation_graph(
     Get the curriculum validation graph for a certain plan, in Graphviz DOT format.
     Useful for debugging and kind of a bonus easter egg.
     """
-    courseinfo = await course_info()
-    curriculum = await sync.get_curriculum(plan.curriculum)
-    g = solve_curriculum(courseinfo, plan.curriculum, curriculum, plan.classes)
-    if mode == "debug":
-        return g.dump_graphviz_debug(curriculum)
-    return g.dump_graphviz_pretty(curriculum)
+    return await curriculum_graph(plan, mode)
 
 
 @router.post("/generate", response_model=ValidatablePlan)
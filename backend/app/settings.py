@@ -123,6 +123,61 @@ class Settings(BaseSettings):
         "https://github.com/kovaxis/buscacursos-dl/releases/download/universal-5/coursedata.json.xz",
     )
 
+    # Maximum amount of reusable solver objects kept by each worker process.
+    # Validating a plan checks out one solver, so this should be at least as large as
+    # the amount of concurrent validations that a single process runs.
+    solver_pool_size: int = 8
+
+    # Time to wait for a pooled solver to be returned when the pool is exhausted, in
+    # seconds.
+    # After this time a temporary solver is created instead.
+    solver_pool_timeout: float = 0.05
+
+    # Amount of solver worker processes started by each server process.
+    # Curriculum solving runs in these workers, so that slow solves do not block the
+    # event loop.
+    # Each worker holds its own copy of the course and curriculum data.
+    # If 0, solving runs inline, blocking the event loop.
+    solve_workers: int = 1
+
+    # Maximum amount of solving jobs that each server process can have pending at once.
+    # Further requests fail with a 503 error until some of the pending jobs finish.
+    solve_queue_size: int = 32
+
+    # Maximum time to wait for a single solving job, in seconds.
+    # Running jobs cannot be interrupted, so jobs that time out keep counting towards
+    # `solve_queue_size` until they actually finish.
+    solve_job_timeout: float = 30
+
+    # Time to expire cached validation results in seconds.
+    # Results are cached by plan contents, so repeated validations of an unchanged plan
+    # are served from Redis.
+    # The curriculum solution of each validation is also kept for this long, so that
+    # small edits to the plan can be solved starting from the previous solution.
+    # If 0, validation results and solutions are not cached.
+    validation_cache_expire: float = 600
+
+    # Maximum size of a single cached validation result or solution, in bytes.
+    # Larger results are not cached, so that a few huge plans cannot fill up Redis.
+    validation_cache_max_size: int = 64_000
+
+    # Where to store the static data image.
+    # The static course and curriculum data is converted into this file once, and then
+    # every server process maps it instead of parsing its own copy of the data.
+    # It is rebuilt automatically whenever the data in the database changes.
+    static_data_path: Path = Path("static-data.bin")
+
+    # Whether to report how long each part of a request took in the `Server-Timing`
+    # response header.
+    # The header exposes internal section names and timings to every client, so only
+    # enable it while debugging.
+    server_timing: bool = False
+
+    # If set, a timing trace of every request is appended to this file, one OTLP JSON
+    # trace per line.
+    # Useful to find out where the time of a particular slow request went.
+    trace_path: Literal[""] | Path = ""
+
     # Logging level
     log_level: Literal[
         "CRITICAL",
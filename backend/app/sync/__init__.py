@@ -5,15 +5,18 @@ Currently using unofficial sources until we get better API access.
 
 import logging
 from datetime import timedelta
+from threading import Lock
 
 from fastapi import HTTPException
 
+from app.lru import LruCache
 from app.plan.validation.curriculum.tree import (
     Curriculum,
     CurriculumSpec,
 )
 from app.redis import get_redis
 from app.settings import settings
+from app.sync.curriculums.storage import CurriculumStorage
 from app.sync.database import curriculum_storage
 from app.sync.siding import translate as siding_translate
 from app.user.auth import UserKey, allow_force_login
@@ -22,16 +25,68 @@ from app.user.info import StudentInfo
 log = logging.getLogger("sync")
 
 
+# Maximum amount of assembled curriculums kept in memory.
+# Each curriculum spec is assembled once, and only the popular major/minor/title
+# combinations are expected to stay in the cache.
+CURRICULUM_CACHE_SIZE = 256
+
+_curriculum_cache: LruCache[tuple[str | None, ...], Curriculum] = LruCache(
+    CURRICULUM_CACHE_SIZE,
+)
+# The storage that the cached curriculums were assembled from
+_curriculum_cache_storage: CurriculumStorage | None = None
+# Held while checking the storage, so that curriculums of an old storage are never
+# cached after it is replaced
+_curriculum_cache_lock = Lock()
+
+
 async def get_curriculum(spec: CurriculumSpec) -> Curriculum:
     """
     Get the full curriculum definition for a particular curriculum spec.
 
-    NOTE: Some users of this function, in particular `app.plan.generation`, modify the
-    returned `Curriculum`.
-    Therefore, each call to `get_curriculum` should result in a fresh curriculum.
+    NOTE: The returned `Curriculum` is shared by all users of the same spec, so it must
+    not be modified.
+    Users that need a modified curriculum, like `app.plan.generation`, should make a
+    copy-on-write copy through `Curriculum.with_fillers`.
+    """
+
+    return build_curriculum(await curriculum_storage(), spec)
+
+
+def build_curriculum(storage: CurriculumStorage, spec: CurriculumSpec) -> Curriculum:
+    """
+    Synchronous version of `get_curriculum`, taking the curriculum storage explicitly.
+    """
+
+    global _curriculum_cache_storage
+
+    key = (spec.cyear, spec.major, spec.minor, spec.title)
+    with _curriculum_cache_lock:
+        if storage is not _curriculum_cache_storage:
+            # The static data was reloaded
+            _curriculum_cache.clear()
+            _curriculum_cache_storage = storage
+        curriculum = _curriculum_cache.get(key)
+        if curriculum is not None:
+            return curriculum
+
+    curriculum = _assemble_curriculum(storage, spec.copy())
+
+    with _curriculum_cache_lock:
+        if storage is _curriculum_cache_storage:
+            _curriculum_cache.put(key, curriculum)
+    return curriculum
+
+
+def _assemble_curriculum(
+    storage: CurriculumStorage,
+    spec: CurriculumSpec,
+) -> Curriculum:
+    """
+    Merge the major, minor and title of a spec into a single curriculum.
+    The blocks of the merged curriculum are shared with the storage.
     """
 
-    storage = await curriculum_storage()
     out = Curriculum.empty(spec)
 
     # Fetch major (or common plan)
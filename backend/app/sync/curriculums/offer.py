@@ -0,0 +1,139 @@
+"""
+Serve the curriculum offer (majors, minors and titles) straight from memory.
+
+The offer only changes when the static data is synced, but the offer selector fetches it
+on every page load.
+So every response of the `/offer` endpoints is serialized once for each version of the
+static data, and served as is, along with a strong ETag so that clients can revalidate
+for free.
+"""
+
+import json
+from dataclasses import dataclass
+from hashlib import blake2b
+from typing import Any
+
+from app.sync.curriculums.storage import CurriculumStorage, ProgramOffer
+
+
+@dataclass(frozen=True)
+class CachedJson:
+    """
+    A pre-serialized JSON response.
+    """
+
+    body: bytes
+    etag: str
+
+    @staticmethod
+    def of(value: Any) -> "CachedJson":  # noqa: ANN401
+        # Same encoding as FastAPI's `JSONResponse`
+        body = json.dumps(value, ensure_ascii=False, separators=(",", ":")).encode()
+        etag = blake2b(body, digest_size=16).hexdigest()
+        return CachedJson(body=body, etag=f'"{etag}"')
+
+    def matches(self, if_none_match: str | None) -> bool:
+        """
+        Check if the client already has this response, according to the value of its
+        `If-None-Match` header.
+        """
+        if if_none_match is None:
+            return False
+        tags = [tag.strip().removeprefix("W/") for tag in if_none_match.split(",")]
+        return "*" in tags or self.etag in tags
+
+
+def _majors(cyear: str, offer: ProgramOffer) -> list[dict[str, str]]:
+    return [
+        {
+            "cyear": cyear,
+            "code": major.code,
+            "name": major.name,
+            "version": major.version,
+        }
+        for major in offer.major.values()
+    ]
+
+
+def _minors(
+    cyear: str,
+    offer: ProgramOffer,
+    major_code: str | None,
+) -> list[dict[str, str]]:
+    codes = (
+        list(offer.minor)
+        if major_code is None
+        else offer.major_minor.get(major_code, [])
+    )
+    return [
+        {
+            "cyear": cyear,
+            "code": minor.code,
+            "name": minor.name,
+            "version": minor.version,
+            "minor_type": minor.program_type,
+        }
+        for minor in (offer.minor[code] for code in codes if code in offer.minor)
+    ]
+
+
+def _titles(cyear: str, offer: ProgramOffer) -> list[dict[str, str]]:
+    return [
+        {
+            "cyear": cyear,
+            "code": title.code,
+            "name": title.name,
+            "version": title.version,
+            "title_type": title.program_type,
+        }
+        for title in offer.title.values()
+    ]
+
+
+class OfferSnapshot:
+    """
+    The responses of the `/offer` endpoints, for every cyear and major in the offer.
+    Responses for unknown cyears and majors are built on demand and not kept, since
+    they come from user input.
+    """
+
+    def __init__(self, storage: CurriculumStorage) -> None:
+        self._offer = dict(storage.offer)
+        self._majors: dict[str, CachedJson] = {}
+        self._minors: dict[tuple[str, str | None], CachedJson] = {}
+        self._titles: dict[str, CachedJson] = {}
+        self._full: dict[tuple[str, str | None], CachedJson] = {}
+        for cyear, offer in self._offer.items():
+            self._majors[cyear] = CachedJson.of(_majors(cyear, offer))
+            self._titles[cyear] = CachedJson.of(_titles(cyear, offer))
+            for major_code in dict.fromkeys([None, *offer.major, *offer.major_minor]):
+                self._minors[cyear, major_code] = self._build_minors(cyear, major_code)
+                self._full[cyear, major_code] = self._build_full(cyear, major_code)
+
+    def _build_minors(self, cyear: str, major_code: str | None) -> CachedJson:
+        offer = self._offer.get(cyear, ProgramOffer())
+        return CachedJson.of(_minors(cyear, offer, major_code))
+
+    def _build_full(self, cyear: str, major_code: str | None) -> CachedJson:
+        offer = self._offer.get(cyear, ProgramOffer())
+        return CachedJson.of(
+            {
+                "majors": _majors(cyear, offer),
+                "minors": _minors(cyear, offer, major_code),
+                "titles": _titles(cyear, offer),
+            },
+        )
+
+    def majors(self, cyear: str) -> CachedJson:
+        return self._majors.get(cyear) or CachedJson.of([])
+
+    def minors(self, cyear: str, major_code: str | None) -> CachedJson:
+        cached = self._minors.get((cyear, major_code))
+        return cached or self._build_minors(cyear, major_code)
+
+    def titles(self, cyear: str) -> CachedJson:
+        return self._titles.get(cyear) or CachedJson.of([])
+
+    def full(self, cyear: str, major_code: str | None) -> CachedJson:
+        cached = self._full.get((cyear, major_code))
+        return cached or self._build_full(cyear, major_code)
@@ -1,15 +1,77 @@
 from collections import defaultdict
 from collections.abc import Iterator
 from itertools import chain
+from typing import NamedTuple
 
-from pydantic import BaseModel, Field
+from pydantic import BaseModel, Field, PrivateAttr
 
 from app.plan.courseinfo import EquivDetails
 from app.plan.validation.curriculum.tree import Curriculum, CurriculumSpec, Cyear
 
-
-def _try_get(dict: dict[str, Curriculum], spec: CurriculumSpec) -> Curriculum | None:
-    return dict.get(str(spec))
+# A curriculum spec, as a plain (cyear, major, minor, title) tuple.
+SpecKey = tuple[str, str | None, str | None, str | None]
+
+# The specs that are tried, in order, when looking up each part of a curriculum.
+# Specs are derived from the full spec by dropping some of its fields, and are
+# identified by a bitmask of the fields that are kept (see `_with_title`).
+_MAJOR, _MINOR, _TITLE = 4, 2, 1
+_MAJOR_FALLBACKS = (_MAJOR | _MINOR | _TITLE, _MAJOR | _MINOR, _MAJOR | _TITLE, _MAJOR)
+_MINOR_FALLBACKS = (_MAJOR | _MINOR | _TITLE, _MAJOR | _MINOR, _MINOR | _TITLE, _MINOR)
+_TITLE_FALLBACKS = (_MAJOR | _MINOR | _TITLE, _MAJOR | _TITLE, _MINOR | _TITLE, _TITLE)
+
+
+def _spec_name(key: SpecKey) -> str:
+    """
+    The name of a spec, as given by `str(spec)`.
+    """
+    return "-".join(part for part in key if part is not None)
+
+
+def _untitled_names(cyear: str, major: str | None, minor: str | None) -> list[str]:
+    """
+    The names of the specs derived from a spec that keep no title, ordered by the
+    bitmask of the fields they keep.
+    """
+    return [
+        _spec_name((cyear, None, None, None)),
+        _spec_name((cyear, None, minor, None)),
+        _spec_name((cyear, major, None, None)),
+        _spec_name((cyear, major, minor, None)),
+    ]
+
+
+def _with_title(untitled: list[str], title: str | None) -> list[str]:
+    """
+    The names of every spec derived from a spec, indexed by the bitmask of the fields
+    they keep, given the names without a title (see `_untitled_names`).
+    """
+    names = [name for name in untitled for _ in range(2)]
+    if title is not None:
+        for mask in range(_TITLE, 8, 2):
+            names[mask] = f"{names[mask]}-{title}"
+    return names
+
+
+def _first(
+    parts: dict[str, Curriculum],
+    names: list[str],
+    fallbacks: tuple[int, ...],
+) -> str | None:
+    for mask in fallbacks:
+        if names[mask] in parts:
+            return names[mask]
+    return None
+
+
+class ResolvedSpec(NamedTuple):
+    """
+    The names of the major, minor and title curriculums that a spec resolves to, if
+    any.
+    """
+
+    major: str | None
+    minor: str | None
+    title: str | None
 
 
 class ProgramDetails(BaseModel):
@@ -36,47 +98,79 @@ class CurriculumStorage(BaseModel):
     lists: dict[str, EquivDetails] = Field(default_factory=dict)
     must_have_courses: set[str] = Field(default_factory=set)
 
+    # Resolved specs for every combination in the offer, see `build_resolution_table`
+    _resolved: dict[SpecKey, ResolvedSpec] = PrivateAttr(default_factory=dict)
+
+    def _resolve(self, names: list[str]) -> ResolvedSpec:
+        return ResolvedSpec(
+            major=_first(self.majors, names, _MAJOR_FALLBACKS),
+            minor=_first(self.minors, names, _MINOR_FALLBACKS),
+            title=_first(self.titles, names, _TITLE_FALLBACKS),
+        )
+
+    def build_resolution_table(self):
+        """
+        Resolve every combination of major, minor and title in the offer in advance, so
+        that looking up the curriculum parts of a spec is a single dictionary lookup.
+        Specs outside of the offer are still resolved, only slower.
+        """
+        table: dict[SpecKey, ResolvedSpec] = {}
+        # Most combinations resolve to the same parts, so share them
+        interned: dict[ResolvedSpec, ResolvedSpec] = {}
+        for cyear, offer in self.offer.items():
+            titles = [None, *offer.title]
+            for major in [None, *offer.major]:
+                minors = (
+                    offer.minor if major is None else offer.major_minor.get(major, [])
+                )
+                for minor in [None, *minors]:
+                    # The names without a title are shared by all titles
+                    untitled = _untitled_names(cyear, major, minor)
+                    for title in titles:
+                        resolved = self._resolve(_with_title(untitled, title))
+                        table[cyear, major, minor, title] = interned.setdefault(
+                            resolved,
+                            resolved,
+                        )
+        self._resolved = table
+
+    def resolution_table(self) -> dict[str, ResolvedSpec]:
+        """
+        The resolved parts of every spec in the resolution table, by spec name.
+        Useful to check which offered combinations actually have a curriculum.
+        """
+        return {_spec_name(key): resolved for key, resolved in self._resolved.items()}
+
+    def resolve(self, spec: CurriculumSpec) -> ResolvedSpec:
+        resolved = self._resolved.get((spec.cyear, spec.major, spec.minor, spec.title))
+        if resolved is None:
+            untitled = _untitled_names(spec.cyear, spec.major, spec.minor)
+            resolved = self._resolve(_with_title(untitled, spec.title))
+        return resolved
+
     def get_major(self, spec: CurriculumSpec) -> Curriculum | None:
-        if x := _try_get(self.majors, spec):
-            return x
-        if x := _try_get(self.majors, spec.no_title()):
-            return x
-        if x := _try_get(self.majors, spec.no_minor()):
-            return x
-        if x := _try_get(self.majors, spec.no_minor().no_title()):
-            return x
-        return None
+        name = self.resolve(spec).major
+        return None if name is None else self.majors[name]
 
     def get_minor(self, spec: CurriculumSpec) -> Curriculum | None:
-        if x := _try_get(self.minors, spec):
-            return x
-        if x := _try_get(self.minors, spec.no_title()):
-            return x
-        if x := _try_get(self.minors, spec.no_major()):
-            return x
-        if x := _try_get(self.minors, spec.no_major().no_title()):
-            return x
-        return None
+        name = self.resolve(spec).minor
+        return None if name is None else self.minors[name]
 
     def get_title(self, spec: CurriculumSpec) -> Curriculum | None:
-        if x := _try_get(self.titles, spec):
-            return x
-        if x := _try_get(self.titles, spec.no_minor()):
-            return x
-        if x := _try_get(self.titles, spec.no_major()):
-            return x
-        if x := _try_get(self.titles, spec.no_major().no_minor()):
-            return x
-        return None
+        name = self.resolve(spec).title
+        return None if name is None else self.titles[name]
 
     def set_major(self, spec: CurriculumSpec, curr: Curriculum):
         self.majors[str(spec)] = curr
+        self._resolved.clear()
 
     def set_minor(self, spec: CurriculumSpec, curr: Curriculum):
         self.minors[str(spec)] = curr
+        self._resolved.clear()
 
     def set_title(self, spec: CurriculumSpec, curr: Curriculum):
         self.titles[str(spec)] = curr
+        self._resolved.clear()
 
     def all_plans(self) -> Iterator[Curriculum]:
         return chain(self.majors.values(), self.minors.values(), self.titles.values())
@@ -15,7 +15,11 @@ In the future, this info might also include:
 - RamosUC-based metadata
 """
 
+import asyncio
+import fcntl
+import hashlib
 import logging
+from pathlib import Path
 from typing import TYPE_CHECKING
 
 import pydantic
@@ -29,9 +33,13 @@ from prisma.models import PackedData as DbPackedData
 from prisma.models import Title as DbTitle
 
 from app.plan.courseinfo import CourseDetails, CourseInfo, EquivDetails
+from app.plan.search import CourseSearchIndex
+from app.plan.validation.courses.logic import clear_interned
+from app.settings import settings
 from app.sync import buscacursos_dl
 from app.sync.curriculums.collate import collate_plans
 from app.sync.curriculums.storage import CurriculumStorage
+from app.sync.image import StaticImage, open_image, write_image
 
 if TYPE_CHECKING:
     from prisma.types import (
@@ -46,9 +54,35 @@ log = logging.getLogger("db-sync")
 
 _static_course_info: CourseInfo | None = None
 _static_curriculum_storage: CurriculumStorage | None = None
+_static_data_version: str | None = None
+_static_course_search: CourseSearchIndex | None = None
 
 
 async def course_info() -> CourseInfo:
+    return loaded_course_info()
+
+
+async def curriculum_storage() -> CurriculumStorage:
+    return loaded_curriculum_storage()
+
+
+async def course_search_index() -> CourseSearchIndex:
+    """
+    Get the search index over the loaded courses.
+    The index is built the first time it is used, because only the API server needs it
+    (solver workers never search courses).
+    """
+    global _static_course_search
+    if _static_course_search is None:
+        _static_course_search = CourseSearchIndex(loaded_course_info())
+    return _static_course_search
+
+
+def loaded_course_info() -> CourseInfo:
+    """
+    Synchronous version of `course_info`, for code that runs outside of the event loop
+    (eg. solver workers).
+    """
     if _static_course_info is None:
         raise RuntimeError(
             "attempt to use courseinfo before it is loaded from db",
@@ -56,7 +90,11 @@ async def course_info() -> CourseInfo:
     return _static_course_info
 
 
-async def curriculum_storage() -> CurriculumStorage:
+def loaded_curriculum_storage() -> CurriculumStorage:
+    """
+    Synchronous version of `curriculum_storage`, for code that runs outside of the
+    event loop (eg. solver workers).
+    """
     if _static_curriculum_storage is None:
         raise RuntimeError(
             "attempt to use curriculum storage before it is loaded from db",
@@ -64,31 +102,70 @@ async def curriculum_storage() -> CurriculumStorage:
     return _static_curriculum_storage
 
 
+async def packed_data_version() -> str:
+    """
+    Get an identifier for the currently loaded static data.
+    The identifier changes whenever different data is loaded, so it can be used to
+    invalidate anything derived from the static data.
+    """
+    if _static_data_version is None:
+        raise RuntimeError(
+            "attempt to use packed data version before data is loaded from db",
+        )
+    return _static_data_version
+
+
 COURSEDATA_PACK_ID: str = "course-data"
 CURRICULUMS_PACK_ID: str = "curriculum-storage"
 
 
 async def load_packed_data_from_db():
-    global _static_course_info, _static_curriculum_storage
+    """
+    Load the static data into memory.
 
+    The data is read from a shared static data image (see `app.sync.image`), which is
+    only rebuilt from the packed data in the database when the packed data changes.
+    Only one process rebuilds the image at a time, so that starting many server
+    processes does not hammer the database.
+    """
     log.info("loading static data from db to local memory")
+    version = await _packed_data_digest()
+    path = settings.static_data_path
+    image = open_image(path, version)
+    if image is None:
+        with path.with_name(f"{path.name}.lock").open("wb") as lock:
+            await asyncio.to_thread(fcntl.flock, lock, fcntl.LOCK_EX)
+            # Some other process may have built the image while we waited
+            image = open_image(path, version)
+            if image is None:
+                await _build_static_image(path, version)
+                image = open_image(path, version)
+                if image is None:
+                    raise RuntimeError(f"failed to build static data image {path}")
+    else:
+        log.info("  using existing static data image")
+
+    use_static_image(image)
+
+
+def use_static_image(image: StaticImage):
+    """
+    Load the static data from an already opened static data image.
+    """
+    global _static_course_info, _static_curriculum_storage, _static_data_version
+    global _static_course_search
 
-    # Load coursedata
-    log.info("  fetching packed coursedata from db")
-    courses: dict[str, CourseDetails] = pydantic.parse_raw_as(
-        dict[str, CourseDetails],
-        await load_packed(COURSEDATA_PACK_ID),
-    )
+    # Requirements are interned as they are loaded, so drop the ones of the old data
+    clear_interned()
 
-    # Load curriculum data
-    log.info("  fetching packed curriculum data from db")
-    storage: CurriculumStorage = CurriculumStorage.parse_raw(
-        await load_packed(CURRICULUMS_PACK_ID),
-    )
+    # Load curriculum data, resolving the offered curriculum specs in advance
+    storage = CurriculumStorage.parse_raw(image.packed_curriculums)
+    storage.build_resolution_table()
 
     # Save courseinfo in RAM
+    # Courses are decoded lazily from the image
     _static_course_info = CourseInfo(
-        courses=courses,
+        courses=image.courses,
         equivs=storage.lists,
         must_have_courses=storage.must_have_courses,
     )
@@ -96,14 +173,55 @@ async def load_packed_data_from_db():
     # Save curriculum storage in RAM
     _static_curriculum_storage = storage
 
+    # The search index is rebuilt from the new courses when it is next used
+    _static_course_search = None
+
+    # Identify the loaded data, so that caches derived from old data are discarded
+    _static_data_version = image.version
+
     log.info(
         "  loaded %s courses, %s equivalences and %s plans",
-        len(courses),
+        len(image.courses),
         len(storage.lists),
         len(storage.majors) + len(storage.minors) + len(storage.titles),
     )
 
 
+async def _packed_data_digest() -> str:
+    """
+    Identify the current packed data without transferring it out of the database.
+    """
+
+    rows = await DbPackedData.prisma().query_raw(
+        """
+        SELECT id, md5(data) AS digest
+        FROM "PackedData"
+        WHERE id IN ($1, $2)
+        """,
+        COURSEDATA_PACK_ID,
+        CURRICULUMS_PACK_ID,
+    )
+    digests = {row["id"]: row["digest"] for row in rows}
+    version = hashlib.blake2b(digest_size=16)
+    for id in (COURSEDATA_PACK_ID, CURRICULUMS_PACK_ID):
+        if id not in digests:
+            raise NoPackedDataError(
+                f"packed data {id} is missing from database"
+                " (maybe prestartup script was not run?)",
+            )
+        version.update(digests[id].encode())
+    return version.hexdigest()
+
+
+async def _build_static_image(path: Path, version: str):
+    log.info("  fetching packed coursedata from db")
+    packed_courses = await load_packed(COURSEDATA_PACK_ID)
+    log.info("  fetching packed curriculum data from db")
+    packed_curriculums = await load_packed(CURRICULUMS_PACK_ID)
+    log.info("  building static data image at %s", path)
+    write_image(path, version, packed_courses, packed_curriculums)
+
+
 async def sync_from_external_sources(sync_coursedata: bool, sync_curriculum: bool):
     if sync_coursedata:
         log.info("syncing coursedata")
@@ -0,0 +1,259 @@
+"""
+Share the static course and curriculum data between server processes.
+
+Every server process needs the whole course catalog, and parsing it from the packed JSON
+stored in the database is slow and keeps a full copy of every course in each process.
+Instead, the packed data is converted once into a binary image file, which every process
+maps read-only.
+Because the image is memory-mapped, its pages are shared by all processes through the
+OS page cache.
+Courses are exposed as a `CourseStore`: credits and flags are read straight from the
+mapped image, and requirements and texts are only decoded when they are first used.
+
+Image layout (integers are little-endian, every section is padded to 4 bytes):
+- Header: magic, data version, amount of courses and the size of each section.
+- Codes: The course codes, sorted and separated by newlines.
+- Credits: One uint16 per course.
+- Flags: One byte per course, see `app.plan.courseinfo.course_flags`.
+- Equivalents: One line per course, with the canonical equivalent followed by the
+    banner equivalents, separated by tabs.
+- Requirements: `count + 1` uint32 offsets, followed by the JSON requirements of each
+    course.
+- Texts: `count + 1` uint32 offsets, followed by the JSON text fields of each course.
+- Search: One line per course, with its searchable name and its school, separated by a
+    tab (see `app.plan.search`).
+- Curriculums: The packed curriculum storage, as JSON.
+"""
+
+import json
+import mmap
+import os
+import struct
+import sys
+from array import array
+from collections.abc import Sequence
+from pathlib import Path
+from typing import Any
+
+from app.plan.courseinfo import (
+    CourseStore,
+    CourseText,
+    ExprRedefine,
+    course_flags,
+    make_searchable_name,
+)
+from app.plan.validation.courses.logic import intern_expr
+
+MAGIC = b"PLANIMG3"
+_HEADER = struct.Struct("<8s32sIQQQQQQ")
+
+
+def _align(pos: int) -> int:
+    return (pos + 3) & ~3
+
+
+def _uint_array(view: memoryview, typecode: str) -> Sequence[int]:
+    """
+    Read a little-endian array of unsigned integers from the image.
+    On little-endian hosts the integers are read straight from the mapped image, and
+    on big-endian hosts they are copied and swapped.
+    """
+
+    if sys.byteorder == "little":
+        return view.cast(typecode)
+    values = array(typecode)
+    values.frombytes(view)
+    values.byteswap()
+    return values
+
+
+class _BlobTable:
+    """
+    A sequence of variable-length byte strings, stored as offsets followed by data.
+    """
+
+    def __init__(self, buf: mmap.mmap, pos: int, count: int) -> None:
+        self._buf = buf
+        self._offsets = _uint_array(memoryview(buf)[pos : pos + 4 * (count + 1)], "I")
+        self._base = pos + 4 * (count + 1)
+
+    def __getitem__(self, idx: int) -> bytes:
+        start = self._base + self._offsets[idx]
+        end = self._base + self._offsets[idx + 1]
+        return self._buf[start:end]
+
+
+def _load_text(raw: bytes) -> CourseText:
+    name, program, school, area, category = json.loads(raw)
+    return CourseText(name, program, school, area, category)
+
+
+def _load_search_keys(raw: bytes, count: int) -> list[tuple[str, str]]:
+    if not count:
+        return []
+    keys: list[tuple[str, str]] = []
+    for line in raw.decode().split("\n"):
+        name, _, school = line.partition("\t")
+        keys.append((name, school))
+    return keys
+
+
+class StaticImage:
+    """
+    A memory-mapped static data image.
+    """
+
+    version: str
+    courses: CourseStore
+    packed_curriculums: bytes
+
+    def __init__(self, buf: mmap.mmap) -> None:
+        (
+            magic,
+            version,
+            count,
+            codes_len,
+            equivs_len,
+            deps_len,
+            texts_len,
+            search_len,
+            curriculums_len,
+        ) = _HEADER.unpack_from(buf)
+        if magic != MAGIC:
+            raise ValueError("not a static data image")
+        self.version = version.decode()
+        view = memoryview(buf)
+
+        pos = _align(_HEADER.size)
+        codes = buf[pos : pos + codes_len].decode().split("\n") if count else []
+        pos = _align(pos + codes_len)
+        credits = _uint_array(view[pos : pos + 2 * count], "H")
+        pos = _align(pos + 2 * count)
+        flags = view[pos : pos + count]
+        pos = _align(pos + count)
+        equivs = [
+            line.split("\t")
+            for line in buf[pos : pos + equivs_len].decode().split("\n")
+        ]
+        pos = _align(pos + equivs_len)
+        deps = _BlobTable(buf, pos, count)
+        pos = _align(pos + 4 * (count + 1) + deps_len)
+        texts = _BlobTable(buf, pos, count)
+        pos = _align(pos + 4 * (count + 1) + texts_len)
+        search = buf[pos : pos + search_len]
+        pos = _align(pos + search_len)
+        self.packed_curriculums = buf[pos : pos + curriculums_len]
+
+        self.courses = CourseStore(
+            codes=codes,
+            credits=credits,
+            flags=flags,
+            canonical_equivs=[line[0] for line in equivs] if count else [],
+            banner_equivs=[tuple(line[1:]) for line in equivs] if count else [],
+            load_deps=lambda id: intern_expr(
+                ExprRedefine.parse_raw(deps[id]).__root__,
+            ),
+            load_text=lambda id: _load_text(texts[id]),
+            load_search_keys=lambda: _load_search_keys(search, count),
+        )
+
+
+def open_image(path: Path, version: str) -> StaticImage | None:
+    """
+    Map the static data image at `path`.
+    If there is no image, or if it holds a different version of the data, returns
+    `None`.
+    """
+
+    try:
+        with path.open("rb") as file:
+            buf = mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ)
+    except (FileNotFoundError, ValueError):
+        # `mmap` raises `ValueError` for empty files
+        return None
+    try:
+        image = StaticImage(buf)
+    except (ValueError, struct.error):
+        return None
+    if image.version != version:
+        return None
+    return image
+
+
+def _blob_table(blobs: list[bytes]) -> bytes:
+    offsets = [0]
+    for blob in blobs:
+        offsets.append(offsets[-1] + len(blob))
+    return struct.pack(f"<{len(offsets)}I", *offsets) + b"".join(blobs)
+
+
+def write_image(
+    path: Path,
+    version: str,
+    packed_courses: str,
+    packed_curriculums: str,
+):
+    """
+    Build a static data image from the packed data and store it at `path`.
+    The image is replaced atomically, so processes that already mapped an older image
+    are not affected.
+    """
+
+    courses: dict[str, dict[str, Any]] = json.loads(packed_courses)
+    codes = sorted(courses)
+    details = [courses[code] for code in codes]
+    deps = [
+        json.dumps(course["deps"], separators=(",", ":")).encode() for course in details
+    ]
+    texts = [
+        json.dumps(
+            [
+                course["name"],
+                course["program"],
+                course["school"],
+                course["area"],
+                course["category"],
+            ],
+            separators=(",", ":"),
+        ).encode()
+        for course in details
+    ]
+    search_keys = [
+        # Schools are only matched as substrings, so stray separators are dropped
+        make_searchable_name(course["name"]) + "\t" + " ".join(course["school"].split())
+        for course in details
+    ]
+    sections = [
+        "\n".join(codes).encode(),
+        struct.pack(f"<{len(details)}H", *(course["credits"] for course in details)),
+        bytes(
+            course_flags(course["is_available"], course["semestrality"])
+            for course in details
+        ),
+        "\n".join(
+            "\t".join([course["canonical_equiv"], *course["banner_equivs"]])
+            for course in details
+        ).encode(),
+        _blob_table(deps),
+        _blob_table(texts),
+        "\n".join(search_keys).encode(),
+        packed_curriculums.encode(),
+    ]
+    header = _HEADER.pack(
+        MAGIC,
+        version.encode(),
+        len(codes),
+        len(sections[0]),
+        len(sections[3]),
+        sum(len(blob) for blob in deps),
+        sum(len(blob) for blob in texts),
+        len(sections[6]),
+        len(sections[7]),
+    )
+
+    tmp_path = path.with_name(f"{path.name}.{os.getpid()}.tmp")
+    with tmp_path.open("wb") as file:
+        for section in [header, *sections]:
+            file.write(section)
+            file.write(b"\0" * (_align(len(section)) - len(section)))
+    tmp_path.replace(path)
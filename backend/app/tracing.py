@@ -0,0 +1,209 @@
+"""
+Lightweight timing spans, to see where the time of a single request goes.
+
+When enabled, each request handled by the API is traced (see `app.main`): a tree of
+named spans is collected while the request runs, and then it is reported in the
+`Server-Timing` response header (`settings.server_timing`) and/or appended to a local
+trace file (`settings.trace_path`) in OTLP JSON format, which most tracing tools can
+import.
+
+Code marks interesting sections with `span` (or the `traced` decorator).
+Outside of a trace, spans do nothing, so they are cheap to leave in hot code.
+Jobs sent to solver workers are traced in the worker and their spans are sent back
+along with the result (see `run_traced`).
+"""
+
+import functools
+import json
+import re
+import secrets
+import time
+from collections.abc import Callable, Iterator
+from contextlib import contextmanager
+from contextvars import ContextVar
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Any, ParamSpec, TypeVar
+
+P = ParamSpec("P")
+T = TypeVar("T")
+
+
+@dataclass
+class Span:
+    """
+    A named section of work, with the sections that ran inside of it.
+    Times are UNIX timestamps in nanoseconds, so that spans recorded by different
+    processes line up.
+    """
+
+    name: str
+    start_ns: int
+    end_ns: int = 0
+    children: list["Span"] = field(default_factory=list)
+
+    @property
+    def duration_ms(self) -> float:
+        return (self.end_ns - self.start_ns) / 1e6
+
+
+_current_span: ContextVar[Span | None] = ContextVar("current_span", default=None)
+
+
+def tracing_active() -> bool:
+    return _current_span.get() is not None
+
+
+@contextmanager
+def trace(name: str) -> Iterator[Span]:
+    """
+    Start a new trace, collecting all spans that run inside of it.
+    """
+    root = Span(name=name, start_ns=time.time_ns())
+    token = _current_span.set(root)
+    try:
+        yield root
+    finally:
+        root.end_ns = time.time_ns()
+        _current_span.reset(token)
+
+
+@contextmanager
+def span(name: str) -> Iterator[None]:
+    """
+    Time a section of work as part of the current trace, if there is any.
+    """
+    parent = _current_span.get()
+    if parent is None:
+        yield
+        return
+    current = Span(name=name, start_ns=time.time_ns())
+    parent.children.append(current)
+    token = _current_span.set(current)
+    try:
+        yield
+    finally:
+        current.end_ns = time.time_ns()
+        _current_span.reset(token)
+
+
+def traced(name: str | None = None) -> Callable[[Callable[P, T]], Callable[P, T]]:
+    """
+    Decorate a function so that each call is timed as a span.
+    By default, the span is named after the function.
+    """
+
+    def decorator(fn: Callable[P, T]) -> Callable[P, T]:
+        span_name = name or fn.__name__
+
+        @functools.wraps(fn)
+        def wrapper(*args: P.args, **kwargs: P.kwargs) -> T:
+            if _current_span.get() is None:
+                return fn(*args, **kwargs)
+            with span(span_name):
+                return fn(*args, **kwargs)
+
+        return wrapper
+
+    return decorator
+
+
+def attach(child: Span):
+    """
+    Add a span that was recorded elsewhere (eg. in another process) to the current
+    trace.
+    """
+    parent = _current_span.get()
+    if parent is not None:
+        parent.children.append(child)
+
+
+def run_traced(
+    fn: Callable[P, T],
+    *args: P.args,
+    **kwargs: P.kwargs,
+) -> tuple[T, Span]:
+    """
+    Run `fn` in a new trace, returning its result and the trace.
+    Used to trace jobs that run in solver workers.
+    """
+    with trace(fn.__name__) as root:
+        result = fn(*args, **kwargs)
+    return result, root
+
+
+def walk_spans(root: Span, path: str = "") -> Iterator[tuple[str, Span]]:
+    """
+    Iterate over all the spans inside `root`, along with their paths in the span tree
+    (eg. `diagnose.solve`).
+    """
+    for child in root.children:
+        child_path = f"{path}.{child.name}" if path else child.name
+        yield child_path, child
+        yield from walk_spans(child, child_path)
+
+
+def server_timing(root: Span) -> str:
+    """
+    Summarize a trace as the value of a `Server-Timing` header.
+    Each span is named after its path in the span tree (eg. `diagnose.solve`), and
+    spans with the same path are added together.
+    """
+    totals: dict[str, float] = {}
+    for path, s in walk_spans(root):
+        metric = re.sub(r"[^A-Za-z0-9_.-]", "_", path)
+        totals[metric] = totals.get(metric, 0) + s.duration_ms
+    metrics = [f"total;dur={root.duration_ms:.2f}"]
+    metrics.extend(f"{metric};dur={ms:.2f}" for metric, ms in totals.items())
+    return ", ".join(metrics)
+
+
+def _otlp_spans(
+    s: Span,
+    trace_id: str,
+    parent_id: str,
+    out: list[dict[str, Any]],
+):
+    span_id = secrets.token_hex(8)
+    out.append(
+        {
+            "traceId": trace_id,
+            "spanId": span_id,
+            "parentSpanId": parent_id,
+            "name": s.name,
+            # SPAN_KIND_SERVER for the request itself, SPAN_KIND_INTERNAL otherwise
+            "kind": 1 if parent_id else 2,
+            "startTimeUnixNano": str(s.start_ns),
+            "endTimeUnixNano": str(s.end_ns),
+        },
+    )
+    for child in s.children:
+        _otlp_spans(child, trace_id, span_id, out)
+
+
+def write_trace(root: Span, path: Path):
+    """
+    Append a trace to a trace file, as one line of OTLP JSON.
+    """
+    spans: list[dict[str, Any]] = []
+    _otlp_spans(root, secrets.token_hex(16), "", spans)
+    line = json.dumps(
+        {
+            "resourceSpans": [
+                {
+                    "resource": {
+                        "attributes": [
+                            {
+                                "key": "service.name",
+                                "value": {"stringValue": "planner-backend"},
+                            },
+                        ],
+                    },
+                    "scopeSpans": [{"scope": {"name": "app.tracing"}, "spans": spans}],
+                },
+            ],
+        },
+        separators=(",", ":"),
+    )
+    with path.open("a") as f:
+        f.write(line + "\n")
@@ -0,0 +1,207 @@
+"""
+Run blocking curriculum solving jobs in a pool of worker processes.
+
+Solving a curriculum can take a few seconds of CPU time, and running it directly inside
+an async handler stalls every other request served by the same event loop.
+Instead, these jobs are sent to a per-process pool of solver workers, and handlers just
+await the result.
+
+Each solver worker loads its own copy of the static course and curriculum data when it
+starts, so jobs only need to send the plan over.
+Job functions must be module-level functions (so that they can be pickled), and must
+use the synchronous accessors in `app.sync.database`.
+"""
+
+import asyncio
+import logging
+import multiprocessing
+from collections.abc import Callable
+from concurrent.futures import Future, ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from dataclasses import asdict, dataclass
+from threading import Lock
+from typing import ParamSpec, TypeVar, cast
+
+from fastapi import HTTPException
+
+from app.settings import settings
+from app.tracing import Span, attach, run_traced, span, tracing_active
+
+log = logging.getLogger("workers")
+
+P = ParamSpec("P")
+T = TypeVar("T")
+
+
+@dataclass
+class WorkerStats:
+    """
+    Counters describing the solver workers of this process.
+
+    - finished: Jobs that were sent to a worker and are no longer pending.
+    - rejected: Jobs that were rejected because too many jobs were already pending.
+    - timeouts: Jobs that took too long and were abandoned.
+    - restarts: Times that the pool was restarted because a worker died.
+    - pending: Jobs that are currently queued or running, including abandoned jobs that
+        are still running.
+    - abandoned: Jobs that were abandoned but are still running, since a running job
+        cannot be interrupted.
+    """
+
+    finished: int = 0
+    rejected: int = 0
+    timeouts: int = 0
+    restarts: int = 0
+    pending: int = 0
+    abandoned: int = 0
+
+
+_executor: ProcessPoolExecutor | None = None
+_stats = WorkerStats()
+# Jobs finish in the thread that collects results from the workers, so the counters are
+# shared across threads
+_stats_lock = Lock()
+
+
+async def _load_worker_data():
+    from app.database import prisma
+    from app.sync.database import load_packed_data_from_db
+
+    async with prisma:
+        await load_packed_data_from_db()
+
+
+def _init_worker():
+    """
+    Runs once in each worker process, before it takes any jobs.
+    """
+
+    logging.basicConfig(level=settings.log_level)
+    asyncio.run(_load_worker_data())
+
+
+def _create_executor() -> ProcessPoolExecutor:
+    # Use fresh processes instead of forking, since the parent process has an event
+    # loop, database connections and threads that should not be duplicated
+    return ProcessPoolExecutor(
+        max_workers=settings.solve_workers,
+        mp_context=multiprocessing.get_context("spawn"),
+        initializer=_init_worker,
+    )
+
+
+def start_workers():
+    """
+    Start the solver workers of this process.
+    If no workers are configured, jobs run inline instead.
+    """
+
+    global _executor
+    if settings.solve_workers <= 0 or _executor is not None:
+        return
+    log.info("starting %s solver workers", settings.solve_workers)
+    _executor = _create_executor()
+
+
+def stop_workers():
+    """
+    Stop the solver workers of this process, abandoning any pending jobs.
+    """
+
+    global _executor
+    if _executor is None:
+        return
+    _executor.shutdown(wait=False, cancel_futures=True)
+    _executor = None
+
+
+def worker_stats() -> WorkerStats:
+    """
+    Get a snapshot of the solver worker counters.
+    """
+    with _stats_lock:
+        return WorkerStats(**asdict(_stats))
+
+
+async def run_job(fn: Callable[P, T], *args: P.args, **kwargs: P.kwargs) -> T:
+    """
+    Run the blocking function `fn` in a solver worker and wait for its result.
+
+    If too many jobs are already pending, fails immediately with a 503 error instead of
+    queueing the job.
+    If the job takes longer than `settings.solve_job_timeout`, fails with a 504 error.
+    If no solver workers are running, `fn` is run inline.
+    If the current request is being traced, the job is traced too.
+    """
+
+    global _executor
+    if _executor is None:
+        with span(fn.__name__):
+            return fn(*args, **kwargs)
+
+    with _stats_lock:
+        # Abandoned jobs still hold a worker, so they count against the queue too
+        if _stats.pending >= settings.solve_queue_size:
+            _stats.rejected += 1
+            raise HTTPException(503, "server busy, try again later")
+        _stats.pending += 1
+
+    executor = _executor
+    traced = tracing_active()
+    abandoned = False
+
+    def on_done(future: Future[object]):
+        # Only free up the slot once the worker is actually done with the job
+        with _stats_lock:
+            _stats.pending -= 1
+            _stats.finished += 1
+            if abandoned:
+                _stats.abandoned -= 1
+
+    try:
+        if traced:
+            future = executor.submit(run_traced, fn, *args, **kwargs)
+        else:
+            future = executor.submit(fn, *args, **kwargs)
+    except BaseException:
+        with _stats_lock:
+            _stats.pending -= 1
+        raise
+    try:
+        # The span includes the time spent waiting for a free worker
+        with span("solver worker"):
+            result = await asyncio.wait_for(
+                asyncio.wrap_future(future),
+                settings.solve_job_timeout,
+            )
+            if traced:
+                result, job_trace = cast(tuple[T, Span], result)
+                attach(job_trace)
+        return cast(T, result)
+    except TimeoutError:
+        # If the job did not start yet, it will never start
+        # If it did, there is no way to interrupt it, so its result is discarded, but it
+        # keeps its slot until it finishes
+        with _stats_lock:
+            _stats.timeouts += 1
+            if not future.cancel():
+                abandoned = True
+                _stats.abandoned += 1
+        raise HTTPException(504, "operation took too long") from None
+    except BrokenProcessPool:
+        # Some worker died (eg. it ran out of memory), so the whole pool is unusable
+        # Only restart once, even if many pending jobs fail at the same time
+        with _stats_lock:
+            restart = _executor is executor
+            if restart:
+                _executor = _create_executor()
+                _stats.restarts += 1
+        if restart:
+            log.exception("solver worker died, restarting solver workers")
+            # Outside of the lock, since cancelled jobs run `on_done` right away
+            executor.shutdown(wait=False, cancel_futures=True)
+        raise HTTPException(503, "server busy, try again later") from None
+    finally:
+        # Registered last, so that `abandoned` is settled by the time it runs
+        # If the job is already done, it runs right away
+        future.add_done_callback(on_done)
@@ -0,0 +1,245 @@
+"""
+Benchmark plan generation and validation over the SIDING mock students.
+
+For every student in the SIDING mock, and for every curriculum offered for their
+curriculum version, generates a recommended plan from the courses the student has
+passed (like `/plan/generate`) and then validates it (like `/plan/validate_for`).
+No database or Redis is needed: the static data is read from a packed-data file as
+written by `python -m scripts.bench_startup --save packed.json`, and the students are
+read from the SIDING mock (`settings.siding_mock_path`).
+
+The curriculums tried for each student are the one they reported, every major-minor
+pair in the program offer for their curriculum version, and every title on its own.
+
+Reports, as JSON:
+- The p50/p95/p99 wall time of the complete generation and validation jobs, and of
+    every traced section within them (see `app.tracing`), in seconds.
+- How many solves each job ran, counted from its trace: `Solve` spans are solves of
+    the MIP solver, and `network flow` spans are attempts at the network flow fast
+    path (every solve starts with one, so the MIP solves are the ones where it failed).
+- The peak memory allocated by each job, if `--tracemalloc` is given (tracing slows
+    everything down, so timings are not comparable with untraced runs).
+The report is deterministic except for the measurements, so reports of different
+commits can be diffed directly:
+
+    python -m scripts.bench_plans --packed packed.json --output plans.json
+"""
+
+import argparse
+import asyncio
+import json
+import sys
+import tempfile
+import time
+import tracemalloc
+from collections import defaultdict
+from collections.abc import Iterator
+from pathlib import Path
+from typing import Any
+
+from app.plan.generation import build_recommended_plan, generate_empty_plan
+from app.plan.plan import ValidatablePlan
+from app.plan.validation.curriculum.tree import CurriculumSpec, cyear_from_str
+from app.plan.validation.validate import run_diagnose_plan
+from app.settings import settings
+from app.sync.curriculums.storage import ProgramOffer
+from app.sync.database import (
+    COURSEDATA_PACK_ID,
+    CURRICULUMS_PACK_ID,
+    loaded_curriculum_storage,
+    use_static_image,
+)
+from app.sync.image import open_image, write_image
+from app.sync.siding import translate as siding_translate
+from app.sync.siding.client import client as siding_soap_client
+from app.tracing import trace, walk_spans
+from app.user.info import StudentInfo
+from app.user.key import Rut
+
+
+def percentiles(samples: list[float]) -> dict[str, float]:
+    """
+    Summarize a list of samples, using nearest-rank percentiles.
+    """
+    ordered = sorted(samples)
+
+    def rank(p: float) -> float:
+        return ordered[max(0, -(-len(ordered) * p // 100) - 1)]
+
+    return {
+        "count": len(ordered),
+        "total": round(sum(ordered), 6),
+        "p50": round(rank(50), 6),
+        "p95": round(rank(95), 6),
+        "p99": round(rank(99), 6),
+        "max": round(ordered[-1], 6),
+    }
+
+
+# The spans that mark a solve, see `app.plan.validation.curriculum.solve._solve`
+SOLVE_SPANS = ("Solve", "network flow")
+
+
+def _load_static_data(packed_path: Path):
+    packed = json.loads(packed_path.read_text())
+    with tempfile.TemporaryDirectory() as tmpdir:
+        image_path = Path(tmpdir) / "static-data.bin"
+        version = "0" * 32
+        write_image(
+            image_path,
+            version,
+            packed[COURSEDATA_PACK_ID],
+            packed[CURRICULUMS_PACK_ID],
+        )
+        image = open_image(image_path, version)
+        assert image is not None
+        # The image stays mapped after its file is removed
+        use_static_image(image)
+
+
+async def _load_students() -> dict[str, StudentInfo]:
+    siding_soap_client.on_startup()
+    students: dict[str, StudentInfo] = {}
+    for request_key in sorted(siding_soap_client.mock_db.get("getInfoEstudiante", {})):
+        rut = json.loads(request_key)["rut"]
+        try:
+            students[rut] = await siding_translate.fetch_student_info(Rut(rut))
+        except siding_translate.InvalidStudentError:
+            print(f"  skipping {rut}: not a valid student", file=sys.stderr)
+    return students
+
+
+def _curriculum_specs(student: StudentInfo) -> Iterator[CurriculumSpec]:
+    cyear = cyear_from_str(student.cyear)
+    if cyear is None:
+        return
+    yield CurriculumSpec(
+        cyear=cyear,
+        major=student.reported_major,
+        minor=student.reported_minor,
+        title=student.reported_title,
+    )
+    offer = loaded_curriculum_storage().offer.get(cyear, ProgramOffer())
+    for major in sorted(offer.major):
+        for minor in sorted(offer.major_minor.get(major, [])):
+            yield CurriculumSpec(cyear=cyear, major=major, minor=minor, title=None)
+    for title in sorted(offer.title):
+        yield CurriculumSpec(cyear=cyear, major=None, minor=None, title=title)
+
+
+def _empty_plan_for(student: StudentInfo) -> ValidatablePlan:
+    plan = asyncio.run(generate_empty_plan(None))
+    return plan.copy(update={"classes": student.passed_courses})
+
+
+class JobRecorder:
+    def __init__(self, trace_allocations: bool) -> None:
+        self.trace_allocations = trace_allocations
+        self.samples: defaultdict[str, list[float]] = defaultdict(list)
+        self.sections: defaultdict[str, list[float]] = defaultdict(list)
+        self.solves: dict[str, defaultdict[str, list[float]]] = {
+            name: defaultdict(list) for name in SOLVE_SPANS
+        }
+        self.alloc_peak_kb: defaultdict[str, list[float]] = defaultdict(list)
+        self.failures: list[dict[str, str]] = []
+
+    def run(self, kind: str, key: str, job: Any, *args: Any) -> Any:  # noqa: ANN401
+        if self.trace_allocations:
+            tracemalloc.reset_peak()
+        start = time.perf_counter()
+        try:
+            with trace(kind) as root:
+                result = job(*args)
+        except Exception as err:  # noqa: BLE001 (report and keep benchmarking)
+            self.failures.append({"job": kind, "case": key, "error": repr(err)})
+            return None
+        self.samples[kind].append(time.perf_counter() - start)
+        solves = dict.fromkeys(SOLVE_SPANS, 0)
+        for path, s in walk_spans(root, kind):
+            self.sections[path].append(s.duration_ms / 1000)
+            if s.name in solves:
+                solves[s.name] += 1
+        for name, count in solves.items():
+            self.solves[name][kind].append(count)
+        if self.trace_allocations:
+            self.alloc_peak_kb[kind].append(tracemalloc.get_traced_memory()[1] / 1024)
+        return result
+
+
+def run_benchmark(packed_path: Path, trace_allocations: bool) -> dict[str, Any]:
+    print("Loading static data...", file=sys.stderr)
+    _load_static_data(packed_path)
+    print("Loading SIDING mock students...", file=sys.stderr)
+    students = asyncio.run(_load_students())
+    if not students:
+        raise SystemExit(
+            f"no students found in SIDING mock {settings.siding_mock_path}"
+        )
+
+    rec = JobRecorder(trace_allocations)
+    if trace_allocations:
+        tracemalloc.start()
+    cases = 0
+    for rut, student in students.items():
+        base = _empty_plan_for(student)
+        for spec in _curriculum_specs(student):
+            key = f"{rut} {spec}"
+            print(f"  {key}", file=sys.stderr)
+            cases += 1
+            passed = base.copy(update={"curriculum": spec}, deep=True)
+            plan = rec.run("generate", key, build_recommended_plan, passed)
+            if plan is not None:
+                rec.run("validate", key, run_diagnose_plan, plan, student, None)
+    if trace_allocations:
+        tracemalloc.stop()
+
+    return {
+        "students": len(students),
+        "cases": cases,
+        "failures": rec.failures,
+        "jobs": {kind: percentiles(samples) for kind, samples in rec.samples.items()},
+        "sections": {
+            name: percentiles(samples) for name, samples in sorted(rec.sections.items())
+        },
+        "solves": {
+            name: {kind: percentiles(samples) for kind, samples in by_kind.items()}
+            for name, by_kind in rec.solves.items()
+        },
+        "alloc_peak_kb": {
+            kind: percentiles(samples) for kind, samples in rec.alloc_peak_kb.items()
+        },
+    }
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument(
+        "--packed",
+        type=Path,
+        required=True,
+        help="read the packed data from this file (see `scripts.bench_startup --save`)",
+    )
+    parser.add_argument(
+        "--siding-mock",
+        type=Path,
+        help="read the SIDING mock from this index file",
+    )
+    parser.add_argument(
+        "--tracemalloc",
+        action="store_true",
+        help="measure the peak memory allocated by each job",
+    )
+    parser.add_argument(
+        "--output",
+        type=Path,
+        help="write the JSON report to this file instead of stdout",
+    )
+    args = parser.parse_args()
+    if args.siding_mock is not None:
+        settings.siding_mock_path = args.siding_mock
+
+    report_json = json.dumps(run_benchmark(args.packed, args.tracemalloc), indent=2)
+    if args.output is None:
+        print(report_json)
+    else:
+        args.output.write_text(report_json)
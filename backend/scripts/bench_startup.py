@@ -0,0 +1,175 @@
+"""
+Benchmark how long it takes to load the static data at startup, and how much memory it
+takes.
+
+Runs every phase of the startup load in order, and reports the wall time, the resident
+memory and the amount of new garbage-collected objects after each phase, as JSON.
+The `use_static_image` phase then runs the whole load from the opened image end to end,
+like the server does at startup.
+The legacy load (parsing the whole course catalog into pydantic models) is also measured
+as a reference, after all the other phases.
+
+The packed data is read from the database by default.
+Alternatively, it can be read from a packed-data file, which is a JSON object mapping
+pack ids to packed strings, as written by `--save`:
+
+    python -m scripts.bench_startup --save packed.json
+    python -m scripts.bench_startup --packed packed.json --output startup.json
+"""
+
+import argparse
+import gc
+import json
+import resource
+import sys
+import tempfile
+import time
+from collections.abc import Iterator
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Any
+
+import pydantic
+from app.plan.courseinfo import CourseDetails, CourseInfo
+from app.sync.curriculums.storage import CurriculumStorage
+from app.sync.database import (
+    COURSEDATA_PACK_ID,
+    CURRICULUMS_PACK_ID,
+    load_packed,
+    use_static_image,
+)
+from app.sync.image import open_image, write_image
+
+
+def _rss_kb() -> int | None:
+    try:
+        pages = int(Path("/proc/self/statm").read_text().split()[1])
+    except OSError:
+        # Not on Linux
+        return None
+    return pages * resource.getpagesize() // 1024
+
+
+class PhaseRecorder:
+    def __init__(self) -> None:
+        self.phases: list[dict[str, Any]] = []
+
+    @contextmanager
+    def phase(self, name: str) -> Iterator[None]:
+        gc.collect()
+        objects_before = len(gc.get_objects())
+        start = time.perf_counter()
+        yield
+        elapsed = time.perf_counter() - start
+        gc.collect()
+        self.phases.append(
+            {
+                "name": name,
+                "seconds": round(elapsed, 6),
+                "rss_kb": _rss_kb(),
+                # `ru_maxrss` is in kilobytes on Linux
+                "peak_rss_kb": resource.getrusage(resource.RUSAGE_SELF).ru_maxrss,
+                "new_gc_objects": len(gc.get_objects()) - objects_before,
+            },
+        )
+        print(f"  {name}: {elapsed:.3f}s", file=sys.stderr)
+
+
+async def _fetch_from_db() -> dict[str, str]:
+    from app.database import prisma
+
+    async with prisma:
+        return {
+            COURSEDATA_PACK_ID: await load_packed(COURSEDATA_PACK_ID),
+            CURRICULUMS_PACK_ID: await load_packed(CURRICULUMS_PACK_ID),
+        }
+
+
+def run_benchmark(packed_path: Path | None, save_path: Path | None) -> dict[str, Any]:
+    rec = PhaseRecorder()
+
+    with rec.phase("fetch"):
+        if packed_path is None:
+            import asyncio
+
+            packed = asyncio.run(_fetch_from_db())
+        else:
+            packed = json.loads(packed_path.read_text())
+    if save_path is not None:
+        save_path.write_text(json.dumps(packed))
+    packed_courses = packed[COURSEDATA_PACK_ID]
+    packed_curriculums = packed[CURRICULUMS_PACK_ID]
+
+    with tempfile.TemporaryDirectory() as tmpdir:
+        image_path = Path(tmpdir) / "static-data.bin"
+        version = "0" * 32
+
+        with rec.phase("build_image"):
+            write_image(image_path, version, packed_courses, packed_curriculums)
+        image_size = image_path.stat().st_size
+
+        with rec.phase("open_image"):
+            image = open_image(image_path, version)
+            assert image is not None
+
+        with rec.phase("parse_curriculums"):
+            storage = CurriculumStorage.parse_raw(image.packed_curriculums)
+
+        with rec.phase("build_resolution_table"):
+            storage.build_resolution_table()
+
+        with rec.phase("build_courseinfo"):
+            courseinfo = CourseInfo(
+                courses=image.courses,
+                equivs=storage.lists,
+                must_have_courses=storage.must_have_courses,
+            )
+
+        with rec.phase("decode_all_deps"):
+            store = image.courses
+            for id in range(len(store)):
+                store.deps(id)
+
+        with rec.phase("use_static_image"):
+            use_static_image(image)
+
+        with rec.phase("legacy_parse_courses"):
+            courses = pydantic.parse_raw_as(dict[str, CourseDetails], packed_courses)
+
+    return {
+        "courses": len(courses),
+        "equivalences": len(courseinfo.equivs),
+        "plans": len(storage.majors) + len(storage.minors) + len(storage.titles),
+        "packed_courses_bytes": len(packed_courses.encode()),
+        "packed_curriculums_bytes": len(packed_curriculums.encode()),
+        "image_bytes": image_size,
+        "phases": rec.phases,
+    }
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument(
+        "--packed",
+        type=Path,
+        help="read the packed data from this file instead of the database",
+    )
+    parser.add_argument(
+        "--save",
+        type=Path,
+        help="save the packed data to this file, to benchmark without a database later",
+    )
+    parser.add_argument(
+        "--output",
+        type=Path,
+        help="write the JSON report to this file instead of stdout",
+    )
+    args = parser.parse_args()
+
+    print("Benchmarking static data load...", file=sys.stderr)
+    report = run_benchmark(args.packed, args.save)
+    report_json = json.dumps(report, indent=2)
+    if args.output is None:
+        print(report_json)
+    else:
+        args.output.write_text(report_json)
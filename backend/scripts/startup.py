@@ -7,6 +7,7 @@ from app.sync.database import (
     CURRICULUMS_PACK_ID,
     NoPackedDataError,
     load_packed,
+    load_packed_data_from_db,
     sync_from_external_sources,
 )
 from app.sync.siding.client import client
@@ -37,6 +38,9 @@ async def sync_and_cache_curricular_data():
                 sync_coursedata=settings.autosync_courses or coursedata_empty,
                 sync_curriculum=settings.autosync_curriculums or curriculums_empty,
             )
+
+            # Build the static data image before the server processes start
+            await load_packed_data_from_db()
         finally:
             if client.soap_client:
                 client.on_shutdown()
@@ -0,0 +1,113 @@
+from app.plan.course import ConcreteId
+from app.plan.courseinfo import CourseDetails, CourseInfo
+from app.plan.plan import ValidatablePlan
+from app.plan.validation.courses.compiled import compile_deps
+from app.plan.validation.courses.logic import (
+    And,
+    Const,
+    Expr,
+    MinCredits,
+    Or,
+    ReqCareer,
+    ReqCourse,
+    ReqLevel,
+)
+from app.plan.validation.courses.validate import (
+    CourseInstance,
+    ValidationContext,
+    is_satisfied,
+)
+from app.plan.validation.curriculum.tree import CurriculumSpec
+from hypothesis import given, settings
+from hypothesis import strategies as st
+
+CODES = ["MAT1610", "MAT1620", "MAT1203", "FIS1514", "IIC1103", "IIC2233"]
+
+INFO = CourseInfo(
+    courses={
+        code: CourseDetails(
+            code=code,
+            name=code,
+            credits=10,
+            deps=Const(value=True),
+            banner_equivs=[],
+            canonical_equiv=code,
+            program="",
+            school="",
+            area=None,
+            category=None,
+            is_available=True,
+            semestrality=(True, True),
+        )
+        for code in CODES
+    },
+    equivs={},
+    must_have_courses=set(),
+)
+
+atoms = st.one_of(
+    st.builds(ReqCourse, code=st.sampled_from(CODES), coreq=st.booleans()),
+    st.builds(MinCredits, min_credits=st.sampled_from([0, 10, 30, 60])),
+    st.builds(
+        ReqLevel,
+        level=st.sampled_from(["Pregrado", "Magister"]),
+        equal=st.just(True),
+    ),
+    st.builds(ReqCareer, career=st.just("Ingenieria"), equal=st.booleans()),
+    st.builds(Const, value=st.booleans()),
+)
+exprs = st.recursive(
+    atoms,
+    lambda children: st.builds(
+        And,
+        children=st.lists(children, max_size=4).map(tuple),
+    )
+    | st.builds(Or, children=st.lists(children, max_size=4).map(tuple)),
+    max_leaves=12,
+)
+semesters = st.lists(
+    st.lists(st.sampled_from(CODES), max_size=3, unique=True),
+    min_size=1,
+    max_size=4,
+)
+
+
+def check_parity(classes: list[list[str]], expr: Expr):
+    plan = ValidatablePlan(
+        version="0.0.2",
+        classes=[[ConcreteId(code=code) for code in sem] for sem in classes],
+        level="Pregrado",
+        school=None,
+        program=None,
+        career="Ingenieria",
+        curriculum=CurriculumSpec(cyear="C2020", major=None, minor=None, title=None),
+    )
+    ctx = ValidationContext(INFO, plan, user_ctx=None)
+    evaluator = compile_deps(expr)
+    for sem in range(len(plan.classes)):
+        inst = CourseInstance(code="IIC9999", sem=sem, index=0)
+        assert evaluator(ctx, sem) == is_satisfied(ctx, inst, expr)
+
+
+@settings(max_examples=200)
+@given(classes=semesters, expr=exprs)
+def test_compiled_deps_parity(classes: list[list[str]], expr: Expr):
+    check_parity(classes, expr)
+
+
+def test_compiled_deps_edge_cases():
+    classes = [["MAT1610"], ["MAT1620"], []]
+    mat1610 = ReqCourse(code="MAT1610", coreq=False)
+    mat1620 = ReqCourse(code="MAT1620", coreq=True)
+    for expr in [
+        # Empty operators are constants
+        And(children=()),
+        Or(children=()),
+        # Requirements vs corequirements in the same semester
+        mat1620,
+        ReqCourse(code="MAT1620", coreq=False),
+        # Nested operators and credit requirements
+        Or(children=(And(children=(mat1610, mat1620)), MinCredits(min_credits=20))),
+        And(children=(ReqCareer(career="Ingenieria", equal=False), mat1610)),
+    ]:
+        check_parity(classes, expr)
@@ -0,0 +1,202 @@
+from app.plan.courseinfo import (
+    COURSE_FIRST_SEMESTER,
+    CourseDetails,
+    CourseInfo,
+    EquivDetails,
+    make_searchable_name,
+)
+from app.plan.search import CourseFilter, CourseSearchIndex, bitset, iter_bitset
+from app.plan.validation.courses.logic import Const
+from hypothesis import given, settings
+from hypothesis import strategies as st
+from unidecode import unidecode
+
+WORDS = [
+    "Cálculo",
+    "Álgebra",
+    "Lineal",
+    "Programación",
+    "Avanzada",
+    "I",
+    "II",
+    "Taller",
+]
+SCHOOLS = ["Ingeniería", "Matemáticas", "Física"]
+
+
+@st.composite
+def courseinfos(draw: st.DrawFn) -> CourseInfo:
+    """
+    Draw a set of courses, along with the `?EQ` equivalence over some of them (and an
+    unknown course).
+    """
+    courses: dict[str, CourseDetails] = {}
+    members: list[str] = ["UNK0000"]
+    for i in range(draw(st.integers(0, 60))):
+        code = f"{draw(st.sampled_from(['MAT', 'IIC', 'FIS']))}{i:04d}"
+        courses[code] = CourseDetails(
+            code=code,
+            name=" ".join(
+                draw(st.lists(st.sampled_from(WORDS), min_size=1, max_size=4))
+            ),
+            credits=draw(st.sampled_from([0, 5, 10])),
+            deps=Const(value=True),
+            banner_equivs=[],
+            canonical_equiv=code,
+            program="",
+            school=draw(st.sampled_from(SCHOOLS)),
+            area=None,
+            category=None,
+            is_available=draw(st.booleans()),
+            semestrality=draw(st.tuples(st.booleans(), st.booleans())),
+        )
+        if draw(st.booleans()):
+            members.append(code)
+    equiv = EquivDetails(
+        code="?EQ",
+        name="Equivalencia",
+        is_homogeneous=False,
+        is_unessential=False,
+        courses=members,
+    )
+    return CourseInfo(courses=courses, equivs={"?EQ": equiv}, must_have_courses=set())
+
+
+filters = st.builds(
+    CourseFilter,
+    text=st.none()
+    | st.sampled_from(["calc", "ál", "lineal ii", "iic", "mat00", "  Tall  ", "x"])
+    | st.text(alphabet="acilnoáIM0 ", max_size=6),
+    credits=st.none() | st.sampled_from([5, 10]),
+    school=st.none() | st.sampled_from(["ingenieria", "MAT", "Quimica"]),
+    available=st.none() | st.booleans(),
+    first_semester=st.none() | st.booleans(),
+    second_semester=st.none() | st.booleans(),
+    equiv=st.none() | st.just("?EQ"),
+)
+
+
+def matches(filter: CourseFilter, info: CourseInfo, course: CourseDetails) -> bool:
+    """
+    Straightforward version of the filter, as it used to be run by the database.
+    """
+    if filter.text is not None:
+        text = make_searchable_name(filter.text)
+        name = make_searchable_name(course.name)
+        if text.upper() not in course.code and not all(
+            part in name for part in text.split()
+        ):
+            return False
+    return (
+        (filter.credits is None or course.credits == filter.credits)
+        and (
+            filter.school is None
+            or unidecode(filter.school).lower() in course.school.lower()
+        )
+        and (filter.available is None or course.is_available == filter.available)
+        and (
+            filter.first_semester is None
+            or course.semestrality[0] == filter.first_semester
+        )
+        and (
+            filter.second_semester is None
+            or course.semestrality[1] == filter.second_semester
+        )
+        and (filter.equiv is None or course.code in info.equivs[filter.equiv].courses)
+    )
+
+
+def test_bitset_roundtrip():
+    ids = [0, 3, 7, 8, 64, 199]
+    assert list(iter_bitset(bitset(ids, 200))) == ids
+    assert list(iter_bitset(0)) == []
+
+
+@settings(max_examples=50, deadline=None)
+@given(info=courseinfos(), filters=st.lists(filters, min_size=1, max_size=10))
+def test_search_matches_filter(info: CourseInfo, filters: list[CourseFilter]):
+    index = CourseSearchIndex(info)
+    store = info.store
+    for filter in filters:
+        found = [store.codes[id] for id in filter.search(index, limit=1000)]
+        expected = [code for code in store.codes if matches(filter, info, store[code])]
+        assert sorted(found) == sorted(expected)
+        assert len(found) == len(set(found))
+        limited = [store.codes[id] for id in filter.search(index, limit=5)]
+        assert limited == found[:5]
+
+
+def test_search_ranking():
+    courses = {
+        code: CourseDetails(
+            code=code,
+            name=name,
+            credits=10,
+            deps=Const(value=True),
+            banner_equivs=[],
+            canonical_equiv=code,
+            program="",
+            school="",
+            area=None,
+            category=None,
+            is_available=True,
+            semestrality=(True, True),
+        )
+        for code, name in [
+            ("AAA0001", "Recalculo"),
+            ("AAA0002", "Calculos"),
+            ("AAA0003", "Calculo"),
+            ("XCAL001", "Taller"),
+            ("CAL0001", "Taller"),
+        ]
+    }
+    index = CourseSearchIndex(
+        CourseInfo(courses=courses, equivs={}, must_have_courses=set()),
+    )
+    found = index.search("calculo", index.all, limit=10)
+    assert [index.courseinfo.store.codes[id] for id in found] == [
+        "AAA0003",
+        "AAA0002",
+        "AAA0001",
+    ]
+    found = index.search("cal", index.all, limit=10)
+    assert [index.courseinfo.store.codes[id] for id in found] == [
+        "CAL0001",
+        "XCAL001",
+        "AAA0002",
+        "AAA0003",
+        "AAA0001",
+    ]
+
+
+@given(info=courseinfos())
+def test_equiv_bitsets(info: CourseInfo):
+    index = CourseSearchIndex(info)
+    store = info.store
+    members = {store.codes[id] for id in iter_bitset(index.in_equiv("?EQ"))}
+    # Unknown members are skipped
+    assert members == set(info.equivs["?EQ"].courses) - {"UNK0000"}
+    first = index.with_flag(COURSE_FIRST_SEMESTER, True)
+    assert {store.codes[id] for id in iter_bitset(index.in_equiv("?EQ") & first)} == {
+        code for code in members if store[code].semestrality[0]
+    }
+
+
+def test_unknown_equiv():
+    info = CourseInfo(
+        courses={},
+        equivs={
+            "?EQ": EquivDetails(
+                code="?EQ",
+                name="Equivalencia",
+                is_homogeneous=False,
+                is_unessential=False,
+                courses=["UNK0000"],
+            ),
+        },
+        must_have_courses=set(),
+    )
+    index = CourseSearchIndex(info)
+    assert index.in_equiv("?EQ") == 0
+    assert index.in_equiv("?UNKNOWN") == 0
+    assert CourseFilter(equiv="?UNKNOWN").search(index, limit=10) == []
@@ -0,0 +1,92 @@
+import pytest
+from app import sync
+from app.plan.course import EquivalenceId
+from app.plan.validation.curriculum.tree import (
+    Combination,
+    Curriculum,
+    CurriculumSpec,
+    FillerCourse,
+    Leaf,
+)
+from app.sync import build_curriculum
+from app.sync.curriculums.storage import CurriculumStorage
+
+
+def make_part(spec: CurriculumSpec, code: str) -> Curriculum:
+    curr = Curriculum.empty(spec)
+    curr.root.cap = 10
+    curr.root.children.append(
+        Leaf(
+            debug_name=code,
+            name=code,
+            superblock=code,
+            cap=10,
+            list_code=code,
+            codes={code},
+        ),
+    )
+    curr.fillers[code] = [
+        FillerCourse(course=EquivalenceId(code=code, credits=10), order=0),
+    ]
+    return curr
+
+
+def make_storage() -> CurriculumStorage:
+    storage = CurriculumStorage()
+    major = CurriculumSpec(cyear="C2020", major="M001", minor=None, title=None)
+    storage.set_major(major, make_part(major, "MAJOR"))
+    minor = CurriculumSpec(cyear="C2020", major=None, minor="N001", title=None)
+    storage.set_minor(minor, make_part(minor, "MINOR"))
+    return storage
+
+
+def test_curriculum_is_assembled_once():
+    storage = make_storage()
+    spec = CurriculumSpec(cyear="C2020", major="M001", minor="N001", title=None)
+    curriculum = build_curriculum(storage, spec)
+    assert isinstance(curriculum.root, Combination)
+    assert curriculum.root.cap == 20
+    assert [child.name for child in curriculum.root.children] == ["MAJOR", "MINOR"]
+    assert set(curriculum.fillers) == {"MAJOR", "MINOR"}
+    assert curriculum.spec == spec
+
+    # Equal specs share the same curriculum
+    again = CurriculumSpec(cyear="C2020", major="M001", minor="N001", title=None)
+    assert build_curriculum(storage, again) is curriculum
+    assert build_curriculum(storage, spec.no_minor()) is not curriculum
+
+    # Reloading the static data discards assembled curriculums
+    assert build_curriculum(make_storage(), spec) is not curriculum
+
+
+def test_with_fillers_is_copy_on_write():
+    storage = make_storage()
+    spec = CurriculumSpec(cyear="C2020", major="M001", minor="N001", title=None)
+    curriculum = build_curriculum(storage, spec)
+    extra = FillerCourse(course=EquivalenceId(code="EXTRA", credits=5), order=1)
+    copy = curriculum.with_fillers({"MAJOR": [extra], "EXTRA": [extra]})
+    assert copy.fillers["MAJOR"] == [extra]
+    assert copy.fillers["MINOR"] is curriculum.fillers["MINOR"]
+    assert copy.root is curriculum.root
+    assert [f.course.code for f in curriculum.fillers["MAJOR"]] == ["MAJOR"]
+    assert "EXTRA" not in curriculum.fillers
+    assert build_curriculum(storage, spec) is curriculum
+
+
+def test_curriculum_cache_eviction(monkeypatch: pytest.MonkeyPatch):
+    monkeypatch.setattr(sync._curriculum_cache, "max_size", 2)
+    storage = make_storage()
+    specs = [
+        CurriculumSpec(cyear="C2020", major="M001", minor=minor, title=None)
+        for minor in ["N001", "N002", "N003"]
+    ]
+    first = build_curriculum(storage, specs[0])
+    build_curriculum(storage, specs[1])
+    assert build_curriculum(storage, specs[0]) is first
+    build_curriculum(storage, specs[2])
+    # The least recently used curriculum was evicted
+    assert sync._curriculum_cache.keys() == [
+        ("C2020", "M001", "N001", None),
+        ("C2020", "M001", "N003", None),
+    ]
+    assert build_curriculum(storage, specs[0]) is first
@@ -0,0 +1,97 @@
+from app.plan.course import ConcreteId, EquivalenceId
+from app.plan.courseinfo import CourseDetails, CourseInfo
+from app.plan.validation.courses.logic import Const
+from app.plan.validation.courses.validate import (
+    _get_equivalents,
+    is_course_indirectly_available,
+)
+from hypothesis import given
+from hypothesis import strategies as st
+
+CODES = ["MAT1610", "MAT1620", "MAT1203", "FIS1514", "IIC1103", "IIC2233", "ICS1113"]
+# Codes that may be referenced, but are not courses
+UNKNOWN = ["MAT0001", "IIC0001"]
+
+courses = st.fixed_dictionaries(
+    {
+        code: st.builds(
+            CourseDetails,
+            code=st.just(code),
+            name=st.just(code),
+            credits=st.just(10),
+            deps=st.just(Const(value=True)),
+            banner_equivs=st.lists(st.sampled_from(CODES), max_size=2),
+            canonical_equiv=st.sampled_from([code, *CODES, UNKNOWN[0]]),
+            program=st.just(""),
+            school=st.just(""),
+            area=st.none(),
+            category=st.none(),
+            is_available=st.booleans(),
+            semestrality=st.just((True, True)),
+        )
+        for code in CODES
+    },
+)
+
+
+def check_index(courses: dict[str, CourseDetails], must_have: set[str]) -> CourseInfo:
+    """
+    Compare the precomputed equivalence lookups against the plain course details.
+    """
+    info = CourseInfo(courses=courses, equivs={}, must_have_courses=must_have)
+
+    def is_available(code: str) -> bool:
+        return code in must_have or (code in courses and courses[code].is_available)
+
+    for code in [*CODES, *UNKNOWN]:
+        expected = is_available(code) or (
+            code in courses and is_available(courses[code].canonical_equiv)
+        )
+        assert is_course_indirectly_available(info, code) == expected
+        equivs = (*courses[code].banner_equivs, code) if code in courses else ()
+        assert _get_equivalents(info, ConcreteId(code=code)) == equivs
+    assert _get_equivalents(info, EquivalenceId(code="?MAT", credits=10)) == ()
+    return info
+
+
+@given(
+    courses=courses,
+    must_have=st.sets(st.sampled_from([*CODES, *UNKNOWN]), max_size=3),
+)
+def test_equivalence_index(courses: dict[str, CourseDetails], must_have: set[str]):
+    check_index(courses, must_have)
+
+
+def test_unavailable_equivalents():
+    def course(
+        code: str,
+        canonical: str,
+        banner_equivs: list[str],
+        is_available: bool,
+    ) -> CourseDetails:
+        return CourseDetails(
+            code=code,
+            name=code,
+            credits=10,
+            deps=Const(value=True),
+            banner_equivs=banner_equivs,
+            canonical_equiv=canonical,
+            program="",
+            school="",
+            area=None,
+            category=None,
+            is_available=is_available,
+            semestrality=(True, True),
+        )
+
+    courses = {code: course(code, code, [], True) for code in CODES}
+    # Available through its canonical equivalent
+    courses["MAT1610"] = course("MAT1610", "MAT1620", ["MAT1620"], False)
+    # The canonical equivalent is not a course
+    courses["MAT1203"] = course("MAT1203", UNKNOWN[0], [], False)
+    # Unavailable, but must be kept
+    courses["IIC1103"] = course("IIC1103", "IIC1103", ["IIC1103"], False)
+    info = check_index(courses, {"IIC1103", UNKNOWN[1]})
+    assert is_course_indirectly_available(info, "MAT1610")
+    assert not is_course_indirectly_available(info, "MAT1203")
+    assert is_course_indirectly_available(info, "IIC1103")
@@ -0,0 +1,61 @@
+from app.plan.validation.courses.logic import And, Or, ReqCourse, hash_expr
+from app.plan.validation.courses.memo import ExprMemo
+from app.plan.validation.courses.simplify import as_dnf, simplify
+
+
+def atom(code: str) -> ReqCourse:
+    return ReqCourse(code=code, coreq=False)
+
+
+def test_hash_covers_fresh_children():
+    # Children that were never hashed on their own must still affect the hash
+    assert hash_expr(And(children=(atom("A"), atom("B")))) != hash_expr(
+        And(children=()),
+    )
+    assert hash_expr(Or(children=(atom("A"),))) != hash_expr(
+        Or(children=(atom("B"),)),
+    )
+
+
+def test_expr_memo():
+    memo: ExprMemo[int] = ExprMemo("test", max_size=2)
+    calls: list[str] = []
+
+    def compute(expr: object) -> int:
+        calls.append(str(expr))
+        return len(calls)
+
+    exprs = [Or(children=(atom(code), atom("Z"))) for code in "ABC"]
+    assert memo.get_or_compute(exprs[0], compute) == 1
+    # Equal expressions hit the memo, even if they are different objects
+    assert memo.get_or_compute(Or(children=(atom("A"), atom("Z"))), compute) == 1
+    assert memo.get_or_compute(exprs[1], compute) == 2
+    assert memo.get_or_compute(exprs[2], compute) == 3
+    # The least recently used result was evicted
+    assert memo.get_or_compute(exprs[0], compute) == 4
+
+    stats = memo.stats()
+    assert stats.hits == 1
+    assert stats.misses == 4
+    assert stats.evictions == 2
+    assert stats.size == 2
+
+
+def test_memoized_dnf_is_consistent():
+    a, b, c = atom("A"), atom("B"), atom("C")
+    expr = And(children=(a, Or(children=(b, c))))
+    first = as_dnf(expr)
+    again = as_dnf(And(children=(a, Or(children=(b, c)))))
+    assert again == first
+    assert as_dnf(And(children=(a, Or(children=(c, b))))) != first
+
+
+def test_simplified_expression_is_kept():
+    # A ring of requirements, whose children simplify to copies of each other
+    a, b, c = atom("A"), atom("B"), atom("C")
+    ring = And(children=(Or(children=(a, b)), Or(children=(b, c)), Or(children=(c, a))))
+    simplified = simplify(ring)
+    assert simplify(simplified) is simplified
+    assert simplify(And(children=(a, b))) == And(children=(a, b))
+    copy = And(children=(atom("A"), atom("B")))
+    assert simplify(copy) is copy
@@ -0,0 +1,46 @@
+from app.plan.validation.courses.logic import (
+    And,
+    Or,
+    ReqCourse,
+    clear_interned,
+    hash_expr,
+    intern_expr,
+)
+
+
+def test_intern_expr():
+    def build() -> And:
+        return And(
+            children=(
+                ReqCourse(code="MAT1610", coreq=False),
+                Or(
+                    children=(
+                        ReqCourse(code="MAT1610", coreq=False),
+                        ReqCourse(code="MAT1203", coreq=True),
+                    ),
+                ),
+            ),
+        )
+
+    first, second = build(), build()
+    assert first is not second
+    a = intern_expr(first)
+    b = intern_expr(second)
+    assert a is b
+    assert a == first
+    assert hash_expr(a) == hash_expr(first)
+    # Shared subexpressions are also shared objects
+    assert isinstance(a, And)
+    inner = a.children[1]
+    assert isinstance(inner, Or)
+    assert a.children[0] is inner.children[0]
+    assert intern_expr(ReqCourse(code="MAT1610", coreq=False)) is a.children[0]
+    assert intern_expr(ReqCourse(code="MAT1610", coreq=True)) is not a.children[0]
+
+
+def test_clear_interned():
+    a = intern_expr(ReqCourse(code="IIC2233", coreq=False))
+    clear_interned()
+    b = intern_expr(ReqCourse(code="IIC2233", coreq=False))
+    assert b is not a
+    assert b == a
@@ -0,0 +1,176 @@
+from collections import OrderedDict
+
+import pytest
+from app.plan.course import ConcreteId
+from app.plan.courseinfo import CourseDetails, CourseInfo
+from app.plan.generation import _find_hidden_requirements
+from app.plan.plan import ValidatablePlan
+from app.plan.validation.courses.logic import (
+    And,
+    Atom,
+    Const,
+    Expr,
+    Or,
+    ReqCourse,
+    hash_expr,
+)
+from app.plan.validation.courses.simplify import (
+    DnfBudgetExceededError,
+    as_dnf,
+    greedy_clause,
+    iter_dnf,
+)
+from app.plan.validation.curriculum.tree import CurriculumSpec
+from hypothesis import given, settings
+from hypothesis import strategies as st
+
+CODES = ["MAT1610", "MAT1620", "MAT1630", "MAT1203", "FIS1514", "IIC1103", "IIC2233"]
+
+exprs = st.recursive(
+    st.builds(ReqCourse, code=st.sampled_from(CODES), coreq=st.just(False)),
+    lambda children: st.builds(And, children=st.lists(children, max_size=4).map(tuple))
+    | st.builds(Or, children=st.lists(children, max_size=4).map(tuple)),
+    max_leaves=16,
+)
+
+
+def weight(atom: Atom) -> int:
+    assert isinstance(atom, ReqCourse)
+    return int(atom.code[-1]) % 3
+
+
+def clause_set(atoms: tuple[Expr, ...]) -> frozenset[bytes]:
+    return frozenset(hash_expr(atom) for atom in atoms)
+
+
+def minimal_clauses(expr: Expr) -> set[frozenset[bytes]]:
+    full = {clause_set(clause.children) for clause in as_dnf(expr).children}
+    return {c for c in full if not any(o < c for o in full)}
+
+
+@settings(max_examples=100, deadline=None)
+@given(expr=exprs)
+def test_iter_dnf_parity(expr: Expr):
+    minimal = minimal_clauses(expr)
+    clauses = list(iter_dnf(expr, weight))
+    sets = [clause_set(clause.children) for clause in clauses]
+    assert set(sets) == minimal
+    assert len(sets) == len(minimal)
+    weights = [sum(weight(atom) for atom in clause.children) for clause in clauses]
+    assert weights == sorted(weights)
+
+
+@settings(max_examples=100, deadline=None)
+@given(expr=exprs)
+def test_greedy_clause_satisfies(expr: Expr):
+    minimal = minimal_clauses(expr)
+    clause = greedy_clause(expr, weight)
+    if clause is None:
+        assert not minimal
+    else:
+        atoms = clause_set(clause.children)
+        assert any(atoms >= c for c in minimal)
+
+
+def test_iter_dnf_lazy():
+    a, b, c = (ReqCourse(code=code, coreq=False) for code in "ABC")
+    # 2^30 clauses, which would never fit in memory
+    huge = And(
+        children=tuple(
+            Or(children=(ReqCourse(code=f"X{i}", coreq=False), a)) for i in range(30)
+        ),
+    )
+    assert next(iter_dnf(huge)).children == (a,)
+    assert list(iter_dnf(Or(children=(And(children=(a, b)), c)))) == [
+        And(children=(c,)),
+        And(children=(a, b)),
+    ]
+    assert list(iter_dnf(And(children=(a, Const(value=False))))) == []
+    # Supersets are skipped even if they weigh the same as the smaller clause
+    assert list(iter_dnf(And(children=(a, Or(children=(b, a)))), lambda _: 0)) == [
+        And(children=(a,)),
+    ]
+    assert list(iter_dnf(And(children=(a, Const(value=False))), max_atoms=10)) == []
+    with pytest.raises(DnfBudgetExceededError):
+        list(iter_dnf(huge, max_atoms=10))
+
+
+def test_greedy_clause():
+    a, b, c = (ReqCourse(code=code, coreq=False) for code in "ABC")
+    # Reuses atoms that were already chosen
+    expr = And(children=(a, Or(children=(b, c)), Or(children=(c, a))))
+    assert greedy_clause(expr) == And(children=(a, b))
+    assert greedy_clause(Or(children=(Const(value=False), b))) == And(children=(b,))
+    assert greedy_clause(Const(value=True)) == And(children=())
+    assert greedy_clause(And(children=(a, Const(value=False)))) is None
+
+
+def ring(n: int) -> Expr:
+    """
+    Each course requires one of two neighbouring courses in a ring, which has an
+    exponential amount of minimal clauses.
+    """
+    codes = [f"X{i:02d}" for i in range(n)]
+    return And(
+        children=tuple(
+            Or(
+                children=(
+                    ReqCourse(code=codes[i], coreq=False),
+                    ReqCourse(code=codes[(i + 1) % n], coreq=False),
+                ),
+            )
+            for i in range(n)
+        ),
+    )
+
+
+def test_hidden_requirements_over_budget(caplog: pytest.LogCaptureFixture):
+    expr = ring(60)
+    with pytest.raises(DnfBudgetExceededError):
+        next(iter_dnf(expr))
+
+    target = CourseDetails(
+        code="IIC3000",
+        name="Proyecto",
+        credits=10,
+        deps=expr,
+        banner_equivs=[],
+        canonical_equiv="IIC3000",
+        program="",
+        school="",
+        area=None,
+        category=None,
+        is_available=True,
+        semestrality=(True, True),
+    )
+    info = CourseInfo(
+        courses={"IIC3000": target},
+        equivs={},
+        must_have_courses=set(),
+    )
+    plan = ValidatablePlan(
+        version="0.0.2",
+        classes=[],
+        level=None,
+        school=None,
+        program=None,
+        career=None,
+        curriculum=CurriculumSpec(cyear="C2020", major=None, minor=None, title=None),
+    )
+    to_fill = set(
+        _find_hidden_requirements(
+            info,
+            plan,
+            OrderedDict([(0, ConcreteId(code="IIC3000"))]),
+        ),
+    )
+    assert "too complex" in caplog.text
+    # The hidden requirements are not skipped, even if the search runs out of budget
+    assert all(
+        any(
+            isinstance(atom, ReqCourse) and atom.code in to_fill
+            for atom in option.children
+        )
+        for option in expr.children
+        if isinstance(option, Or)
+    )
@@ -0,0 +1,22 @@
+from app.lru import LruCache
+
+
+def test_lru_cache():
+    cache: LruCache[str, int] = LruCache(max_size=2)
+    assert cache.get("a") is None
+    cache.put("a", 1)
+    cache.put("b", 2)
+    assert cache.get("a") == 1
+    cache.put("c", 3)
+    # The least recently used value was evicted
+    assert cache.keys() == ["a", "c"]
+    assert cache.get("b") is None
+
+    stats = cache.stats()
+    assert stats.hits == 1
+    assert stats.misses == 2
+    assert stats.evictions == 1
+    assert stats.size == 2
+
+    cache.clear()
+    assert cache.keys() == []
@@ -0,0 +1,227 @@
+import pytest
+from app.plan.course import ConcreteId, EquivalenceId, PseudoCourse
+from app.plan.courseinfo import CourseDetails, CourseInfo, EquivDetails
+from app.plan.validation.courses.logic import Const
+from app.plan.validation.curriculum.solve import (
+    COST_PER_RECOLORED_CREDIT,
+    MAX_SWAPOUT_SOLVES,
+    SolvedCurriculum,
+    _build_problem,
+    _solve_as_network_flow,
+    solve_curriculum,
+    swapout_budgets,
+)
+from app.plan.validation.curriculum.tree import (
+    Block,
+    Combination,
+    Curriculum,
+    CurriculumSpec,
+    FillerCourse,
+    Leaf,
+)
+from hypothesis import given, settings
+from hypothesis import strategies as st
+from ortools.linear_solver import pywraplp as lmip
+
+CODES = [f"IIC{1000 + i}" for i in range(30)]
+
+# The courses of each list, along with the list capacity
+Lists = list[tuple[list[str], int]]
+
+
+def make_curriculum(
+    credits: list[int],
+    lists: Lists,
+    layered: bool = False,
+) -> tuple[CourseInfo, Curriculum]:
+    """
+    Build a curriculum with a leaf for each list.
+    The first three leaves sit under a middle block, and the middle block and the root
+    are tighter than their children, so that blocks compete for courses.
+    """
+    courses = {
+        code: CourseDetails(
+            code=code,
+            name=code,
+            credits=creds,
+            deps=Const(value=True),
+            banner_equivs=[],
+            canonical_equiv=code,
+            program="",
+            school="",
+            area=None,
+            category=None,
+            is_available=True,
+            semestrality=(True, True),
+        )
+        for code, creds in zip(CODES, credits, strict=True)
+    }
+    equivs: dict[str, EquivDetails] = {}
+    fillers: dict[str, list[FillerCourse]] = {}
+    leaves: list[Block] = []
+    order = 0
+    for i, (list_codes, cap) in enumerate(lists):
+        list_code = f"?LIST{i}"
+        equivs[list_code] = EquivDetails(
+            code=list_code,
+            name=list_code,
+            is_homogeneous=False,
+            is_unessential=True,
+            courses=sorted(list_codes),
+        )
+        leaves.append(
+            Leaf(
+                debug_name=list_code,
+                name=list_code,
+                cap=cap,
+                list_code=list_code,
+                codes={*list_codes, list_code},
+                superblock=f"Superblock{i % 2}",
+                layer="extra" if layered and i == 0 else "",
+            ),
+        )
+        for _ in range(cap // 10):
+            fillers.setdefault(list_code, []).append(
+                FillerCourse(
+                    course=EquivalenceId(code=list_code, credits=10),
+                    order=order,
+                ),
+            )
+            order += 1
+    mid = Combination(debug_name="mid", name="Mid", cap=-1, children=leaves[:3])
+    root = Combination(
+        debug_name="root",
+        name=None,
+        cap=-1,
+        children=[mid, *leaves[3:]],
+    )
+    root.freeze_capacities()
+    mid.cap -= 10
+    root.cap -= 10
+    spec = CurriculumSpec(cyear="C2020", major=None, minor=None, title=None)
+    curriculum = Curriculum(root=root, spec=spec, fillers=fillers, multiplicity={})
+    info = CourseInfo(courses=courses, equivs=equivs, must_have_courses=set())
+    return info, curriculum
+
+
+def to_plan(semesters: list[list[str]]) -> list[list[PseudoCourse]]:
+    return [[ConcreteId(code=code) for code in sem] for sem in semesters]
+
+
+credit_lists = st.lists(
+    st.sampled_from([0, 5, 10, 10]),
+    min_size=len(CODES),
+    max_size=len(CODES),
+)
+curriculum_lists = st.lists(
+    st.tuples(
+        st.lists(st.sampled_from(CODES), min_size=1, max_size=8, unique=True),
+        st.sampled_from([10, 20, 30]),
+    ),
+    min_size=6,
+    max_size=6,
+)
+plans = st.lists(
+    st.lists(st.sampled_from(CODES), max_size=5, unique=True),
+    min_size=6,
+    max_size=6,
+).map(to_plan)
+
+SIMPLE_LISTS: Lists = [
+    (CODES[0:3], 10),
+    (CODES[2:6], 20),
+    (CODES[5:8], 10),
+    (CODES[8:10], 30),
+    (CODES[9:14], 10),
+    (CODES[14:15], 20),
+]
+
+
+def solution_cost(g: SolvedCurriculum, flows: dict[int, int]) -> int:
+    cost = 0
+    for usable in g.usable.values():
+        for inst in usable.instances:
+            cost += inst.cost_per_credit * flows[id(inst.flow_var)]
+            for layer in inst.layers.values():
+                for edge in layer.block_edges:
+                    if edge.needs_recolor:
+                        cost += COST_PER_RECOLORED_CREDIT * flows[id(edge.flow_var)]
+    return cost
+
+
+def check_parity(
+    info: CourseInfo,
+    curriculum: Curriculum,
+    plan: list[list[PseudoCourse]],
+) -> int | None:
+    """
+    Solve `plan` as a network flow, and check that the MIP solver agrees.
+    Returns the network flow status, or `None` if the MIP solver is required.
+    """
+    g = _build_problem(info, curriculum, plan, 2)
+    status = _solve_as_network_flow(g)
+    if status is not None:
+        exact = lmip.MPSolverParameters()
+        exact.SetDoubleParam(lmip.MPSolverParameters.RELATIVE_MIP_GAP, 0)
+        assert status == g.model.Solve(exact)
+        if status == lmip.Solver.OPTIMAL:
+            assert g.network_solution is not None
+            assert solution_cost(g, g.network_solution) == pytest.approx(
+                g.model.Objective().Value(),
+            )
+    g.release()
+    return status
+
+
+@settings(max_examples=40, deadline=None)
+@given(credits=credit_lists, lists=curriculum_lists, plans=st.lists(plans, max_size=3))
+def test_network_flow_parity(
+    credits: list[int],
+    lists: Lists,
+    plans: list[list[list[PseudoCourse]]],
+):
+    info, curriculum = make_curriculum(credits, lists)
+    for plan in plans:
+        check_parity(info, curriculum, plan)
+
+
+def test_network_flow_empty_plan():
+    # Only fillers are available
+    info, curriculum = make_curriculum([10] * len(CODES), SIMPLE_LISTS)
+    assert check_parity(info, curriculum, []) == lmip.Solver.OPTIMAL
+
+
+def test_network_flow_zero_credit_courses():
+    # Courses without credits still need to be placed somewhere
+    info, curriculum = make_curriculum([0] * len(CODES), SIMPLE_LISTS)
+    plan = to_plan([CODES[0:5], CODES[5:10]])
+    assert check_parity(info, curriculum, plan) == lmip.Solver.OPTIMAL
+
+
+def test_network_flow_fallback():
+    info, curriculum = make_curriculum(
+        [10] * len(CODES),
+        SIMPLE_LISTS,
+        layered=True,
+    )
+    plan = to_plan([CODES[0:4], CODES[8:12]])
+
+    # Layered curriculums cannot be solved as a plain network flow
+    g = _build_problem(info, curriculum, plan, 0)
+    assert _solve_as_network_flow(g) is None
+    g.release()
+
+    g = solve_curriculum(info, curriculum.spec, curriculum, plan)
+    assert g.network_solution is None
+    assert sum(inst.flow for usable in g.usable.values() for inst in usable.instances)
+    g.release()
+
+
+def test_swapout_budgets():
+    assert swapout_budgets(0) == []
+    assert swapout_budgets(1) == [MAX_SWAPOUT_SOLVES]
+    budgets = swapout_budgets(3)
+    assert sum(budgets) == MAX_SWAPOUT_SOLVES
+    assert max(budgets) - min(budgets) <= 1
+    # Every filler gets to reroute at least once
+    assert swapout_budgets(MAX_SWAPOUT_SOLVES + 4) == [1] * (MAX_SWAPOUT_SOLVES + 4)
@@ -0,0 +1,87 @@
+import json
+
+from app.sync.curriculums.offer import CachedJson, OfferSnapshot
+from app.sync.curriculums.storage import (
+    CurriculumStorage,
+    ProgramDetails,
+    ProgramOffer,
+)
+
+
+def make_storage() -> CurriculumStorage:
+    storage = CurriculumStorage()
+    storage.offer["C2022"] = ProgramOffer(
+        major={
+            "M001": ProgramDetails(
+                code="M001",
+                name="Ingeniería",
+                version="1",
+                program_type="Major",
+            ),
+        },
+        minor={
+            code: ProgramDetails(
+                code=code,
+                name=f"Minor {code}",
+                version="1",
+                program_type="Amplitud",
+            )
+            for code in ["N001", "N002"]
+        },
+        title={
+            "T001": ProgramDetails(
+                code="T001",
+                name="Civil",
+                version="1",
+                program_type="CIVIL",
+            ),
+        },
+        major_minor={"M001": ["N002", "N404"]},
+    )
+    return storage
+
+
+def test_offer_snapshot():
+    snapshot = OfferSnapshot(make_storage())
+    assert json.loads(snapshot.majors("C2022").body) == [
+        {"cyear": "C2022", "code": "M001", "name": "Ingeniería", "version": "1"},
+    ]
+    assert [m["code"] for m in json.loads(snapshot.minors("C2022", None).body)] == [
+        "N001",
+        "N002",
+    ]
+    # Unknown minors are skipped, like the database join did
+    assert json.loads(snapshot.minors("C2022", "M001").body) == [
+        {
+            "cyear": "C2022",
+            "code": "N002",
+            "name": "Minor N002",
+            "version": "1",
+            "minor_type": "Amplitud",
+        },
+    ]
+    full = json.loads(snapshot.full("C2022", "M001").body)
+    assert [m["code"] for m in full["minors"]] == ["N002"]
+    assert full["titles"][0]["title_type"] == "CIVIL"
+    # Responses are served from the snapshot
+    assert snapshot.full("C2022", "M001") is snapshot.full("C2022", "M001")
+
+    assert json.loads(snapshot.majors("C2013").body) == []
+    assert json.loads(snapshot.minors("C2022", "M404").body) == []
+    assert json.loads(snapshot.full("C2013", None).body) == {
+        "majors": [],
+        "minors": [],
+        "titles": [],
+    }
+
+
+def test_etags():
+    cached = CachedJson.of({"a": 1})
+    assert cached.etag.startswith('"')
+    assert cached.etag == CachedJson.of({"a": 1}).etag
+    assert cached.etag != CachedJson.of({"a": 2}).etag
+    assert not cached.matches(None)
+    assert cached.matches(cached.etag)
+    assert cached.matches(f'"other", W/{cached.etag}')
+    assert cached.matches("*")
+    assert not cached.matches('"other"')
@@ -0,0 +1,177 @@
+from collections import OrderedDict
+
+from app.plan.course import ConcreteId, EquivalenceId, PseudoCourse
+from app.plan.courseinfo import CourseDetails, CourseInfo
+from app.plan.generation import (
+    PlacementScheduler,
+    _find_mutual_coreqs,
+    _try_add_course_group,
+)
+from app.plan.plan import ValidatablePlan
+from app.plan.validation.courses.logic import (
+    And,
+    Const,
+    Expr,
+    MinCredits,
+    Or,
+    ReqCourse,
+)
+from app.plan.validation.courses.validate import ValidationContext
+from app.plan.validation.curriculum.tree import CurriculumSpec
+from hypothesis import given, settings
+from hypothesis import strategies as st
+
+
+@st.composite
+def placement_problems(draw: st.DrawFn) -> tuple[dict[str, CourseDetails], list[str]]:
+    """
+    Draw a set of courses with requirements among themselves (including some mutual
+    corequirements), along with the courses to pass, in order.
+    """
+    n = draw(st.integers(2, 50))
+    codes = [f"ICS{1000 + i}" for i in range(n)]
+    other_codes = st.sampled_from(codes)
+    courses: dict[str, CourseDetails] = {}
+    for code in codes:
+        atoms: list[Expr] = [
+            ReqCourse(code=req, coreq=draw(st.booleans()))
+            for req in draw(st.lists(other_codes, max_size=3, unique=True))
+            if req != code
+        ]
+        if draw(st.integers(0, 9)) == 0:
+            atoms.append(MinCredits(min_credits=draw(st.sampled_from([20, 60, 100]))))
+        deps: Expr = Const(value=True)
+        if atoms:
+            deps = draw(st.sampled_from([And, Or]))(children=tuple(atoms))
+        courses[code] = CourseDetails(
+            code=code,
+            name=code,
+            credits=draw(st.sampled_from([0, 5, 10, 10, 15])),
+            deps=deps,
+            banner_equivs=[
+                equiv
+                for equiv in draw(st.lists(other_codes, max_size=1))
+                if equiv != code
+            ],
+            canonical_equiv=code,
+            program="",
+            school="",
+            area=None,
+            category=None,
+            is_available=True,
+            semestrality=draw(
+                st.sampled_from([(True, True), (True, False), (False, True)]),
+            ),
+        )
+    # Add some mutual corequirements
+    for _ in range(n // 10):
+        a, b = draw(st.lists(other_codes, min_size=2, max_size=2, unique=True))
+        for x, y in ((a, b), (b, a)):
+            deps = And(children=(courses[x].deps, ReqCourse(code=y, coreq=True)))
+            courses[x] = courses[x].copy(update={"deps": deps})
+    order = draw(st.permutations(codes))
+    return courses, order[: n * 4 // 5]
+
+
+def place(
+    courses: dict[str, CourseDetails],
+    order: list[str],
+    naive: bool,
+) -> tuple[list[list[str]], list[int]]:
+    info = CourseInfo(courses=courses, equivs={}, must_have_courses=set())
+    plan = ValidatablePlan(
+        version="0.0.2",
+        classes=[],
+        level=None,
+        school=None,
+        program=None,
+        career=None,
+        curriculum=CurriculumSpec(cyear="C2020", major=None, minor=None, title=None),
+    )
+    to_pass: list[PseudoCourse] = [ConcreteId(code=code) for code in order]
+    to_pass.append(EquivalenceId(code="?ICS", credits=10))
+    courses_to_pass = OrderedDict(enumerate(to_pass))
+    coreq_components = _find_mutual_coreqs(info, courses_to_pass)
+    plan_ctx = ValidationContext(info, plan, user_ctx=None)
+    plan_ctx.append_semester()
+    if naive:
+        # The straightforward algorithm: retry every course after each addition
+        while courses_to_pass:
+            if any(
+                _try_add_course_group(
+                    info,
+                    plan_ctx,
+                    courses_to_pass,
+                    coreq_components[idx],
+                )
+                for idx in courses_to_pass
+            ):
+                continue
+            if len(plan.classes) >= 2 and not plan.classes[-1] and not plan.classes[-2]:
+                break
+            plan_ctx.append_semester()
+    else:
+        PlacementScheduler(info, plan_ctx, courses_to_pass, coreq_components).run()
+    return [[c.code for c in sem] for sem in plan.classes], list(courses_to_pass)
+
+
+@settings(max_examples=60, deadline=None)
+@given(problem=placement_problems())
+def test_placement_parity(problem: tuple[dict[str, CourseDetails], list[str]]):
+    courses, order = problem
+    assert place(courses, order, naive=False) == place(courses, order, naive=True)
+
+
+def test_placement_chain():
+    def course(
+        code: str,
+        deps: Expr | None = None,
+        semestrality: tuple[bool, bool] = (True, True),
+    ) -> CourseDetails:
+        return CourseDetails(
+            code=code,
+            name=code,
+            credits=10,
+            deps=deps or Const(value=True),
+            banner_equivs=[],
+            canonical_equiv=code,
+            program="",
+            school="",
+            area=None,
+            category=None,
+            is_available=True,
+            semestrality=semestrality,
+        )
+
+    courses = {
+        c.code: c
+        for c in [
+            course("MAT1610"),
+            course("MAT1620", ReqCourse(code="MAT1610", coreq=False)),
+            course("MAT1630", ReqCourse(code="MAT1620", coreq=False)),
+            # Mutual corequirements must be placed together
+            course("FIS1514", ReqCourse(code="FIS0151", coreq=True)),
+            course("FIS0151", ReqCourse(code="FIS1514", coreq=True)),
+            # Only offered in the second semester
+            course("ICS1113", ReqCourse(code="MAT1610", coreq=False), (False, True)),
+            # Requirements that can never be met leave the course unplaced
+            course("IIC2343", Const(value=False)),
+        ]
+    }
+    order = [
+        "MAT1630",
+        "IIC2343",
+        "MAT1620",
+        "ICS1113",
+        "FIS1514",
+        "FIS0151",
+        "MAT1610",
+    ]
+    placed, left = place(courses, order, naive=False)
+    assert (placed, left) == place(courses, order, naive=True)
+    assert placed[:3] == [
+        ["FIS1514", "FIS0151", "MAT1610", "?ICS"],
+        ["MAT1620", "ICS1113"],
+        ["MAT1630"],
+    ]
+    assert left == [1]
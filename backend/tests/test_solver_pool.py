@@ -0,0 +1,36 @@
+from app.plan.validation.curriculum.pool import SolverPool
+
+
+def test_solver_reuse():
+    pool = SolverPool("SCIP", max_size=2, wait_timeout=0)
+
+    solver = pool.checkout()
+    solver.NumVar(0, 1, "")
+    pool.checkin(solver)
+
+    # The same solver is handed out again, but empty
+    reused = pool.checkout()
+    assert reused is solver
+    assert reused.NumVariables() == 0
+
+    stats = pool.stats()
+    assert stats.hits == 1
+    assert stats.misses == 1
+    assert stats.checked_out == 1
+    pool.checkin(reused)
+
+
+def test_solver_pool_overflow():
+    pool = SolverPool("SCIP", max_size=1, wait_timeout=0)
+
+    pooled = pool.checkout()
+    temporary = pool.checkout()
+    assert temporary is not pooled
+    pool.checkin(temporary)
+    pool.checkin(pooled)
+
+    # Temporary solvers are not kept around
+    stats = pool.stats()
+    assert stats.waits == 1
+    assert stats.overflows == 1
+    assert stats.idle == 1
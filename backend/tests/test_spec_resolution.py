@@ -0,0 +1,179 @@
+from app.plan.validation.curriculum.tree import (
+    Curriculum,
+    CurriculumSpec,
+    MajorCode,
+    MinorCode,
+    TitleCode,
+)
+from app.sync.curriculums.storage import (
+    CurriculumStorage,
+    ProgramDetails,
+    ResolvedSpec,
+)
+from hypothesis import given
+from hypothesis import strategies as st
+
+MAJORS = [MajorCode(f"M00{i}") for i in range(3)]
+MINORS = [MinorCode(f"N00{i}") for i in range(3)]
+TITLES = [TitleCode(f"4000{i}") for i in range(2)]
+
+
+def old_lookup(
+    parts: dict[str, Curriculum],
+    fallbacks: list[CurriculumSpec],
+) -> Curriculum | None:
+    for spec in fallbacks:
+        if str(spec) in parts:
+            return parts[str(spec)]
+    return None
+
+
+specs = st.builds(
+    CurriculumSpec,
+    cyear=st.just("C2020"),
+    major=st.none() | st.sampled_from(MAJORS),
+    minor=st.none() | st.sampled_from(MINORS),
+    title=st.none() | st.sampled_from(TITLES),
+)
+# The curriculum parts in the storage, each stored as a major, minor or title
+parts = st.lists(st.tuples(specs, st.sampled_from(["major", "minor", "title"])))
+# The minors that are offered with each major
+major_minors = st.lists(
+    st.lists(st.sampled_from(MINORS), max_size=2, unique=True),
+    min_size=len(MAJORS),
+    max_size=len(MAJORS),
+)
+
+
+def make_storage(
+    parts: list[tuple[CurriculumSpec, str]],
+    major_minors: list[list[MinorCode]],
+) -> CurriculumStorage:
+    storage = CurriculumStorage()
+    for spec, kind in parts:
+        getattr(storage, f"set_{kind}")(spec, Curriculum.empty(spec))
+    offer = storage.offer["C2020"]
+    for code, minors in zip(MAJORS, major_minors, strict=True):
+        offer.major[code] = ProgramDetails(
+            code=code,
+            name=code,
+            version="1",
+            program_type="Major",
+        )
+        offer.major_minor[code] = minors
+    for code in MINORS:
+        offer.minor[code] = ProgramDetails(
+            code=code,
+            name=code,
+            version="1",
+            program_type="Minor",
+        )
+    for code in TITLES:
+        offer.title[code] = ProgramDetails(
+            code=code,
+            name=code,
+            version="1",
+            program_type="Titulo",
+        )
+    return storage
+
+
+def check_resolution(storage: CurriculumStorage, spec: CurriculumSpec):
+    assert storage.get_major(spec) is old_lookup(
+        storage.majors,
+        [spec, spec.no_title(), spec.no_minor(), spec.no_minor().no_title()],
+    )
+    assert storage.get_minor(spec) is old_lookup(
+        storage.minors,
+        [spec, spec.no_title(), spec.no_major(), spec.no_major().no_title()],
+    )
+    assert storage.get_title(spec) is old_lookup(
+        storage.titles,
+        [spec, spec.no_minor(), spec.no_major(), spec.no_major().no_minor()],
+    )
+
+
+@given(
+    parts=parts,
+    major_minors=major_minors,
+    queries=st.lists(specs, min_size=1, max_size=20),
+)
+def test_spec_resolution(
+    parts: list[tuple[CurriculumSpec, str]],
+    major_minors: list[list[MinorCode]],
+    queries: list[CurriculumSpec],
+):
+    storage = make_storage(parts, major_minors)
+    for spec in queries:
+        check_resolution(storage, spec)
+    storage.build_resolution_table()
+    for spec in queries:
+        check_resolution(storage, spec)
+
+
+def test_spec_resolution_fallbacks():
+    full = CurriculumSpec(cyear="C2020", major=MAJORS[0], minor=MINORS[0], title=None)
+    storage = make_storage(
+        [
+            # Only stored without a minor, so it is found by dropping the minor
+            (full.no_minor(), "major"),
+            # Stored on its own, regardless of the major
+            (full.no_major(), "minor"),
+            # A title of another cyear is never used
+            (
+                CurriculumSpec(
+                    cyear="C2022",
+                    major=None,
+                    minor=None,
+                    title=TITLES[0],
+                ),
+                "title",
+            ),
+        ],
+        [[MINORS[0]], [], []],
+    )
+    storage.build_resolution_table()
+    resolved = storage.resolve(full.copy(update={"title": TITLES[0]}))
+    assert resolved == ResolvedSpec(
+        major=str(full.no_minor()),
+        minor=str(full.no_major()),
+        title=None,
+    )
+    # Specs outside of the offer are resolved just the same
+    outside = full.copy(update={"minor": MINORS[2]})
+    check_resolution(storage, outside)
+    assert storage.get_major(outside) is storage.majors[str(full.no_minor())]
+
+
+def test_resolution_table_export():
+    storage = make_storage(
+        [
+            (
+                CurriculumSpec(cyear="C2020", major=major, minor=None, title=None),
+                "major",
+            )
+            for major in MAJORS
+        ],
+        [MINORS[:1], MINORS[1:3], MINORS],
+    )
+    assert storage.resolution_table() == {}
+    storage.build_resolution_table()
+    table = storage.resolution_table()
+    offer = storage.offer["C2020"]
+    # Every major with each of its minors (or none), with each title (or none), plus
+    # the specs without a major
+    with_major = sum(1 + len(minors) for minors in offer.major_minor.values())
+    assert len(table) == (1 + len(MINORS) + with_major) * (1 + len(TITLES))
+    spec = CurriculumSpec(
+        cyear="C2020",
+        major=MAJORS[0],
+        minor=MinorCode(offer.major_minor[MAJORS[0]][0]),
+        title=TITLES[0],
+    )
+    assert table[str(spec)] == storage.resolve(spec)
+    assert isinstance(table["C2020"], ResolvedSpec)
+
+    # Changing the storage discards the table
+    storage.set_title(spec, Curriculum.empty(spec))
+    assert storage.resolution_table() == {}
+    assert storage.resolve(spec).title == str(spec)
@@ -0,0 +1,133 @@
+import struct
+import sys
+from pathlib import Path
+
+import pytest
+from app.plan.course import ConcreteId, EquivalenceId
+from app.plan.courseinfo import CourseDetails, CourseInfo, CourseStore, CourseText
+from app.plan.search import CourseSearchIndex
+from app.plan.validation.courses.logic import And, Const, ReqCourse
+from app.sync import image
+from app.sync.image import open_image, write_image
+
+
+def make_course(code: str, **kwargs: object) -> CourseDetails:
+    fields: dict[str, object] = {
+        "code": code,
+        "name": f"Curso {code}",
+        "credits": 10,
+        "deps": Const(value=True),
+        "banner_equivs": [],
+        "canonical_equiv": code,
+        "program": "Programa largo",
+        "school": "Ingenieria",
+        "area": None,
+        "category": None,
+        "is_available": True,
+        "semestrality": (True, True),
+    }
+    fields.update(kwargs)
+    return CourseDetails.parse_obj(fields)
+
+
+COURSES = [
+    make_course("IIC1000"),
+    make_course(
+        "IIC2000",
+        credits=0,
+        deps=And(
+            children=(
+                ReqCourse(code="IIC1000", coreq=False),
+                ReqCourse(code="IIC1001", coreq=True),
+            ),
+        ),
+        banner_equivs=["IIC2001", "IIC2002"],
+        canonical_equiv="IIC2002",
+        area="Humanidades",
+        is_available=False,
+        semestrality=(False, True),
+    ),
+    make_course("IIC2001", semestrality=(True, False), category="Ingenieria"),
+]
+
+
+def test_image_roundtrip(tmp_path: Path):
+    path = tmp_path / "static-data.bin"
+    packed = "{" + ",".join(f'"{c.code}":{c.json()}' for c in COURSES) + "}"
+    write_image(path, "0" * 32, packed, '{"curriculums":true}')
+
+    assert open_image(path, "1" * 32) is None
+    image = open_image(path, "0" * 32)
+    assert image is not None
+    assert image.packed_curriculums == b'{"curriculums":true}'
+    assert len(image.courses) == len(COURSES)
+    assert "IIC9999" not in image.courses
+    for course in COURSES:
+        assert image.courses[course.code] == course
+
+
+def test_course_store_accessors():
+    info = CourseInfo(
+        courses={c.code: c for c in COURSES},
+        equivs={},
+        must_have_courses={"IIC2000"},
+    )
+    assert info.has_course("IIC2000")
+    assert not info.has_course("IIC9999")
+    assert info.try_course("IIC9999") is None
+    assert info.try_course("IIC2000") == COURSES[1]
+    assert info.try_course_credits("IIC2000") == 0
+    assert info.try_semestrality("IIC2001") == (True, False)
+    assert info.try_canonical_equiv("IIC2000") == "IIC2002"
+    assert info.try_banner_equivs("IIC2000") == ("IIC2001", "IIC2002")
+    assert info.try_deps("IIC2000") == COURSES[1].deps
+    # Must-have courses are always available
+    assert info.is_available("IIC2000")
+    assert info.is_available("IIC1000")
+    assert not info.is_available("IIC9999")
+
+
+def test_has_any_skips_course_text():
+    def load_text(id: int) -> CourseText:
+        raise AssertionError("course text should not be decoded")
+
+    store = CourseStore.from_details({c.code: c for c in COURSES})
+    store._load_text = load_text
+    info = CourseInfo(courses=store, equivs={}, must_have_courses=set())
+    assert info.has_any(ConcreteId(code="IIC2000"))
+    assert not info.has_any(ConcreteId(code="IIC9999"))
+    assert not info.has_any(EquivalenceId(code="IIC2000", credits=10))
+
+
+def test_search_index_skips_course_text(tmp_path: Path):
+    def load_text(id: int) -> CourseText:
+        raise AssertionError("course text should not be decoded")
+
+    path = tmp_path / "static-data.bin"
+    packed = "{" + ",".join(f'"{c.code}":{c.json()}' for c in COURSES) + "}"
+    write_image(path, "0" * 32, packed, "{}")
+    image = open_image(path, "0" * 32)
+    assert image is not None
+    store = image.courses
+    assert (
+        store.search_keys()
+        == CourseStore.from_details(
+            {c.code: c for c in COURSES},
+        ).search_keys()
+    )
+    store._load_text = load_text
+    index = CourseSearchIndex(
+        CourseInfo(courses=store, equivs={}, must_have_courses=set()),
+    )
+    assert index.search("curso iic2001", index.with_school("ingen"), 10) == [2]
+
+
+@pytest.mark.skipif(sys.byteorder != "little", reason="needs a little-endian host")
+def test_uint_array_byte_order(monkeypatch: pytest.MonkeyPatch):
+    values = [1, 300, 65535]
+    little = memoryview(struct.pack("<3H", *values))
+    assert list(image._uint_array(little, "H")) == values
+    # On a big-endian host, the native integers are the reverse of the image integers
+    monkeypatch.setattr(sys, "byteorder", "big")
+    swapped = memoryview(struct.pack(">3H", *values))
+    assert list(image._uint_array(swapped, "H")) == values
@@ -0,0 +1,80 @@
+import json
+from pathlib import Path
+
+from app.tracing import (
+    attach,
+    run_traced,
+    server_timing,
+    span,
+    trace,
+    traced,
+    tracing_active,
+    walk_spans,
+    write_trace,
+)
+
+
+@traced()
+def solve_something() -> int:
+    with span("inner"):
+        return 42
+
+
+def job() -> int:
+    return solve_something()
+
+
+def test_spans_outside_trace():
+    assert not tracing_active()
+    with span("ignored"):
+        assert solve_something() == 42
+
+
+def test_span_tree(tmp_path: Path):
+    with trace("GET /plan") as root:
+        assert tracing_active()
+        with span("validate all"):
+            solve_something()
+            solve_something()
+        result, job_trace = run_traced(job)
+        attach(job_trace)
+    assert not tracing_active()
+    assert result == 42
+
+    paths = [path for path, _s in walk_spans(root)]
+    assert paths == [
+        "validate all",
+        "validate all.solve_something",
+        "validate all.solve_something.inner",
+        "validate all.solve_something",
+        "validate all.solve_something.inner",
+        "job",
+        "job.solve_something",
+        "job.solve_something.inner",
+    ]
+    for _path, s in walk_spans(root):
+        assert root.start_ns <= s.start_ns <= s.end_ns <= root.end_ns
+
+    header = server_timing(root)
+    metrics = [metric.split(";")[0] for metric in header.split(", ")]
+    assert metrics == [
+        "total",
+        "validate_all",
+        "validate_all.solve_something",
+        "validate_all.solve_something.inner",
+        "job",
+        "job.solve_something",
+        "job.solve_something.inner",
+    ]
+
+    trace_file = tmp_path / "trace.jsonl"
+    write_trace(root, trace_file)
+    write_trace(root, trace_file)
+    lines = trace_file.read_text().splitlines()
+    assert len(lines) == 2
+    spans = json.loads(lines[0])["resourceSpans"][0]["scopeSpans"][0]["spans"]
+    assert len(spans) == 9
+    assert spans[0]["name"] == "GET /plan"
+    assert spans[0]["parentSpanId"] == ""
+    ids = {s["spanId"] for s in spans}
+    assert all(s["parentSpanId"] in ids for s in spans[1:])
@@ -0,0 +1,139 @@
+from app.plan.course import ConcreteId
+from app.plan.courseinfo import CourseDetails, CourseInfo
+from app.plan.plan import ValidatablePlan
+from app.plan.validation.courses.logic import Const
+from app.plan.validation.courses.validate import ValidationContext
+from app.plan.validation.curriculum.tree import CurriculumSpec
+from hypothesis import given
+from hypothesis import strategies as st
+
+# The code, credits and banner equivalents of each course
+COURSES = [
+    ("MAT1610", 10, []),
+    # Banner equivalents count as the same course
+    ("MAT1620", 10, ["MAT1203"]),
+    ("MAT1203", 10, []),
+    # Courses without credits still count as taken
+    ("FIS1514", 0, []),
+    ("IIC1103", 5, []),
+    ("IIC2233", 15, ["IIC1103"]),
+    ("ICS1113", 20, []),
+]
+CODES = [code for code, _, _ in COURSES]
+
+INFO = CourseInfo(
+    courses={
+        code: CourseDetails(
+            code=code,
+            name=code,
+            credits=credits,
+            deps=Const(value=True),
+            banner_equivs=equivs,
+            canonical_equiv=code,
+            program="",
+            school="",
+            area=None,
+            category=None,
+            is_available=True,
+            semestrality=(True, True),
+        )
+        for code, credits, equivs in COURSES
+    },
+    equivs={},
+    must_have_courses=set(),
+)
+
+# Adding a course or starting a new semester
+additions = st.lists(st.sampled_from(CODES) | st.just("semester"), max_size=20)
+# The same, or removing the last course
+actions = st.lists(
+    st.sampled_from(CODES) | st.just("semester") | st.just("pop"),
+    max_size=60,
+)
+
+
+def empty_plan() -> ValidatablePlan:
+    return ValidatablePlan(
+        version="0.0.2",
+        classes=[],
+        level=None,
+        school=None,
+        program=None,
+        career=None,
+        curriculum=CurriculumSpec(cyear="C2020", major=None, minor=None, title=None),
+    )
+
+
+def snapshot(ctx: ValidationContext):
+    return (
+        ctx.by_code,
+        ctx.class_ids,
+        [list(sem) for sem in ctx.class_credits],
+        {code: n for code, n in ctx.rep_counts.items() if n},
+        ctx.approved_credits,
+        [ctx.semester_credits(i) for i in range(len(ctx.plan.classes))],
+    )
+
+
+def apply(ctx: ValidationContext, action: str):
+    if action == "semester":
+        ctx.append_semester()
+    elif action == "pop":
+        if ctx.plan.classes and ctx.plan.classes[-1]:
+            ctx.pop_course()
+    else:
+        if not ctx.plan.classes:
+            ctx.append_semester()
+        ctx.append_course(ConcreteId(code=action))
+
+
+def assert_fresh(ctx: ValidationContext):
+    # The incrementally updated context must match a context built from scratch
+    fresh = ValidationContext(INFO, ctx.plan, user_ctx=None)
+    assert snapshot(ctx) == snapshot(fresh)
+
+
+@given(actions=actions)
+def test_incremental_context(actions: list[str]):
+    ctx = ValidationContext(INFO, empty_plan(), user_ctx=None)
+    for action in actions:
+        apply(ctx, action)
+        assert_fresh(ctx)
+
+
+def test_equivalent_repetitions():
+    ctx = ValidationContext(INFO, empty_plan(), user_ctx=None)
+    for action in ["MAT1203", "semester", "MAT1620", "ICS1113", "ICS1113", "pop"]:
+        apply(ctx, action)
+    assert_fresh(ctx)
+    assert ctx.approved_credits == [0, 10, 40]
+    assert ctx.semester_credits(1) == 30
+
+
+# Only additions can be rolled back
+@given(before=actions, attempts=st.lists(st.tuples(additions, st.booleans())))
+def test_rollback(before: list[str], attempts: list[tuple[list[str], bool]]):
+    ctx = ValidationContext(INFO, empty_plan(), user_ctx=None)
+    for action in before:
+        apply(ctx, action)
+    for attempt, undo in attempts:
+        checkpoint = ctx.checkpoint()
+        expected = snapshot(ctx)
+        classes = [list(sem) for sem in ctx.plan.classes]
+        for action in attempt:
+            apply(ctx, action)
+        if undo:
+            ctx.rollback(checkpoint)
+            assert ctx.plan.classes == classes
+            assert snapshot(ctx) == expected
+        assert_fresh(ctx)
+
+
+def test_rollback_to_empty_plan():
+    ctx = ValidationContext(INFO, empty_plan(), user_ctx=None)
+    checkpoint = ctx.checkpoint()
+    for action in ["IIC1103", "semester", "IIC2233", "FIS1514"]:
+        apply(ctx, action)
+    ctx.rollback(checkpoint)
+    assert ctx.plan.classes == []
+    assert_fresh(ctx)
@@ -0,0 +1,74 @@
+import asyncio
+from concurrent.futures import ThreadPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from threading import Barrier, Event
+
+import pytest
+from app import workers
+from app.settings import settings
+from fastapi import HTTPException
+
+
+def test_abandoned_jobs_hold_their_slot(monkeypatch: pytest.MonkeyPatch):
+    monkeypatch.setattr(settings, "solve_queue_size", 1)
+    monkeypatch.setattr(settings, "solve_job_timeout", 0.05)
+    monkeypatch.setattr(workers, "_stats", workers.WorkerStats())
+    # Threads stand in for worker processes, since they cannot be interrupted either
+    executor = ThreadPoolExecutor(max_workers=1)
+    monkeypatch.setattr(workers, "_executor", executor)
+    release = Event()
+
+    async def run():
+        with pytest.raises(HTTPException) as timeout:
+            await workers.run_job(release.wait)
+        assert timeout.value.status_code == 504
+        # The job is still running, so there is no room for another one
+        with pytest.raises(HTTPException) as busy:
+            await workers.run_job(release.wait)
+        assert busy.value.status_code == 503
+
+    asyncio.run(run())
+    stats = workers.worker_stats()
+    assert (stats.pending, stats.abandoned, stats.timeouts, stats.rejected) == (
+        1,
+        1,
+        1,
+        1,
+    )
+
+    release.set()
+    executor.shutdown(wait=True)
+    stats = workers.worker_stats()
+    assert (stats.pending, stats.abandoned, stats.finished) == (0, 0, 1)
+
+
+def test_broken_pool_is_restarted_once(monkeypatch: pytest.MonkeyPatch):
+    monkeypatch.setattr(workers, "_stats", workers.WorkerStats())
+    broken = ThreadPoolExecutor(max_workers=2)
+    monkeypatch.setattr(workers, "_executor", broken)
+    replacement = ThreadPoolExecutor(max_workers=1)
+    monkeypatch.setattr(workers, "_create_executor", lambda: replacement)
+
+    # Both jobs are running when the pool breaks, so neither is cancelled on restart
+    running = Barrier(2)
+
+    def die():
+        running.wait()
+        raise BrokenProcessPool
+
+    async def run():
+        # Both jobs fail because of the same broken pool
+        return await asyncio.gather(
+            workers.run_job(die),
+            workers.run_job(die),
+            return_exceptions=True,
+        )
+
+    for err in asyncio.run(run()):
+        assert isinstance(err, HTTPException)
+        assert err.status_code == 503
+    assert workers._executor is replacement
+    stats = workers.worker_stats()
+    assert (stats.pending, stats.restarts, stats.finished) == (0, 1, 2)
+    broken.shutdown(wait=True)
+    replacement.shutdown(wait=True)
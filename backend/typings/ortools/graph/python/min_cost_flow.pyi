@@ -0,0 +1,33 @@
+class SimpleMinCostFlow:
+    class Status:
+        pass
+
+    NOT_SOLVED: SimpleMinCostFlow.Status
+    OPTIMAL: SimpleMinCostFlow.Status
+    FEASIBLE: SimpleMinCostFlow.Status
+    INFEASIBLE: SimpleMinCostFlow.Status
+    UNBALANCED: SimpleMinCostFlow.Status
+    BAD_RESULT: SimpleMinCostFlow.Status
+    BAD_COST_RANGE: SimpleMinCostFlow.Status
+
+    def __init__(self, reserve_num_nodes: int = 0, reserve_num_arcs: int = 0) -> None: ...
+    def add_arc_with_capacity_and_unit_cost(
+        self,
+        tail: int,
+        head: int,
+        capacity: int,
+        unit_cost: int,
+    ) -> int: ...
+    def set_node_supply(self, node: int, supply: int) -> None: ...
+    def solve(self) -> SimpleMinCostFlow.Status: ...
+    def solve_max_flow_with_min_cost(self) -> SimpleMinCostFlow.Status: ...
+    def optimal_cost(self) -> int: ...
+    def maximum_flow(self) -> int: ...
+    def flow(self, arc: int) -> int: ...
+    def num_nodes(self) -> int: ...
+    def num_arcs(self) -> int: ...
+    def tail(self, arc: int) -> int: ...
+    def head(self, arc: int) -> int: ...
+    def capacity(self, arc: int) -> int: ...
+    def supply(self, node: int) -> int: ...
+    def unit_cost(self, arc: int) -> int: ...